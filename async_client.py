@@ -0,0 +1,265 @@
+# async_client.py
+import asyncio
+
+import aiohttp
+import spotipy
+from spotipy.oauth2 import SpotifyOAuth
+
+from config import Config
+from search_cache import SearchCache
+from tracks import Track
+from spotify_client import SpotifyClient, cached_match, save_match
+from concurrency import AsyncRetryAfterGate, async_bounded_map, retry_after_seconds
+from matching import MatchReport, match_steps
+from playlist_manager import MAX_ITEMS_PER_REQUEST
+from rate_limit import RateLimiter
+from instrumentation import metrics
+
+API_URL = "https://api.spotify.com/v1/"
+
+
+class AsyncSpotifyClient:
+    """asyncio counterpart of SpotifyClient for running hundreds of searches on one thread.
+
+    Requests share one pool of keep-alive connections, and go through the
+    same search cache, rate limits, 429 backoff and metrics as SpotifyClient.
+    Cache reads and writes (SQLite) and file-shared rate limits run in worker
+    threads, so disk I/O never stalls the searches in flight.
+    The client uses the token SpotifyOAuth keeps in `.spotify_cache`,
+    refreshing it when it expires, but never starts an interactive login:
+    run main.py once first. Use it as `async with AsyncSpotifyClient() as client`.
+    """
+    MAX_RATE_LIMIT_RETRIES = SpotifyClient.MAX_RATE_LIMIT_RETRIES
+    MATCH_CANDIDATES = SpotifyClient.MATCH_CANDIDATES
+    MAX_MATCH_CALLS = SpotifyClient.MAX_MATCH_CALLS
+
+    def __init__(self, cache=None, limiter=None, auth_manager=None, max_connections=100, timeout=10,
+                 base_url=API_URL):
+        self.backoff = AsyncRetryAfterGate()
+        self.cache = cache
+        self.limiter = limiter or RateLimiter()
+        self.auth_manager = auth_manager
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.base_url = base_url
+        self.api_calls = 0
+        self.match_report = MatchReport()
+        self._session = None
+        self._token = None
+        self._token_lock = None
+        self._user_id = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self):
+        """The pooled aiohttp session, opened on first use inside the running loop."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": Config.USER_AGENT},
+            )
+        return self._session
+
+    def _cached_token(self):
+        if self.auth_manager is None:
+            Config.require_credentials()
+            self.auth_manager = SpotifyOAuth(
+                client_id=Config.CLIENT_ID,
+                client_secret=Config.CLIENT_SECRET,
+                redirect_uri=Config.REDIRECT_URI,
+                scope=Config.SCOPE,
+                cache_path=".spotify_cache",
+                open_browser=False
+            )
+        token = self.auth_manager.validate_token(self.auth_manager.cache_handler.get_cached_token())
+        if not token:
+            raise spotipy.SpotifyOauthError("No cached Spotify token; run main.py once to log in")
+        return token
+
+    async def _access_token(self):
+        """The cached access token, refreshed (off the event loop) once it expires."""
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if self._token is None or self.auth_manager.is_token_expired(self._token):
+                self._token = await asyncio.to_thread(self._cached_token)
+        return self._token['access_token']
+
+    async def _send(self, method, path, params=None, payload=None):
+        url = path if path.startswith('http') else self.base_url + path
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        headers = {"Authorization": f"Bearer {await self._access_token()}"}
+        async with self.session.request(method, url, params=params, json=payload, headers=headers) as response:
+            if response.status >= 400:
+                raise spotipy.SpotifyException(
+                    response.status, -1, f"{response.url}: {await response.text()}", headers=dict(response.headers)
+                )
+            if response.status == 204:
+                return None
+            return await response.json(content_type=None)
+
+    async def _call(self, endpoint, method, path, params=None, payload=None):
+        """Send one API request within the `endpoint` class rate limit, waiting out 429s.
+
+        Errors are raised as spotipy.SpotifyException, as with SpotifyClient.
+        """
+        clock = self.limiter.clock
+        attempt = 0
+        while True:
+            started = clock()
+            await self.backoff.wait()
+            if self.limiter.uses_files:
+                delay = await asyncio.to_thread(self.limiter.reserve, endpoint)
+            else:
+                delay = self.limiter.reserve(endpoint)
+            if delay:
+                await asyncio.sleep(delay)
+            self.api_calls += 1
+            called = clock()
+            throttled = False
+            try:
+                return await self._send(method, path, params, payload)
+            except spotipy.SpotifyException as e:
+                throttled = e.http_status == 429
+                if not throttled or attempt >= self.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                self.backoff.pause(retry_after_seconds(e, attempt))
+                attempt += 1
+                metrics.count('spotify_retries_total', endpoint=endpoint)
+            finally:
+                finished = clock()
+                self.limiter.record(endpoint, called - started, finished - called, throttled)
+                metrics.observe('spotify_call_seconds', finished - called, endpoint=endpoint)
+                metrics.observe('rate_limit_wait_seconds', called - started, endpoint=endpoint)
+                if throttled:
+                    metrics.count('spotify_throttled_total', endpoint=endpoint)
+
+    async def search(self, query, limit=10):
+        return await self._call('search', 'GET', 'search', {'q': query, 'type': 'track', 'limit': limit})
+
+    async def search_track(self, song_name, artist_name=None):
+        """Search for a track and return its URI."""
+        query = f"track:{song_name}"
+        if artist_name:
+            query += f" artist:{artist_name}"
+
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, query)
+            if cached is not SearchCache.MISSING:
+                metrics.count('search_cache_total', result='hit')
+                return Track.from_dict(cached)
+            metrics.count('search_cache_total', result='miss')
+
+        try:
+            results = await self.search(query, limit=1)
+            if results['tracks']['items']:
+                track = results['tracks']['items'][0]
+                result = Track.from_spotify(track)
+            else:
+                print(f"Not found: {song_name}")
+                result = None
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.set, query, result)
+            return result
+        except Exception as e:
+            print(f"Search error for '{song_name}': {e}")
+            return None
+
+    async def match_track(self, song_name, artist_name=None, refresh=False, on_error=None):
+        """Find the best-scoring track, as SpotifyClient.match_track does (and sharing its cache)."""
+        if not refresh:
+            cached = await asyncio.to_thread(cached_match, self.cache, self.match_report, song_name, artist_name)
+            if cached is not SearchCache.MISSING:
+                return cached
+
+        calls = 0
+        steps = match_steps(song_name, artist_name, self.MAX_MATCH_CALLS)
+        with metrics.timer('search_seconds'):
+            try:
+                query = next(steps)
+                while True:
+                    calls += 1
+                    results = await self.search(query, limit=self.MATCH_CANDIDATES)
+                    query = steps.send(results['tracks']['items'])
+            except StopIteration as done:
+                result = done.value and Track.from_spotify(done.value)
+            except Exception as e:
+                print(f"Search error for '{song_name}': {e}")
+                self.match_report.record(None, calls)
+                return on_error
+
+        await asyncio.to_thread(save_match, self.cache, self.match_report, song_name, artist_name, result, calls)
+        return result
+
+    async def search_tracks(self, songs, max_concurrency=100):
+        """Match many tracks with up to `max_concurrency` searches in flight, returning results in input order.
+
+        Each entry in `songs` is either a title or a `(title, artist)` tuple.
+        """
+        async def match(song):
+            return await self.match_track(*(song if isinstance(song, tuple) else (song, None)))
+        return [track async for track in async_bounded_map(match, songs, max_concurrency)]
+
+    async def current_user_id(self):
+        if self._user_id is None:
+            self._user_id = (await self._call('read', 'GET', 'me'))['id']
+        return self._user_id
+
+    async def fetch_playlist_uris(self, playlist_id):
+        """Return the track URIs currently in a playlist, in order."""
+        uris = []
+        page = await self._call('read', 'GET', f"playlists/{playlist_id}/tracks",
+                                {'fields': 'items(track(uri)),next', 'limit': 100})
+        while page:
+            uris.extend(item['track']['uri'] for item in page['items'] if item.get('track'))
+            page = page['next'] and await self._call('read', 'GET', page['next'])
+        return uris
+
+    async def create_playlist(self, song_data, name="Billboard Playlist", description=""):
+        """Create a playlist and add the matched tracks in order; returns its ID, or None on failure."""
+        try:
+            user_id = await self.current_user_id()
+            playlist = await self._call('write', 'POST', f"users/{user_id}/playlists",
+                                        payload={'name': name, 'public': True, 'description': description})
+        except spotipy.SpotifyException as e:
+            print(f"Spotify API error creating playlist: {e}")
+            return None
+        except Exception as e:
+            print(f"Failed to create playlist: {e}")
+            return None
+        playlist_id = playlist['id']
+        print(f"✅ Playlist created: {name} (ID: {playlist_id})")
+
+        uris = [track['uri'] for track in song_data if track is not None]
+        if not uris:
+            print("❌ No valid tracks to add.")
+            return playlist_id
+
+        # Batches go one after another so they land in chart order
+        added = 0
+        for start in range(0, len(uris), MAX_ITEMS_PER_REQUEST):
+            batch = uris[start:start + MAX_ITEMS_PER_REQUEST]
+            try:
+                with metrics.timer('batch_add_seconds'):
+                    await self._call('write', 'POST', f"playlists/{playlist_id}/tracks", payload={'uris': batch})
+                added += len(batch)
+            except Exception as e:
+                metrics.count('batch_failures_total')
+                print(f"Error adding tracks {start + 1}-{start + len(batch)} to playlist: {e}")
+        if added < len(uris):
+            print(f"⚠️ Added {added} of {len(uris)} tracks.")
+        else:
+            print(f"✅ Added {added} tracks.")
+        print(f"🎧 Listen at: https://open.spotify.com/playlist/{playlist_id}")
+        return playlist_id
@@ -0,0 +1,81 @@
+# async_main.py
+import argparse
+import asyncio
+
+from async_client import AsyncSpotifyClient
+from backfill import chart_weeks, distinct_songs, fetch_chart_pages, song_key
+from fetcher import ChartFetcher
+from scraper import DEFAULT_CHART, CHARTS, get_chart
+from search_cache import SearchCache
+from rate_limit import RateLimiter
+from config import Config
+from instrumentation import metrics
+
+
+async def run(chart_dates, client, charts=(DEFAULT_CHART,), max_concurrency=200, workers=8,
+              create_playlists=True, fetcher=None):
+    """Scrape charts, then resolve every distinct song with up to `max_concurrency` searches in flight.
+
+    Chart pages are downloaded on a small thread pool; all Spotify calls run
+    on the event loop's single thread. Returns {(chart, chart_date): tracks}.
+    """
+    fetcher = fetcher or ChartFetcher(Config.PAGE_CACHE_DIR, pool_size=workers)
+    pages = [(chart, chart_date) for chart in charts for chart_date in chart_dates]
+    scraped = await asyncio.to_thread(fetch_chart_pages, pages, fetcher, workers)
+
+    songs = distinct_songs(scraped)
+    print(f"🎶 Found {len(songs)} distinct songs on {len(pages)} charts.")
+    resolved = dict(zip(songs, await client.search_tracks(songs, max_concurrency=max_concurrency)))
+
+    playlists = {}
+    for (chart, chart_date), entries in scraped.items():
+        tracks = [resolved.get(song_key(entry)) for entry in entries]
+        playlists[(chart, chart_date)] = tracks
+        if create_playlists and entries:
+            source = get_chart(chart)
+            await client.create_playlist(
+                tracks, name=f"{source.name} - {chart_date}", description=f"Top songs from {source.name} on {chart_date}"
+            )
+    return playlists
+
+
+async def _main(args):
+    chart_dates = chart_weeks(args.dates[0], args.until) if args.until else args.dates
+    async with AsyncSpotifyClient(cache=SearchCache.from_config(), limiter=RateLimiter.from_config(),
+                                  max_connections=args.connections) as client:
+        await run(chart_dates, client, args.charts or [DEFAULT_CHART], args.search_concurrency, args.workers,
+                  create_playlists=not args.no_playlists)
+        matches = client.match_report.summary()
+        print(f"🔎 Matched {matches['matched']} of {matches['songs']} songs, "
+              f"{matches['average_calls']:.2f} search calls per song, {client.api_calls} API calls.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Create playlists from Billboard charts, resolving songs with asyncio on a single thread."
+    )
+    parser.add_argument("dates", nargs="+", help="Chart dates (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Cover every chart week from the first date to this one")
+    parser.add_argument("--chart", action="append", choices=CHARTS, dest="charts",
+                        help="Chart to use; repeat for several (default: hot-100)")
+    parser.add_argument("--search-concurrency", type=int, default=200, help="Spotify searches in flight")
+    parser.add_argument("--connections", type=int, default=100, help="Pooled keep-alive connections to Spotify")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent chart downloads")
+    parser.add_argument("--no-playlists", action="store_true", help="Resolve songs without creating playlists")
+    parser.add_argument("--metrics-file",
+                        help="Also write the run's metrics here (JSON for a .json file, else Prometheus text)")
+    args = parser.parse_args(argv)
+
+    try:
+        Config.require_credentials()
+        asyncio.run(_main(args))
+    except Exception as e:
+        print(f"❌ Run failed: {e}")
+    finally:
+        metrics.print_report()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# backfill.py
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from fetcher import ChartFetcher
+from scraper import DEFAULT_CHART, BillboardScraper, CHARTS, get_chart
+from spotify_client import SpotifyClient
+from playlist_manager import PlaylistManager
+from song_index import RANKINGS, SongIndex
+from config import Config
+from instrumentation import metrics
+
+# Billboard chart weeks end on a Saturday
+CHART_WEEKDAY = 5
+
+
+def chart_weeks(start, end):
+    """Return the chart dates (ISO strings) for every chart week in [start, end].
+
+    Dates are snapped forward to the Saturday that closes their chart week.
+    """
+    start, end = date.fromisoformat(str(start)), date.fromisoformat(str(end))
+    week = start + timedelta(days=(CHART_WEEKDAY - start.weekday()) % 7)
+    last = end + timedelta(days=(CHART_WEEKDAY - end.weekday()) % 7)
+    weeks = []
+    while week <= last:
+        weeks.append(week.isoformat())
+        week += timedelta(weeks=1)
+    return weeks
+
+
+def fetch_chart_pages(pages, fetcher, max_workers=8):
+    """Scrape (chart, chart_date) pages concurrently through one fetcher.
+
+    Pages of different chart types share the pool and the fetcher's
+    connections. Returns {(chart, chart_date): chart_entries}.
+    """
+    pages = list(pages)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        charts = pool.map(
+            lambda page: BillboardScraper(page[1], fetcher=fetcher, chart=page[0]).scrape_entries(), pages
+        )
+        return dict(zip(pages, charts))
+
+
+def fetch_charts(chart_dates, fetcher, max_workers=8, chart=DEFAULT_CHART):
+    """Scrape every chart concurrently through one fetcher, returning {chart_date: chart_entries}."""
+    pages = fetch_chart_pages([(chart, d) for d in chart_dates], fetcher, max_workers=max_workers)
+    return {chart_date: pages[(chart, chart_date)] for chart_date in chart_dates}
+
+
+def song_key(entry):
+    """The (title, artist credit) pair a chart entry is searched by.
+
+    The full credit is passed on, as main.py does: match_track takes the lead
+    artist for its queries but scores candidates on every credited name, and
+    both paths then share the same search cache entries.
+    """
+    return entry.title, entry.artist
+
+
+def distinct_songs(charts):
+    """Return every distinct (title, artist credit) across all charts once, in first-seen order."""
+    return list(dict.fromkeys(
+        song_key(entry) for entries in charts.values() for entry in entries if entry.title
+    ))
+
+
+def run_backfill(start, end, sp_client, max_workers=8, max_concurrency=8,
+                 create_playlists=True, fetcher=None, clock=time.perf_counter, index=None, charts=None):
+    """Scrape every chart in a date range and resolve each distinct song once.
+
+    By default only the Hot 100 is scraped and the playlists are keyed by
+    chart date. With `charts` (chart slugs), every chart type is fetched in
+    the same pass, songs are resolved once across all of them, and the
+    playlists are keyed by (chart, chart_date) instead.
+
+    Every chart entry and its resolved track is also added to `index` (a
+    SongIndex), if given; the index must be for the one chart scraped.
+    Returns the per-chart resolved tracks along with a throughput report.
+    """
+    if index is not None and set(charts or [DEFAULT_CHART]) != {index.chart}:
+        raise ValueError(f"The song index is for {index.chart} only; it can't index {', '.join(charts or [DEFAULT_CHART])}")
+    started = clock()
+    fetcher = fetcher or ChartFetcher(Config.PAGE_CACHE_DIR, pool_size=max_workers)
+    # The fetcher and client may be reused across runs, so count from here
+    fetches_before = fetcher.downloads + fetcher.revalidated
+    cache_hits_before = fetcher.cache_hits
+    calls_before = sp_client.api_calls
+    chart_dates = chart_weeks(start, end)
+    if charts is None:
+        pages = {(DEFAULT_CHART, chart_date): chart_date for chart_date in chart_dates}
+    else:
+        pages = {(chart, chart_date): (chart, chart_date) for chart in charts for chart_date in chart_dates}
+    scraped = fetch_chart_pages(pages, fetcher, max_workers=max_workers)
+    chart_fetches = fetcher.downloads + fetcher.revalidated - fetches_before
+
+    songs = distinct_songs(scraped)
+    resolved = dict(zip(songs, sp_client.search_tracks(songs, max_concurrency=max_concurrency)))
+    search_calls = sp_client.api_calls - calls_before
+
+    playlists = {}
+    for (chart, chart_date), key in pages.items():
+        entries = scraped[(chart, chart_date)]
+        tracks = [resolved.get(song_key(entry)) for entry in entries]
+        playlists[key] = tracks
+        if index is not None:
+            for entry, track in zip(entries, tracks):
+                index.add(chart_date, entry, track)
+        if create_playlists and entries:
+            source = get_chart(chart)
+            PlaylistManager.create_playlist(
+                sp_client=sp_client,
+                song_data=tracks,
+                name=f"{source.name} - {chart_date}",
+                description=f"Top songs from {source.name} on {chart_date}"
+            )
+
+    elapsed = clock() - started
+    spotify_calls = sp_client.api_calls - calls_before
+    report = {
+        'charts': len(pages),
+        'charts_with_songs': sum(1 for entries in scraped.values() if entries),
+        'distinct_songs': len(songs),
+        'matched_songs': sum(1 for track in resolved.values() if track is not None),
+        'match_rate': sp_client.match_report.match_rate,
+        'average_search_calls': sp_client.match_report.average_calls,
+        'chart_fetches': chart_fetches,
+        'cached_charts': fetcher.cache_hits - cache_hits_before,
+        'search_calls': search_calls,
+        'write_calls': spotify_calls - search_calls,
+        'api_calls': chart_fetches + spotify_calls,
+        'elapsed_seconds': elapsed,
+        'charts_per_minute': len(pages) / elapsed * 60 if elapsed > 0 else 0.0,
+    }
+    return playlists, report
+
+
+def create_best_of(index, sp_client, n, by='points', name=None):
+    """Create one playlist of the top `n` songs across every week of the chart in `index`."""
+    source = get_chart(index.chart)
+    charts = index.charts
+    if not charts:
+        return None
+    top = index.top(n, by=by)
+    for position, (record, stats) in enumerate(top, 1):
+        print(f"    {position:>3}. {record.title} - {record.artist} "
+              f"({stats['weeks']} weeks, peak #{stats['peak']}, {stats['points']:.0f} points)")
+    return PlaylistManager.create_playlist(
+        sp_client=sp_client,
+        song_data=[record.track for record, _ in top],
+        name=name or f"{source.name} Best of {charts[0]} to {charts[-1]}",
+        description=f"Top {n} songs by {by} on the {source.name} from {charts[0]} to {charts[-1]}"
+    )
+
+
+def print_report(report):
+    print(f"\n📊 Backfill complete in {report['elapsed_seconds']:.1f}s")
+    print(f"    Charts: {report['charts']} ({report['charts_with_songs']} with songs), "
+          f"{report['charts_per_minute']:.1f} charts/min")
+    print(f"    Distinct songs: {report['distinct_songs']} ({report['matched_songs']} matched, "
+          f"{report['match_rate']:.0%} match rate, {report['average_search_calls']:.2f} searches per song)")
+    print(f"    API calls: {report['api_calls']} "
+          f"({report['chart_fetches']} chart fetches, {report['search_calls']} searches, "
+          f"{report['write_calls']} playlist writes; "
+          f"{report['cached_charts']} charts served from cache)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build playlists for every Billboard Hot 100 chart in a date range.")
+    parser.add_argument("start", help="First date to cover (YYYY-MM-DD)")
+    parser.add_argument("end", help="Last date to cover (YYYY-MM-DD)")
+    parser.add_argument("--chart", action="append", choices=CHARTS, dest="charts",
+                        help="Chart to backfill; repeat to scrape several in one run (default: hot-100)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent chart downloads")
+    parser.add_argument("--search-concurrency", type=int, default=8, help="Concurrent Spotify searches")
+    parser.add_argument("--no-playlists", action="store_true", help="Resolve songs without creating the weekly playlists")
+    parser.add_argument("--best-of", type=int, metavar="N",
+                        help="Also create one playlist of the top N songs across the whole range (one chart only)")
+    parser.add_argument("--rank-by", choices=RANKINGS, default='points',
+                        help="How --best-of ranks songs (default: points, 101 - rank on the Hot 100 for every week "
+                             "charted, scaled to the chart's size)")
+    parser.add_argument("--metrics-file",
+                        help="Also write the run's metrics here (JSON for a .json file, else Prometheus text)")
+    args = parser.parse_args(argv)
+    if args.charts:
+        args.charts = list(dict.fromkeys(args.charts))
+    if args.best_of and len(args.charts or []) > 1:
+        parser.error("--best-of ranks one chart; pass a single --chart")
+
+    names = ", ".join(get_chart(chart).name for chart in args.charts or [DEFAULT_CHART])
+    print(f"🔍 Backfilling {names} from {args.start} to {args.end}...")
+    try:
+        sp_client = SpotifyClient.from_config()
+    except Exception as e:
+        print(f"❌ Spotify client initialization failed. Check your credentials. {e}")
+        return
+
+    index = SongIndex((args.charts or [DEFAULT_CHART])[0]) if args.best_of else None
+    _, report = run_backfill(
+        args.start, args.end, sp_client,
+        max_workers=args.workers,
+        max_concurrency=args.search_concurrency,
+        create_playlists=not args.no_playlists,
+        index=index,
+        charts=args.charts
+    )
+    print_report(report)
+    if index is not None:
+        print(f"\n🏆 Top {args.best_of} of {len(index)} songs by {args.rank_by}:")
+        create_best_of(index, sp_client, args.best_of, args.rank_by)
+    metrics.print_report()
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Measure the memory a backfill's chart rows and resolved tracks take, before and after compaction.
+
+Run from the repository root:  python -m benchmarks.bench_memory [scenario ...]
+
+Charts are parsed from the fake Billboard pages and resolved against the
+fake Spotify catalog, then held the way run_backfill holds them: every
+chart's entries, one resolved track per distinct song, and every chart's
+track list. "dicts" copies each parsed string and builds a plain dict per
+track, as the code used to; "compact" keeps the interned entries and Track
+objects it produces now.
+"""
+import argparse
+import gc
+import tracemalloc
+
+from backfill import chart_weeks, song_key
+from benchmarks.bench_pipeline import SCENARIOS
+from benchmarks.fake_services import FakeServices, search_results
+from scraper import ChartEntry, parse_chart
+from tracks import Track
+
+
+def _copy(text):
+    """A new string equal to `text`, as parsing each page used to produce."""
+    return text.encode('utf-8').decode('utf-8')
+
+
+def _resolve(entry, compact):
+    items = search_results(f"track:{entry.title}", 1)
+    if not items:
+        return None
+    if compact:
+        return Track.from_spotify(items[0])
+    item = items[0]
+    return {'uri': _copy(item['uri']), 'name': _copy(item['name']), 'artist': _copy(item['artists'][0]['name'])}
+
+
+def build(chart_dates, compact, services=None):
+    """Parse and resolve every chart, holding the results as run_backfill does."""
+    services = services or FakeServices()
+    charts, resolved = {}, {}
+    for chart_date in chart_dates:
+        entries = list(parse_chart(services.chart_page(chart_date)))
+        if not compact:
+            entries = [ChartEntry(e.rank, _copy(e.title), _copy(e.artist), e.last_week, e.peak, e.weeks_on_chart)
+                       for e in entries]
+        charts[chart_date] = entries
+        for entry in entries:
+            if song_key(entry) not in resolved:
+                resolved[song_key(entry)] = _resolve(entry, compact)
+    playlists = {chart_date: [resolved[song_key(entry)] for entry in entries] for chart_date, entries in charts.items()}
+    return charts, resolved, playlists
+
+
+def measure(chart_dates, compact):
+    """Bytes still allocated once every chart is parsed, resolved and held in one representation."""
+    services = FakeServices()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        charts, resolved, _ = build(chart_dates, compact, services)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return size, charts, resolved
+
+
+def run_scenario(name):
+    chart_dates = chart_weeks(*SCENARIOS[name])
+    dicts, charts, resolved = measure(chart_dates, compact=False)
+    del charts, resolved
+    compact, charts, resolved = measure(chart_dates, compact=True)
+    return {
+        'scenario': name,
+        'charts': len(charts),
+        'rows': sum(len(entries) for entries in charts.values()),
+        'distinct_songs': len(resolved),
+        'dicts_mb': dicts / 1024 / 1024,
+        'compact_mb': compact / 1024 / 1024,
+        'reduction': 1 - compact / dicts if dicts else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: chart year)")
+    args = parser.parse_args(argv)
+    scenarios = args.scenarios or ['chart', 'year']
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    print(f"{'scenario':<8} {'charts':>6} {'rows':>7} {'songs':>6} {'dicts MB':>9} {'compact MB':>10} {'saved':>6}")
+    for name in scenarios:
+        result = run_scenario(name)
+        print(f"{name:<8} {result['charts']:>6} {result['rows']:>7} {result['distinct_songs']:>6} "
+              f"{result['dicts_mb']:>9.1f} {result['compact_mb']:>10.1f} {result['reduction']:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_parse.py
+"""Time chart page parsing against the saved fixture pages.
+
+Run from the repository root:  python -m benchmarks.bench_parse
+"""
+import argparse
+import glob
+import os
+import timeit
+
+from bs4 import BeautifulSoup
+
+from scraper import parse_songs
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', '*.html')
+
+
+def full_page_parse(html):
+    """The original approach: build a tree for the whole page, then search it."""
+    soup = BeautifulSoup(html, 'html.parser')
+    return [' '.join(item.find('h3', id='title-of-a-story').getText().split())
+            for item in soup.find_all('div', class_='o-chart-results-list-row-container')]
+
+
+def available_parsers():
+    parsers = ['stream', 'html.parser']
+    try:
+        import lxml  # noqa: F401
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per backend (best is reported)")
+    args = parser.parse_args(argv)
+
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        expected = full_page_parse(html)
+        baseline = min(timeit.repeat(lambda: full_page_parse(html), number=1, repeat=args.repeat))
+        print(f"{os.path.basename(path)} ({len(html) // 1024} KB, {len(expected)} rows)")
+        print(f"    full page, html.parser:  {baseline * 1000:8.1f} ms")
+
+        for backend in available_parsers():
+            if list(parse_songs(html, backend)) != expected:
+                raise SystemExit(f"{backend} output differs from the full-page parse for {path}")
+            best = min(timeit.repeat(lambda: list(parse_songs(html, backend)), number=1, repeat=args.repeat))
+            print(f"    chart rows, {backend + ':':<12} {best * 1000:8.1f} ms  ({baseline / best:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Measure end-to-end pipeline throughput against local fake Billboard and Spotify services.
+
+Run from the repository root:  python -m benchmarks.bench_pipeline [scenario ...]
+
+Each scenario runs in a fresh process so its peak RSS is its own. Save a run
+with --save and check a later one against it with --compare to catch
+regressions in SpotifyClient, BillboardScraper and PlaylistManager.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.fake_services import FakeServices
+
+# Scenario: (first chart date, last chart date)
+SCENARIOS = {
+    'chart': ('2016-07-16', '2016-07-16'),
+    'year': ('2016-01-02', '2016-12-31'),
+    'decade': ('2007-01-06', '2016-12-31'),
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be read."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_scenario(name, base_url, workers=8, concurrency=8, rate_limited=False):
+    """Run one scenario against the services at `base_url` and return its measurements."""
+    import spotipy
+    import scraper
+    from backfill import run_backfill
+    from fetcher import ChartFetcher
+    from pipeline import stream_chart_to_playlist
+    from rate_limit import RateLimiter
+    from search_cache import SearchCache
+    from spotify_client import SpotifyClient
+
+    class OfflineSpotifyClient(SpotifyClient):
+        def _connect(self):
+            spotify = spotipy.Spotify(auth='offline-benchmark', requests_timeout=10)
+            spotify.prefix = f"{base_url}/v1/"
+            return spotify
+
+    scraper.BILLBOARD_URL = f"{base_url}/charts/{{chart}}/{{date}}/"
+    start, end = SCENARIOS[name]
+    client = OfflineSpotifyClient(
+        cache=SearchCache(), limiter=RateLimiter() if rate_limited else RateLimiter(buckets={})
+    )
+    fetcher = ChartFetcher(pool_size=workers)
+
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if start == end:
+            summary = stream_chart_to_playlist(
+                scraper.BillboardScraper(start, fetcher=fetcher), client, f"Benchmark {start}",
+                max_concurrency=concurrency
+            )
+            charts, songs, matched = 1, summary['songs'], summary['matched']
+        else:
+            playlists, _ = run_backfill(start, end, client, max_workers=workers, max_concurrency=concurrency,
+                                        fetcher=fetcher)
+            charts = len(playlists)
+            songs = sum(len(tracks) for tracks in playlists.values())
+            matched = sum(1 for tracks in playlists.values() for track in tracks if track)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'scenario': name,
+        'charts': charts,
+        'songs': songs,
+        'matched': matched,
+        'distinct_songs': client.match_report.songs,
+        'elapsed_seconds': elapsed,
+        'songs_per_second': songs / elapsed if elapsed else 0.0,
+        'api_calls': client.api_calls,
+        'chart_fetches': fetcher.downloads,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every regression beyond `tolerance` against `baseline`."""
+    regressions = []
+    for result in results:
+        before = baseline.get(result['scenario'])
+        if not before:
+            continue
+        name = result['scenario']
+        if result['songs_per_second'] < before['songs_per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['songs_per_second']:.0f} songs/s, "
+                               f"was {before['songs_per_second']:.0f}")
+        if result['api_calls'] > before['api_calls'] * (1 + tolerance):
+            regressions.append(f"{name}: {result['api_calls']} API calls, was {before['api_calls']}")
+        if result['peak_rss_mb'] and before.get('peak_rss_mb') and \
+                result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB, was {before['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: chart year)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latency added to every Spotify request")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth Spotify request with a 429")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent chart downloads")
+    parser.add_argument("--search-concurrency", type=int, default=8, help="Concurrent Spotify searches")
+    parser.add_argument("--rate-limited", action="store_true", help="Apply the default client-side rate limits")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Fail if results regress against this saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression as a fraction")
+    args = parser.parse_args(argv)
+    scenarios = args.scenarios or ['chart', 'year']
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    results = []
+    with FakeServices(latency=args.latency_ms / 1000, throttle_every=args.throttle_every) as services:
+        print(f"{'scenario':<8} {'charts':>6} {'songs':>7} {'matched':>7} {'seconds':>8} {'songs/s':>8} "
+              f"{'API calls':>9} {'server 429s':>11} {'peak RSS':>9}")
+        for name in scenarios:
+            throttled_before = services.throttled
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                result = pool.submit(run_scenario, name, services.url, args.workers,
+                                     args.search_concurrency, args.rate_limited).result()
+            result['server_429s'] = services.throttled - throttled_before
+            results.append(result)
+            rss = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] else "n/a"
+            print(f"{name:<8} {result['charts']:>6} {result['songs']:>7} {result['matched']:>7} "
+                  f"{result['elapsed_seconds']:>8.2f} {result['songs_per_second']:>8.0f} "
+                  f"{result['api_calls']:>9} {result['server_429s']:>11} {rss:>9}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({result['scenario']: result for result in results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Local stand-ins for Billboard chart pages and the Spotify Web API endpoints the app uses.
+
+Chart pages are rendered from the saved fixture page with a synthetic but
+realistic chart for each week: every week a few songs drop off and new ones
+enter, so a backfill sees the same songs across many charts. Spotify search
+results are derived from the query, so the catalog never needs storing.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'hot-100-2016-07-16.html')
+
+CHART_SIZE = 100
+# New songs entering the chart each week; each song charts for about CHART_SIZE / CHURN weeks
+CHURN = 8
+
+FIXTURE_TITLE = re.compile(r'>(\s*)Song (?:&amp; )?Title (\d+)(\s*)<')
+FIXTURE_ARTIST = re.compile(r'>(\s*)Artist (\d+)(?: Featuring Guest \d+)?(\s*)</span>')
+SONG_ID = re.compile(r'\bsong (\d+)\b', re.IGNORECASE)
+
+
+def song_title(song_id):
+    return f"Song {song_id}"
+
+
+def song_artist(song_id):
+    artist = f"Artist {song_id % 701}"
+    if song_id % 5 == 0:
+        artist += f" Featuring Artist {song_id % 97}"
+    return artist
+
+
+def chart_songs(chart_date):
+    """The song IDs on the chart for `chart_date`, from rank 1 down."""
+    week = date.fromisoformat(chart_date).toordinal() // 7
+    window = range(week * CHURN, week * CHURN + CHART_SIZE)
+    # Shuffle ranks deterministically, with newer songs tending to rank higher
+    return sorted(window, key=lambda song: (week * CHURN + CHART_SIZE - song) * (1 + _hash(song, week) % 3))
+
+
+def _hash(*parts):
+    return int(hashlib.sha1(repr(parts).encode()).hexdigest()[:8], 16)
+
+
+def _spotify_id(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:22]
+
+
+def _track(song_id, name=None, artist=None):
+    return {
+        'uri': f"spotify:track:{_spotify_id('track', song_id, name)}",
+        'name': name or song_title(song_id),
+        'artists': [{'name': artist or song_artist(song_id).split(' Featuring ')[0]}],
+    }
+
+
+def search_results(query, limit):
+    """Candidates for a search query.
+
+    One song in 25 is not on Spotify, one in 10 is only found by a loose query
+    (no `track:` filter), and one in 7 comes back with a version suffix that
+    matching has to normalize. A decoy karaoke version is always included.
+    """
+    found = SONG_ID.search(query)
+    if not found:
+        return []
+    song_id = int(found.group(1))
+    if song_id % 25 == 0 or (song_id % 10 == 0 and 'track:' in query):
+        return []
+    name = song_title(song_id) + (" - Remastered 2011" if song_id % 7 == 0 else "")
+    items = [_track(song_id, f"{song_title(song_id)} (Karaoke Version)", "Karaoke Stars"), _track(song_id, name)]
+    if song_id % 2:
+        items.reverse()
+    return items[:limit]
+
+
+class FakeServices:
+    """A local HTTP server with Billboard chart pages and the Spotify endpoints the app calls.
+
+    `latency` seconds are added to every Spotify request, and every
+    `throttle_every`-th Spotify request is answered with a 429.
+    """
+
+    def __init__(self, latency=0.0, throttle_every=0, retry_after=0, page_size=50, fixture=FIXTURE):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.page_size = page_size
+        with open(fixture, encoding='utf-8') as f:
+            self._template = f.read()
+        self.requests = Counter()
+        self.throttled = 0
+        self.playlists = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        services = self
+
+        class Handler(RequestHandler):
+            pass
+        Handler.services = services
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def chart_page(self, chart_date):
+        songs = chart_songs(chart_date)
+
+        def title(match):
+            return f">{match.group(1)}{song_title(songs[int(match.group(2)) - 1])}{match.group(3)}<"
+
+        def artist(match):
+            return f">{match.group(1)}{song_artist(songs[int(match.group(2)) - 1])}{match.group(3)}</span>"
+
+        return FIXTURE_ARTIST.sub(artist, FIXTURE_TITLE.sub(title, self._template))
+
+    def count(self, endpoint):
+        """Count a Spotify request; returns True if it should be answered with a 429."""
+        with self._lock:
+            self.requests[endpoint] += 1
+            total = sum(self.requests.values())
+            if self.throttle_every and total % self.throttle_every == 0:
+                self.throttled += 1
+                return True
+        return False
+
+    def create_playlist(self, name):
+        with self._lock:
+            playlist_id = _spotify_id('playlist', len(self.playlists))
+            self.playlists[playlist_id] = {'name': name, 'uris': []}
+        return playlist_id
+
+    def add_items(self, playlist_id, uris, position=None):
+        with self._lock:
+            items = self.playlists[playlist_id]['uris']
+            position = len(items) if position is None else position
+            items[position:position] = uris
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    services = None
+    protocol_version = 'HTTP/1.1'
+    # Buffer each response so headers and body go out in one write (no Nagle delays)
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=()):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _page(self, items, params, path):
+        offset = int(params.get('offset', ['0'])[0])
+        limit = int(params.get('limit', [str(self.services.page_size)])[0])
+        page = items[offset:offset + limit]
+        more = offset + limit < len(items)
+        next_url = f"{self.services.url}{path}?offset={offset + limit}&limit={limit}" if more else None
+        return {'items': page, 'next': next_url, 'offset': offset, 'limit': limit, 'total': len(items)}
+
+    def _spotify(self, endpoint):
+        """Apply the configured latency and throttling; returns False if a 429 was sent."""
+        if self.services.latency:
+            time.sleep(self.services.latency)
+        if self.services.count(endpoint):
+            self._send(429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+                       headers=[('Retry-After', str(self.services.retry_after))])
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        path = url.path
+
+        chart = re.fullmatch(r'/charts/[\w-]+/(\d{4}-\d{2}-\d{2})/?', path)
+        if chart:
+            self._send(200, self.services.chart_page(chart.group(1)).encode('utf-8'), 'text/html; charset=utf-8')
+        elif path == '/v1/search':
+            if self._spotify('search'):
+                limit = int(params.get('limit', ['10'])[0])
+                self._send(200, {'tracks': {'items': search_results(params.get('q', [''])[0], limit), 'next': None}})
+        elif path.rstrip('/') == '/v1/me':
+            if self._spotify('me'):
+                self._send(200, {'id': 'benchuser', 'display_name': 'Benchmark User'})
+        elif path == '/v1/me/playlists':
+            if self._spotify('me/playlists'):
+                playlists = [{'id': playlist_id, 'name': playlist['name'], 'owner': {'id': 'benchuser'}}
+                             for playlist_id, playlist in list(self.services.playlists.items())]
+                self._send(200, self._page(playlists, params, path))
+        elif re.fullmatch(r'/v1/playlists/\w+/tracks', path):
+            if self._spotify('playlists/tracks:get'):
+                playlist = self.services.playlists.get(path.split('/')[3])
+                if playlist is None:
+                    self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+                else:
+                    items = [{'track': {'uri': uri}} for uri in playlist['uris']]
+                    self._send(200, self._page(items, params, path))
+        else:
+            self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        path = url.path
+        if re.fullmatch(r'/v1/users/\w+/playlists', path):
+            body = self._json_body()
+            if self._spotify('users/playlists'):
+                self._send(201, {'id': self.services.create_playlist(body.get('name'))})
+        elif re.fullmatch(r'/v1/playlists/\w+/tracks', path):
+            body = self._json_body()
+            if self._spotify('playlists/tracks:add'):
+                playlist_id = path.split('/')[3]
+                if playlist_id not in self.services.playlists:
+                    self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+                else:
+                    # spotipy sends the URIs as the body and the position as a query parameter
+                    uris = body if isinstance(body, list) else body.get('uris', [])
+                    position = params.get('position', [None])[0]
+                    self.services.add_items(playlist_id, uris, None if position is None else int(position))
+                    self._send(201, {'snapshot_id': _spotify_id('snapshot', time.time())})
+        else:
+            self._json_body()
+            self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
@@ -0,0 +1,97 @@
+# concurrency.py
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RetryAfterGate:
+    """Shared pause point so every worker backs off together after a 429."""
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def pause(self, seconds):
+        """Hold all callers of wait() for at least `seconds` from now."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+    def wait(self):
+        """Block until any active pause has elapsed."""
+        while True:
+            with self._lock:
+                remaining = self._resume_at - self._clock()
+            if remaining <= 0:
+                return
+            self._sleep(remaining)
+
+
+class AsyncRetryAfterGate:
+    """RetryAfterGate for coroutines: every task on the loop backs off together after a 429."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._resume_at = 0.0
+
+    def pause(self, seconds):
+        """Hold all callers of wait() for at least `seconds` from now."""
+        self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+    async def wait(self):
+        """Sleep until any active pause has elapsed."""
+        while True:
+            remaining = self._resume_at - self._clock()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+
+def retry_after_seconds(error, attempt, backoff_base=1.0):
+    """Return how long to wait after a 429, preferring the Retry-After header."""
+    headers = getattr(error, 'headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return backoff_base * (2 ** attempt)
+
+
+def bounded_map(fn, iterable, max_in_flight=8):
+    """Lazily map `fn` over `iterable` on a thread pool, yielding results in input order.
+
+    At most `max_in_flight` calls are pending at once, so the input is consumed
+    only as fast as results are taken and memory stays flat for long inputs.
+    """
+    max_in_flight = max(1, max_in_flight)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for item in iterable:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(pool.submit(fn, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+async def async_bounded_map(fn, iterable, max_in_flight=100):
+    """Async counterpart of bounded_map: run coroutine function `fn` over `iterable` as tasks.
+
+    Yields results in input order with at most `max_in_flight` tasks pending,
+    all on the running event loop's single thread.
+    """
+    max_in_flight = max(1, max_in_flight)
+    pending = deque()
+    try:
+        for item in iterable:
+            if len(pending) >= max_in_flight:
+                yield await pending.popleft()
+            pending.append(asyncio.ensure_future(fn(item)))
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,15 +1,56 @@
-# config.py
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+_env_loaded = False
+
+
+def _load_env():
+    """Load the .env file once, the first time a setting is read."""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+class Setting:
+    """A configuration value read from the environment when it is accessed."""
+
+    def __init__(self, name, default=None, cast=str):
+        self.name = name
+        self.default = default
+        self.cast = cast
+
+    def __get__(self, instance, owner):
+        _load_env()
+        value = os.getenv(self.name)
+        if value is None:
+            return self.default
+        return self.cast(value)
+
 
 class Config:
-    CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
-    CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
-    REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8000/callback")
+    CLIENT_ID = Setting("SPOTIFY_CLIENT_ID")
+    CLIENT_SECRET = Setting("SPOTIFY_CLIENT_SECRET")
+    REDIRECT_URI = Setting("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8000/callback")
     SCOPE = "user-read-private playlist-modify-public"
     USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:131.0) Gecko/20100101 Firefox/131.0"
+    # Market tracks are checked against; "from_token" uses the signed-in user's country
+    MARKET = Setting("SPOTIFY_MARKET", "from_token")
+    SEARCH_CACHE_PATH = Setting("SEARCH_CACHE_PATH", ".search_cache.sqlite")
+    SEARCH_CACHE_HIT_TTL = Setting("SEARCH_CACHE_HIT_TTL", 30 * 24 * 3600, int)
+    SEARCH_CACHE_MISS_TTL = Setting("SEARCH_CACHE_MISS_TTL", 24 * 3600, int)
+    PAGE_CACHE_DIR = Setting("PAGE_CACHE_DIR", ".page_cache")
+    # Where main.py journals each run so a failed one can resume
+    RUN_JOURNAL_DIR = Setting("RUN_JOURNAL_DIR", ".runs")
+    # Spotify requests per second for each endpoint class; unset uses rate_limit.DEFAULT_LIMITS
+    RATE_LIMIT_SEARCH = Setting("SPOTIFY_RATE_LIMIT_SEARCH", cast=float)
+    RATE_LIMIT_READ = Setting("SPOTIFY_RATE_LIMIT_READ", cast=float)
+    RATE_LIMIT_WRITE = Setting("SPOTIFY_RATE_LIMIT_WRITE", cast=float)
+    # Directory of shared bucket files, so several processes share one rate limit
+    RATE_LIMIT_DIR = Setting("SPOTIFY_RATE_LIMIT_DIR")
 
-    if not CLIENT_ID or not CLIENT_SECRET:
-        raise ValueError("SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET must be set in the environment or .env file")
\ No newline at end of file
+    @classmethod
+    def require_credentials(cls):
+        """Raise if the Spotify credentials are missing; only needed before calling the API."""
+        if not cls.CLIENT_ID or not cls.CLIENT_SECRET:
+            raise ValueError("SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET must be set in the environment or .env file")
@@ -0,0 +1,137 @@
+# fetcher.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+from instrumentation import metrics
+
+# A chart this many days past its date can no longer change
+FINAL_AFTER = timedelta(days=7)
+
+
+def pooled_session(pool_size=8, retries=3, backoff_factor=0.5):
+    """Build a requests session with a connection pool for `pool_size` workers and a retry policy."""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers["User-Agent"] = Config.USER_AGENT
+    return session
+
+
+class ChartFetcher:
+    """Fetches chart pages over a shared pooled session, caching them on disk.
+
+    Charts old enough to be final are served straight from the cache. More
+    recent ones are revalidated with ETag/Last-Modified conditional requests,
+    so an unchanged page costs a 304 instead of a full download.
+    """
+
+    def __init__(self, cache_dir=None, session=None, pool_size=8, retries=3, timeout=10, today=date.today):
+        self.cache_dir = cache_dir
+        self.session = session or pooled_session(pool_size, retries)
+        self.timeout = timeout
+        self._today = today
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.html"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, url):
+        if not self.cache_dir:
+            return None, {}
+        page_path, meta_path = self._paths(url)
+        try:
+            with open(page_path, encoding='utf-8') as f:
+                page = f.read()
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None, {}
+        return page, meta
+
+    def _store(self, url, page, meta):
+        if not self.cache_dir:
+            return
+        # Write to a temporary file first so concurrent readers never see half a page
+        for path, content in zip(self._paths(url), (page, json.dumps(meta))):
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    def discard(self, url):
+        """Drop the cached copy of a page, so the next fetch downloads it again."""
+        if not self.cache_dir:
+            return
+        for path in self._paths(url):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def is_final(self, chart_date):
+        """Whether a chart dated `chart_date` is old enough that it can no longer change."""
+        if chart_date is None:
+            return False
+        return date.fromisoformat(str(chart_date)) + FINAL_AFTER < self._today()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def fetch(self, url, chart_date=None):
+        """Return the page HTML, from the cache when possible. Raises requests exceptions."""
+        page, meta = self._load(url)
+        if page is not None and self.is_final(chart_date):
+            self._count('cache_hits')
+            metrics.count('page_cache_total', result='hit')
+            return page
+
+        headers = {}
+        if page is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with metrics.timer('http_fetch_seconds'):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and page is not None:
+            self._count('revalidated')
+            metrics.count('page_cache_total', result='revalidated')
+            return page
+        response.raise_for_status()
+
+        self._count('downloads')
+        metrics.count('page_cache_total', result='download')
+        self._store(url, response.text, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        })
+        return response.text
+
+    @property
+    def stats(self):
+        return {'cache_hits': self.cache_hits, 'revalidated': self.revalidated, 'downloads': self.downloads}
@@ -0,0 +1,196 @@
+# instrumentation.py
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds: 0.1 ms to ~2 minutes, each 2**0.25
+# (about 19%) wider than the last, so percentiles are accurate to within a bucket
+BUCKETS = tuple(0.0001 * 2 ** (i / 4) for i in range(81))
+# Every fourth of those (0.1 ms to ~105 s, doubling) is exported to Prometheus.
+# The set is fixed, so a scraped series never gains or loses buckets
+EXPORT_EVERY = 4
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; recording is O(log buckets) and memory is constant."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile (capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.sum,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Metrics:
+    """Thread-safe registry of counters and latency histograms, optionally labelled.
+
+    Names follow Prometheus conventions: counters end in `_total` and
+    histograms in `_seconds`.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def count(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe how long the `with` block takes, whether or not it raises."""
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self.clock() - started, **labels)
+
+    def timed_iter(self, name, iterable, **labels):
+        """Yield from `iterable`, observing the total time spent producing its items.
+
+        Time the consumer spends between items is not counted, so a generator
+        that parses lazily is measured on its own work only.
+        """
+        total = 0.0
+        iterator = iter(iterable)
+        try:
+            while True:
+                started = self.clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    total += self.clock() - started
+                yield item
+        finally:
+            self.observe(name, total, **labels)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        """A snapshot summary of one histogram, or None if nothing was observed."""
+        with self._lock:
+            histogram = self._histograms.get(_key(name, labels))
+            return histogram.summary() if histogram else None
+
+    def report(self):
+        """Every counter and histogram summary, keyed by name and label text."""
+        with self._lock:
+            return {
+                'counters': {name + _label_text(labels): value
+                             for (name, labels), value in sorted(self._counters.items())},
+                'histograms': {name + _label_text(labels): histogram.summary()
+                               for (name, labels), histogram in sorted(self._histograms.items())},
+            }
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, h.counts[:], h.count, h.sum) for key, h in sorted(self._histograms.items())]
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_label_text(labels)} {value}")
+
+        for (name, labels), counts, count, total in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for i, (bound, bucket_count) in enumerate(zip(BUCKETS, counts)):
+                cumulative += bucket_count
+                if i % EXPORT_EVERY == 0:
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', f'{bound:.6g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_label_text(labels)} {total}")
+            lines.append(f"{name}_count{_label_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the metrics to `path`: JSON for a .json file, Prometheus text otherwise."""
+        text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def print_report(self):
+        """Print the end-of-run timing report."""
+        report = self.report()
+        if report['histograms']:
+            width = max(len(name) for name in report['histograms'])
+            print(f"\n⏱️ Timings (ms){'':<{width - 11}} count      p50      p95      p99      max    total s")
+            for name, h in report['histograms'].items():
+                print(f"    {name:<{width}} {h['count']:>7} {h['p50'] * 1000:>8.1f} {h['p95'] * 1000:>8.1f} "
+                      f"{h['p99'] * 1000:>8.1f} {h['max'] * 1000:>8.1f} {h['total']:>10.2f}")
+        if report['counters']:
+            print("📈 Counters: " + ", ".join(f"{name}={value}" for name, value in report['counters'].items()))
+
+
+# The process-wide registry every component records into
+metrics = Metrics()
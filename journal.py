@@ -0,0 +1,110 @@
+# journal.py
+import json
+import os
+import re
+
+from tracks import Track, to_json
+
+
+class RunJournal:
+    """Append-only log of one chart-to-playlist run, replayed to resume it after a failure.
+
+    Each line is one JSON event: every chart row as it is parsed and then the
+    end of the chart, the track resolved for each row, the playlist once it
+    exists, every batch of tracks added to it (by offset into the run's URIs)
+    and finally the run's completion. A line torn by a crash mid-write is
+    ignored on replay.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []     # the chart rows journaled so far
+        self.scraped = False  # whether every row of the chart is journaled
+        self.tracks = {}      # row index -> resolved track (or None)
+        self.playlist_id = None
+        self.batches = {}     # offset of each committed batch -> tracks added
+        self.done = False
+        self._file = None
+        self._replay()
+
+    @classmethod
+    def for_run(cls, directory, chart, chart_date, name):
+        """The journal for one chart, date and playlist name in `directory`."""
+        slug = re.sub(r'[^\w-]+', '_', name).strip('_')
+        return cls(os.path.join(directory, f"{chart}-{chart_date}-{slug}.jsonl"))
+
+    @property
+    def started(self):
+        return bool(self.records)
+
+    def _replay(self):
+        try:
+            f = open(self.path, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                kind = event.get('event')
+                if kind == 'row':
+                    self.records.append(event['record'])
+                elif kind == 'scraped':
+                    self.scraped = True
+                elif kind == 'resolved':
+                    self.tracks[event['index']] = Track.from_dict(event['track'])
+                elif kind == 'playlist':
+                    self.playlist_id = event['playlist_id']
+                elif kind == 'batch':
+                    self.batches[event['offset']] = event['count']
+                elif kind == 'done':
+                    self.done = True
+
+    def _append(self, event, sync=False):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':'), default=to_json) + '\n')
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def record_row(self, record):
+        self.records.append(record)
+        self._append({'event': 'row', 'record': record})
+
+    def record_scraped(self):
+        self.scraped = True
+        self._append({'event': 'scraped'})
+
+    def record_track(self, index, track):
+        self.tracks[index] = track
+        self._append({'event': 'resolved', 'index': index, 'track': track})
+
+    def record_playlist(self, playlist_id):
+        # Synced to disk: losing this line would create a second playlist on resume
+        self.playlist_id = playlist_id
+        self._append({'event': 'playlist', 'playlist_id': playlist_id}, sync=True)
+
+    def record_batch(self, offset, count):
+        self.batches[offset] = count
+        self._append({'event': 'batch', 'offset': offset, 'count': count}, sync=True)
+
+    def finish(self):
+        self.done = True
+        self._append({'event': 'done'}, sync=True)
+
+    def discard(self):
+        """Forget the journaled run and start an empty journal."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.records, self.scraped, self.tracks = [], False, {}
+        self.playlist_id, self.batches, self.done = None, {}, False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,48 +1,107 @@
 # main.py
-from scraper import BillboardScraper
+import argparse
+
+from fetcher import ChartFetcher
+from scraper import DEFAULT_CHART, BillboardScraper, CHARTS, get_chart
 from spotify_client import SpotifyClient
 from playlist_manager import PlaylistManager
+from pipeline import journaled_chart_to_playlist
+from journal import RunJournal
+from config import Config
+from instrumentation import metrics
 
-def main():
-    date = "2016-07-12"
-    print(f"🔍 Fetching Billboard Hot 100 for {date}...")
 
-    # Step 1: Scrape songs
-    scraper = BillboardScraper(date)
-    song_titles = scraper.scrape_songs()
-    if not song_titles:
+def sync(date, sp_client, name, playlist_id=None, chart=DEFAULT_CHART):
+    """Update an existing chart playlist in place instead of creating a new one."""
+    scraper = BillboardScraper(date, fetcher=ChartFetcher(Config.PAGE_CACHE_DIR), chart=chart)
+    entries = scraper.scrape_entries()
+    if not entries:
         print("❌ No songs found. Check the URL or HTML structure.")
-        return
+        return None
+
+    print(f"🎶 Found {len(entries)} songs.")
+    tracks = sp_client.search_tracks([(entry.title, entry.artist) for entry in entries])
+    print(f"🔎 Successfully matched {sum(1 for t in tracks if t)} out of {len(entries)} songs.")
+    return PlaylistManager.sync_playlist(
+        sp_client=sp_client,
+        song_data=tracks,
+        name=name,
+        description=f"Top songs from {scraper.chart.name} on {date}",
+        playlist_id=playlist_id
+    )
 
-    print(f"🎶 Found {len(song_titles)} songs.")
 
-    # Step 2: Search on Spotify
+def stream(date, sp_client, name, chart=DEFAULT_CHART, fresh=False):
+    """Scrape, search and add tracks 100 at a time, resuming an unfinished run of the same playlist.
+
+    Every step is journaled in Config.RUN_JOURNAL_DIR; with `fresh`, any
+    unfinished run is forgotten and a new playlist is created.
+    """
+    scraper = BillboardScraper(date, fetcher=ChartFetcher(Config.PAGE_CACHE_DIR), chart=chart)
+    journal = RunJournal.for_run(Config.RUN_JOURNAL_DIR, chart, date, name)
+    if fresh or journal.done:
+        journal.discard()
+    elif journal.started:
+        print(f"↩️ Resuming the unfinished run in {journal.path} "
+              f"({len(journal.tracks)} songs resolved, {len(journal.batches)} batches added).")
     try:
-        sp_client = SpotifyClient()
+        summary = journaled_chart_to_playlist(
+            scraper=scraper,
+            sp_client=sp_client,
+            name=name,
+            journal=journal,
+            description=f"Top songs from {scraper.chart.name} on {date}"
+        )
+    finally:
+        journal.close()
+    if not summary['songs']:
+        print("❌ No songs found. Check the URL or HTML structure.")
+        return summary
+
+    print(f"\n🔎 Search complete. Successfully matched {summary['matched']} out of {summary['songs']} songs.")
+    matches = sp_client.match_report.summary()
+    print(f"🎯 Match rate: {matches['match_rate']:.0%}, {matches['average_calls']:.2f} search calls per song "
+          f"(calls per song: {matches['calls_per_song']}).")
+    stats = sp_client.cache.stats
+    print(f"🗃️ Search cache: {stats['hits'] + stats['negative_hits']} hits, {stats['misses']} misses.")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create a Spotify playlist from a Billboard chart.")
+    parser.add_argument("date", nargs="?", default="2016-07-12", help="Chart date (YYYY-MM-DD)")
+    parser.add_argument("--chart", choices=CHARTS, default=DEFAULT_CHART, help="Chart to use (default: %(default)s)")
+    parser.add_argument("--sync", action="store_true",
+                        help="Update an existing playlist with only the changed tracks")
+    parser.add_argument("--name", help="Playlist name (default: '<chart name> - <date>')")
+    parser.add_argument("--playlist-id", help="Playlist to sync, instead of looking it up by name")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Start over instead of resuming an unfinished run for the same playlist")
+    parser.add_argument("--metrics-file",
+                        help="Also write the run's metrics here (JSON for a .json file, else Prometheus text)")
+    args = parser.parse_args(argv)
+
+    date = args.date
+    chart = get_chart(args.chart)
+    name = args.name or f"{chart.name} - {date}"
+    print(f"🔍 Fetching {chart.name} for {date}...")
+
+    try:
+        sp_client = SpotifyClient.from_config()
     except Exception as e:
         print(f"❌ Spotify client initialization failed. Check your credentials. {e}")
         return
-    matched_tracks = []
 
-    for i, title in enumerate(song_titles, 1):
-        print(f"[{i}/{len(song_titles)}] Searching: {title}")
-        result = sp_client.search_track(title)
-        if result:
-            print(f"    -> Found: {result['name']} by {result['artist']}")
+    try:
+        if args.sync or args.playlist_id:
+            sync(date, sp_client, name, args.playlist_id, chart=args.chart)
         else:
-            print(f"    -> Not found on Spotify.")
-        matched_tracks.append(result)
-
-    successful_matches = [t for t in matched_tracks if t is not None]
-    print(f"\n🔎 Search complete. Successfully matched {len(successful_matches)} out of {len(song_titles)} songs.")
+            stream(date, sp_client, name, chart=args.chart, fresh=args.fresh)
+    finally:
+        metrics.print_report()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
 
-    # Step 3: Create playlist
-    PlaylistManager.create_playlist(
-        sp_client=sp_client,
-        song_data=matched_tracks,
-        name=f"Billboard Hot 100 - {date}",
-        description=f"Top songs from Billboard on {date}"
-    )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,145 @@
+# matching.py
+import re
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+
+from scraper import primary_artist
+
+# Parenthesised or bracketed notes such as "(feat. X)", "[Remastered 2011]", "(Radio Edit)"
+VERSION_NOTE = re.compile(
+    r'\s*[\(\[][^\)\]]*\b(?:feat|ft|featuring|with|remaster(?:ed)?|live|version|edit|mono|stereo|mix|remix)\b[^\)\]]*[\)\]]',
+    re.IGNORECASE
+)
+# Dash suffixes such as " - Remastered 2011" or " - Single Version"
+VERSION_SUFFIX = re.compile(
+    r'\s+-\s+.*\b(?:remaster(?:ed)?|live|version|edit|mono|stereo|mix|remix)\b.*$',
+    re.IGNORECASE
+)
+FEATURING = re.compile(r'\s+(?:feat|ft|featuring)\b\.?\s.*$', re.IGNORECASE)
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+# Minimum score for a candidate to count as a match
+MATCH_THRESHOLD = 0.75
+TITLE_WEIGHT = 0.6
+
+
+def normalize_title(title):
+    """Lower-case a track title and strip featured artists, version tags and punctuation."""
+    title = VERSION_NOTE.sub('', title or '')
+    title = VERSION_SUFFIX.sub('', title)
+    title = FEATURING.sub('', title)
+    return _normalize(title)
+
+
+def normalize_artist(artist):
+    """Lower-case the lead artist of a credit and strip punctuation."""
+    return _normalize(primary_artist(artist) or '')
+
+
+def _normalize(text):
+    text = text.lower().replace('&', ' and ').replace("'", '')
+    return ' '.join(PUNCTUATION.sub(' ', text).split())
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score_candidate(title, artist, track):
+    """Score how well a Spotify track matches a chart title and artist, from 0 to 1."""
+    title_score = similarity(normalize_title(title), normalize_title(track['name']))
+    if not artist:
+        return title_score
+    # Both the full credit ("Simon & Garfunkel") and its lead artist, for featured credits
+    wanted = {_normalize(artist), normalize_artist(artist)}
+    artist_score = max(
+        (similarity(w, _normalize(a['name'])) for a in track.get('artists', []) for w in wanted),
+        default=0.0
+    )
+    return TITLE_WEIGHT * title_score + (1 - TITLE_WEIGHT) * artist_score
+
+
+def best_candidate(title, artist, tracks, threshold=MATCH_THRESHOLD):
+    """Return (track, score) for the best candidate above `threshold`, or (None, best_score)."""
+    best, best_score = None, 0.0
+    for track in tracks:
+        score = score_candidate(title, artist, track)
+        if score > best_score:
+            best, best_score = track, score
+    if best_score < threshold:
+        return None, best_score
+    return best, best_score
+
+
+def query_ladder(title, artist=None):
+    """Return search queries from strictest to loosest, without duplicates."""
+    lead = primary_artist(artist)
+    clean_title = normalize_title(title)
+    clean_artist = normalize_artist(artist)
+
+    if lead:
+        queries = [
+            f"track:{title} artist:{lead}",
+            f"{clean_title} {clean_artist}",
+            f"track:{clean_title}",
+        ]
+    else:
+        queries = [f"track:{title}", clean_title]
+    return [q for q in dict.fromkeys(q.strip() for q in queries) if q and q != 'track:']
+
+
+def match_steps(title, artist=None, max_calls=3):
+    """Walk the query ladder for one song, shared by the sync and async clients.
+
+    A generator: it yields each query to search and is sent back that
+    query's candidate tracks (Spotify track objects), stopping at the first
+    good enough candidate. Its return value is that candidate, or None.
+    """
+    for query in query_ladder(title, artist)[:max_calls]:
+        candidates = yield query
+        track, _ = best_candidate(title, artist, candidates)
+        if track is not None:
+            return track
+    return None
+
+
+class MatchReport:
+    """Thread-safe tally of match outcomes and the search calls spent per song."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.songs = 0
+        self.matched = 0
+        self.calls = 0
+        self.calls_per_song = Counter()
+
+    def record(self, result, calls):
+        with self._lock:
+            self.songs += 1
+            self.matched += result is not None
+            self.calls += calls
+            self.calls_per_song[calls] += 1
+
+    @property
+    def match_rate(self):
+        return self.matched / self.songs if self.songs else 0.0
+
+    @property
+    def average_calls(self):
+        return self.calls / self.songs if self.songs else 0.0
+
+    def summary(self):
+        with self._lock:
+            return {
+                'songs': self.songs,
+                'matched': self.matched,
+                'match_rate': self.match_rate,
+                'calls': self.calls,
+                'average_calls': self.average_calls,
+                'calls_per_song': dict(sorted(self.calls_per_song.items())),
+            }
@@ -0,0 +1,163 @@
+# pipeline.py
+import requests
+
+from concurrency import bounded_map
+from playlist_manager import BatchWriter, PlaylistManager
+from records import entry_to_record, record_to_entry
+
+# Returned by match_track in place of None when a search failed rather than found nothing
+SEARCH_FAILED = object()
+
+
+def stream_chart_to_playlist(scraper, sp_client, name, description="",
+                             max_concurrency=8, batch_size=100):
+    """Scrape, search and add songs as a single streaming pipeline.
+
+    Chart rows are searched as soon as they are parsed, and matched tracks are
+    added to the playlist each time a batch fills. Returns a summary dict.
+    """
+    summary = {'songs': 0, 'matched': 0, 'playlist_id': None}
+
+    def entries():
+        try:
+            yield from scraper.iter_entries()
+        except requests.exceptions.RequestException as e:
+            print(f"Network error while fetching Billboard page: {e}")
+        except Exception as e:
+            print(f"Error scraping Billboard: {e}")
+
+    def report(pairs):
+        for entry, result in pairs:
+            summary['songs'] += 1
+            label = f"#{entry.rank} {entry.title} - {entry.artist}"
+            if result:
+                summary['matched'] += 1
+                print(f"{label} -> Found: {result['name']} by {result['artist']}")
+            else:
+                print(f"{label} -> Not found on Spotify.")
+            yield result
+
+    def search(entry):
+        return entry, sp_client.match_track(entry.title, entry.artist)
+
+    pairs = bounded_map(search, entries(), max_concurrency)
+
+    summary['playlist_id'] = PlaylistManager.stream_playlist(
+        sp_client=sp_client,
+        tracks=report(pairs),
+        name=name,
+        description=description,
+        batch_size=batch_size
+    )
+    return summary
+
+
+def journaled_chart_to_playlist(scraper, sp_client, name, journal, description="",
+                                max_concurrency=8, batch_size=100):
+    """Stream a chart into a playlist like stream_chart_to_playlist, recording each step in a RunJournal.
+
+    Rows are journaled as they are parsed, tracks as they are resolved and
+    batches once they are added, so a rerun reuses whatever the journal holds
+    and never creates a second playlist or repeats finished work. Batches are
+    keyed by their offset into the run's matched URIs, and a missing batch is
+    written at the position it would have had. A failed search is not
+    journaled: the tracks after it, like the last partial batch of a chart
+    whose scrape didn't finish, wait for the rerun. Returns a summary dict
+    like stream_chart_to_playlist.
+    """
+    summary = {'songs': 0, 'matched': 0, 'playlist_id': None}
+
+    def entries():
+        if journal.scraped:
+            yield from (record_to_entry(record) for record in journal.records)
+            return
+        try:
+            for index, entry in enumerate(scraper.iter_entries()):
+                # A resumed run parses the page again; rows already journaled are not repeated
+                if index >= len(journal.records):
+                    journal.record_row(entry_to_record(scraper.date, entry, chart=scraper.chart.slug))
+                yield entry
+        except requests.exceptions.RequestException as e:
+            print(f"Network error while fetching Billboard page: {e}")
+            return
+        except Exception as e:
+            print(f"Error scraping Billboard: {e}")
+            return
+        if journal.records:
+            journal.record_scraped()
+
+    def search(item):
+        index, entry = item
+        if index in journal.tracks:
+            return index, entry, journal.tracks[index]
+        return index, entry, sp_client.match_track(entry.title, entry.artist, on_error=SEARCH_FAILED)
+
+    uris = []
+    writer = None
+    failed = 0
+    held = False  # once set, later tracks are left for the next run
+
+    def add(offset):
+        """Write the batch at `offset` unless it is journaled; False if the playlist couldn't be created."""
+        nonlocal writer
+        if offset in journal.batches:
+            return True
+        if journal.playlist_id is None:
+            try:
+                journal.record_playlist(PlaylistManager._create_empty(sp_client, name, description))
+            except Exception as e:
+                print(f"Failed to create playlist: {e}")
+                return False
+        if writer is None:
+            writer = BatchWriter(sp_client, journal.playlist_id, batch_size=batch_size)
+        # Insert after every committed batch that comes before this one
+        writer.position = sum(count for start, count in journal.batches.items() if start < offset)
+        result = writer.add_batch(uris[offset:offset + batch_size])
+        if result.added:
+            journal.record_batch(offset, len(result.uris))
+        return True
+
+    for index, entry, result in bounded_map(search, enumerate(entries()), max_concurrency):
+        summary['songs'] += 1
+        label = f"#{entry.rank} {entry.title} - {entry.artist}"
+        if result is SEARCH_FAILED:
+            # Not journaled, so the next run searches it again
+            failed += 1
+            held = True
+            print(f"{label} -> Search failed.")
+            continue
+        if index not in journal.tracks:
+            journal.record_track(index, result)
+            if result:
+                print(f"{label} -> Found: {result['name']} by {result['artist']}")
+            else:
+                print(f"{label} -> Not found on Spotify.")
+        if not result:
+            continue
+        summary['matched'] += 1
+        if not held:
+            uris.append(result['uri'])
+            if len(uris) % batch_size == 0:
+                held = not add(len(uris) - batch_size)
+
+    if not summary['songs']:
+        return summary
+    if journal.scraped and not held:
+        if not uris:
+            print("❌ No valid tracks to add.")
+            return summary
+        if len(uris) % batch_size:
+            held = not add(len(uris) - len(uris) % batch_size)
+    summary['playlist_id'] = journal.playlist_id
+
+    added = sum(journal.batches.values())
+    if failed:
+        print(f"⚠️ {failed} searches failed; run again to retry them.")
+    if journal.scraped and not held and added == len(uris):
+        journal.finish()
+        print(f"✅ Added {len(uris)} tracks.")
+    else:
+        print(f"⚠️ {added} of {summary['matched']} tracks are in the playlist; run again to add the rest.")
+    if journal.playlist_id:
+        print(f"🎧 Listen at: https://open.spotify.com/playlist/{journal.playlist_id}")
+    return summary
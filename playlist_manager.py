@@ -1,22 +1,215 @@
 # playlist_manager.py
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import List, Optional
 
+import requests
 import spotipy
 
+from concurrency import bounded_map, retry_after_seconds
+from instrumentation import metrics
+
+# Spotify accepts at most 100 items per add or remove request
+MAX_ITEMS_PER_REQUEST = 100
+# Statuses worth retrying; anything else (403, 404, ...) fails the batch immediately.
+# 429s are not here: SpotifyClient._call already retries them for every call.
+RETRYABLE_STATUSES = frozenset({500, 502, 503, 504})
+
+
+@dataclass
+class BatchResult:
+    """Outcome of adding one batch of tracks to a playlist."""
+    number: int
+    position: Optional[int]
+    uris: List[str] = field(repr=False)
+    added: bool = False
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+class BatchWriter:
+    """Adds tracks to a playlist in batches, retrying transient failures.
+
+    Ordered writes insert each batch at an explicit position right after the
+    last batch that landed, so a retried batch never ends up out of place.
+    Unordered writes append up to `max_in_flight` batches concurrently.
+    Rate limits (429) are retried by the client itself, under its shared backoff;
+    server errors are retried here, since spotipy's session never resends a write.
+    """
+
+    def __init__(self, sp_client, playlist_id, start_position=0, batch_size=MAX_ITEMS_PER_REQUEST,
+                 max_retries=3, backoff_base=1.0, sleep=time.sleep):
+        self.sp_client = sp_client
+        self.playlist_id = playlist_id
+        self.position = start_position
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._sleep = sleep
+        self.results = []
+
+    @property
+    def added(self):
+        return sum(len(result.uris) for result in self.results if result.added)
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.added]
+
+    def _send(self, result):
+        for attempt in range(self.max_retries + 1):
+            result.attempts += 1
+            if attempt:
+                metrics.count('batch_retries_total')
+            self.sp_client.backoff.wait()
+            try:
+                with metrics.timer('batch_add_seconds'):
+                    if result.position is None:
+                        self.sp_client.sp.playlist_add_items(self.playlist_id, result.uris)
+                    else:
+                        self.sp_client.sp.playlist_add_items(self.playlist_id, result.uris, position=result.position)
+                result.added, result.error = True, None
+                return result
+
+            except spotipy.SpotifyException as e:
+                result.error = str(e)
+                if e.http_status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    break
+                self._sleep(retry_after_seconds(e, attempt, self.backoff_base))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                result.error = str(e)
+                if attempt == self.max_retries:
+                    break
+                self._sleep(self.backoff_base * (2 ** attempt))
+            except Exception as e:
+                result.error = str(e)
+                print(f"Unexpected error adding batch {result.number}: {e}")
+                return result
+
+        metrics.count('batch_failures_total')
+        print(f"Error adding batch {result.number} to playlist: {result.error}")
+        return result
+
+    def add_batch(self, uris):
+        """Insert one batch after everything added so far; returns its BatchResult."""
+        result = self._send(BatchResult(len(self.results) + 1, self.position, list(uris)))
+        if result.added:
+            self.position += len(result.uris)
+        self.results.append(result)
+        return result
+
+    def write(self, uris, ordered=True, max_in_flight=4):
+        """Add all `uris` in batches and return the BatchResult of each batch."""
+        batches = [uris[i:i + self.batch_size] for i in range(0, len(uris), self.batch_size)]
+        if ordered:
+            return [self.add_batch(batch) for batch in batches]
+
+        first = len(self.results) + 1
+        pending = (BatchResult(number, None, batch) for number, batch in enumerate(batches, first))
+        results = list(bounded_map(self._send, pending, max_in_flight))
+        self.results.extend(results)
+        return results
+
+
+def _longest_increasing_run(values):
+    """Return the indexes of one longest strictly increasing subsequence of `values`."""
+    tails, tail_indexes, previous = [], [], [None] * len(values)
+    for i, value in enumerate(values):
+        k = bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_indexes.append(i)
+        else:
+            tails[k] = value
+            tail_indexes[k] = i
+        previous[i] = tail_indexes[k - 1] if k else None
+    run, i = [], tail_indexes[-1] if tail_indexes else None
+    while i is not None:
+        run.append(i)
+        i = previous[i]
+    return run[::-1]
+
+
+def plan_sync(current, desired):
+    """Work out the fewest playlist edits that turn `current` into `desired`.
+
+    Both arguments are lists of track URIs; repeated URIs in `desired` are
+    kept once. Returns a dict with:
+      - removals: (uri, position) pairs, positions taken from `current`
+      - moves: (range_start, insert_before) reorders, applied after the removals
+      - additions: (position, uris) runs, applied in order after the moves
+    """
+    desired = list(dict.fromkeys(desired))
+    wanted = set(desired)
+
+    kept, kept_set, removals = [], set(), []
+    for position, uri in enumerate(current):
+        if uri in wanted and uri not in kept_set:
+            kept.append(uri)
+            kept_set.add(uri)
+        else:
+            removals.append((uri, position))
+
+    # Tracks on the longest run already in the right order stay put; the rest
+    # are moved, one at a time, to just after their predecessor in `desired`.
+    kept_desired = [uri for uri in desired if uri in kept_set]
+    target = {uri: i for i, uri in enumerate(kept_desired)}
+    in_place = {kept[i] for i in _longest_increasing_run([target[uri] for uri in kept])}
+    order, moves = list(kept), []
+    for i, uri in enumerate(kept_desired):
+        if uri in in_place:
+            continue
+        range_start = order.index(uri)
+        insert_before = order.index(kept_desired[i - 1]) + 1 if i else 0
+        moves.append((range_start, insert_before))
+        order.pop(range_start)
+        order.insert(insert_before - 1 if range_start < insert_before else insert_before, uri)
+
+    additions, run = [], None
+    for position, uri in enumerate(desired):
+        if uri in kept_set:
+            run = None
+            continue
+        if run is None or len(run[1]) >= MAX_ITEMS_PER_REQUEST:
+            run = (position, [])
+            additions.append(run)
+        run[1].append(uri)
+
+    return {'removals': removals, 'moves': moves, 'additions': additions}
+
 
 class PlaylistManager:
+    BATCH_SIZE = MAX_ITEMS_PER_REQUEST
+
+    @staticmethod
+    def _create_empty(sp_client, name, description, user_id=None):
+        user_id = user_id or sp_client.sp.current_user()["id"]
+        playlist = sp_client.sp.user_playlist_create(
+            user=user_id,
+            name=name,
+            public=True,
+            description=description
+        )
+        playlist_id = playlist['id']
+        print(f"✅ Playlist created: {name} (ID: {playlist_id})")
+        return playlist_id
+
+    @staticmethod
+    def _report_batches(writer, total):
+        failed = writer.failed
+        if failed:
+            print(f"⚠️ Added {writer.added} of {total} tracks; "
+                  f"{len(failed)} of {len(writer.results)} batches failed "
+                  f"(batches {', '.join(str(result.number) for result in failed)}).")
+        else:
+            print(f"✅ Added {writer.added} tracks.")
+
     @staticmethod
     def create_playlist(sp_client, song_data, name="Billboard Playlist", description=""):
         """Create a playlist and add tracks."""
         try:
-            user_id = sp_client.sp.current_user()["id"]
-            playlist = sp_client.sp.user_playlist_create(
-                user=user_id,
-                name=name,
-                public=True,
-                description=description
-            )
-            playlist_id = playlist['id']
-            print(f"✅ Playlist created: {name} (ID: {playlist_id})")
+            playlist_id = PlaylistManager._create_empty(sp_client, name, description)
 
             # Collect URIs
             # This handles cases where search_track returned None
@@ -27,29 +220,165 @@ class PlaylistManager:
                 print("❌ No valid tracks to add.")
                 return playlist_id
 
-            # Add in batches of 100
-            total_tracks_added = 0 
-            for i in range(0, len(uris), 100):
-                batch = uris[i:i+100]
-                try:
-                    sp_client.sp.playlist_add_items(playlist_id, batch)
-                    total_tracks_added += len(batch)
-                    
-                except spotipy.SpotifyException as e:
-                    print(f"Error adding batch {i//100 + 1} to playlist: {e}")
-                    # Decide whether to continue or stop on error
-                except Exception as e:
-                    print(f"Unexpected error adding batch {i//100 + 1}: {e}")
-
-            print(f"✅ Added {len(uris)} tracks.")
+            # Add in batches of 100, retrying transient failures
+            writer = BatchWriter(sp_client, playlist_id)
+            writer.write(uris)
+            PlaylistManager._report_batches(writer, len(uris))
+
+            print(f"🎧 Listen at: https://open.spotify.com/playlist/{playlist_id}")
+            return playlist_id
+
+        except spotipy.SpotifyException as e:
+            print(f"Spotify API error creating playlist: {e}")
+            return None
+
+        except Exception as e:
+            print(f"Failed to create playlist: {e}")
+            return None
+
+    @staticmethod
+    def stream_playlist(sp_client, tracks, name="Billboard Playlist", description="", batch_size=BATCH_SIZE):
+        """Create a playlist from a stream of tracks, adding each batch as soon as it fills.
+
+        The playlist is created when the first matched track arrives, so only one
+        batch of URIs is held in memory at a time. Returns the playlist ID, or
+        None if nothing matched or the playlist could not be created.
+        """
+        try:
+            writer = None
+            batch = []
+            total = 0
+
+            for track in tracks:
+                if track is None:
+                    continue
+                if writer is None:
+                    writer = BatchWriter(sp_client, PlaylistManager._create_empty(sp_client, name, description))
+                batch.append(track['uri'])
+                total += 1
+                if len(batch) >= batch_size:
+                    writer.add_batch(batch)
+                    batch = []
 
+            if writer is None:
+                print("❌ No valid tracks to add.")
+                return None
+
+            if batch:
+                writer.add_batch(batch)
+
+            playlist_id = writer.playlist_id
+            PlaylistManager._report_batches(writer, total)
             print(f"🎧 Listen at: https://open.spotify.com/playlist/{playlist_id}")
             return playlist_id
 
         except spotipy.SpotifyException as e:
             print(f"Spotify API error creating playlist: {e}")
             return None
-        
+
         except Exception as e:
             print(f"Failed to create playlist: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def find_playlist(sp_client, name, user_id):
+        """Return the ID of the user's own playlist called `name`, or None."""
+        page = sp_client.sp.current_user_playlists(limit=50)
+        while page:
+            for playlist in page['items']:
+                if playlist['name'] == name and playlist['owner']['id'] == user_id:
+                    return playlist['id']
+            page = sp_client.sp.next(page) if page.get('next') else None
+        return None
+
+    @staticmethod
+    def fetch_playlist_uris(sp_client, playlist_id):
+        """Return the URIs of every track in a playlist, following pagination."""
+        uris = []
+        page = sp_client.sp.playlist_items(
+            playlist_id, fields='items(track(uri)),next', additional_types=('track',), limit=100
+        )
+        while page:
+            uris.extend(item['track']['uri'] for item in page['items'] if item.get('track'))
+            page = sp_client.sp.next(page) if page.get('next') else None
+        return uris
+
+    @staticmethod
+    def sync_playlist(sp_client, song_data, name="Billboard Playlist", description="", playlist_id=None):
+        """Bring a playlist in line with `song_data` using as few write calls as possible.
+
+        The playlist is looked up by `playlist_id`, or else by name among the
+        user's playlists, and created only if it doesn't exist. Returns a report
+        of the edits made, or None if the sync failed.
+        """
+        try:
+            user_id = sp_client.sp.current_user()["id"]
+            if playlist_id is None:
+                playlist_id = PlaylistManager.find_playlist(sp_client, name, user_id)
+
+            write_calls = 0
+            if playlist_id is None:
+                playlist_id = PlaylistManager._create_empty(sp_client, name, description, user_id)
+                write_calls += 1
+                current = []
+            else:
+                current = PlaylistManager.fetch_playlist_uris(sp_client, playlist_id)
+
+            desired = list(dict.fromkeys(track['uri'] for track in song_data if track is not None))
+            plan = plan_sync(current, desired)
+            diff_calls = (
+                -(-len(plan['removals']) // MAX_ITEMS_PER_REQUEST) + len(plan['moves']) + len(plan['additions'])
+            )
+            # A full replace costs one call per 100 tracks; use it when the diff would cost more
+            replace_calls = max(1, -(-len(desired) // MAX_ITEMS_PER_REQUEST))
+
+            if current and replace_calls < diff_calls:
+                strategy = 'replace'
+                sp_client.sp.playlist_replace_items(playlist_id, desired[:MAX_ITEMS_PER_REQUEST])
+                write_calls += 1
+                for i in range(MAX_ITEMS_PER_REQUEST, len(desired), MAX_ITEMS_PER_REQUEST):
+                    sp_client.sp.playlist_add_items(playlist_id, desired[i:i + MAX_ITEMS_PER_REQUEST])
+                    write_calls += 1
+            else:
+                strategy = 'diff'
+                # Remove from the end backwards so earlier positions stay valid
+                removals = sorted(plan['removals'], key=lambda removal: removal[1], reverse=True)
+                for i in range(0, len(removals), MAX_ITEMS_PER_REQUEST):
+                    items = {}
+                    for uri, position in removals[i:i + MAX_ITEMS_PER_REQUEST]:
+                        items.setdefault(uri, []).append(position)
+                    sp_client.sp.playlist_remove_specific_occurrences_of_items(
+                        playlist_id, [{'uri': uri, 'positions': positions} for uri, positions in items.items()]
+                    )
+                    write_calls += 1
+
+                for range_start, insert_before in plan['moves']:
+                    sp_client.sp.playlist_reorder_items(
+                        playlist_id, range_start=range_start, insert_before=insert_before
+                    )
+                    write_calls += 1
+
+                for position, uris in plan['additions']:
+                    sp_client.sp.playlist_add_items(playlist_id, uris, position=position)
+                    write_calls += 1
+
+            report = {
+                'playlist_id': playlist_id,
+                'strategy': strategy,
+                'added': sum(len(uris) for _, uris in plan['additions']),
+                'removed': len(plan['removals']),
+                'moved': len(plan['moves']),
+                'write_calls': write_calls,
+            }
+            print(f"✅ Synced playlist {name} (ID: {playlist_id}): {report['added']} added, "
+                  f"{report['removed']} removed, {report['moved']} moved in {write_calls} write calls.")
+            print(f"🎧 Listen at: https://open.spotify.com/playlist/{playlist_id}")
+            return report
+
+        except spotipy.SpotifyException as e:
+            print(f"Spotify API error syncing playlist: {e}")
+            return None
+
+        except Exception as e:
+            print(f"Failed to sync playlist: {e}")
+            return None
@@ -0,0 +1,212 @@
+# rate_limit.py
+import os
+import threading
+import time
+from collections import defaultdict
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Requests per second and burst size for each endpoint class. Spotify doesn't
+# publish its limits (they apply over a rolling 30 second window), so these
+# stay comfortably below the rates where 429s start.
+DEFAULT_LIMITS = {
+    'search': (10.0, 20),
+    'read': (10.0, 20),
+    'write': (5.0, 10),
+}
+
+# spotipy methods that aren't reads, by endpoint class
+ENDPOINT_CLASSES = {
+    'search': 'search',
+    'user_playlist_create': 'write',
+    'playlist_add_items': 'write',
+    'playlist_replace_items': 'write',
+    'playlist_reorder_items': 'write',
+    'playlist_remove_specific_occurrences_of_items': 'write',
+    'playlist_remove_all_occurrences_of_items': 'write',
+    'playlist_change_details': 'write',
+}
+
+
+def endpoint_class(method_name):
+    """The limit class ('search', 'read' or 'write') a spotipy method is counted against."""
+    return ENDPOINT_CLASSES.get(method_name, 'read')
+
+
+def _refill(tokens, updated, now, rate, capacity):
+    """Take one token from a bucket; returns (tokens, seconds to wait before using it).
+
+    The token is reserved even when the bucket is empty, so concurrent callers
+    queue up behind each other instead of all waking at the same moment.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate) - 1
+    return tokens, max(0.0, -tokens / rate)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts of `capacity`."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def reserve(self):
+        """Take a token without blocking; returns the seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens, delay = _refill(self._tokens, self._updated, now, self.rate, self.capacity)
+            self._updated = now
+        return delay
+
+    def acquire(self):
+        """Block until a call is allowed; returns the seconds spent waiting."""
+        delay = self.reserve()
+        if delay:
+            self._sleep(delay)
+        return delay
+
+
+class FileTokenBucket:
+    """Token bucket whose state lives in a locked file, shared by every process using `path`.
+
+    Uses wall-clock time, since monotonic clocks aren't comparable across processes.
+    """
+
+    def __init__(self, path, rate, capacity=None, clock=time.time, sleep=time.sleep):
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+
+    def reserve(self):
+        """Take a token without blocking; returns the seconds to wait before using it."""
+        with open(self.path, 'a+') as f:
+            _lock_file(f)
+            try:
+                f.seek(0)
+                try:
+                    tokens, updated = (float(value) for value in f.read().split())
+                except ValueError:  # New or unreadable state starts with a full bucket
+                    tokens, updated = self.capacity, self._clock()
+                now = self._clock()
+                tokens, delay = _refill(tokens, updated, now, self.rate, self.capacity)
+                f.seek(0)
+                f.truncate()
+                f.write(f"{tokens!r} {now!r}")
+                f.flush()
+            finally:
+                _unlock_file(f)
+        return delay
+
+    def acquire(self):
+        """Block until a call is allowed; returns the seconds spent waiting."""
+        delay = self.reserve()
+        if delay:
+            self._sleep(delay)
+        return delay
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RateLimiter:
+    """Per-endpoint-class token buckets, with metrics on time spent waiting versus calling.
+
+    Classes without a bucket are not limited, but their calls are still measured.
+    """
+
+    def __init__(self, buckets=None, clock=time.perf_counter):
+        if buckets is None:
+            buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in DEFAULT_LIMITS.items()}
+        self.buckets = buckets
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._metrics = defaultdict(lambda: {'calls': 0, 'throttled': 0, 'wait_seconds': 0.0, 'call_seconds': 0.0})
+
+    @classmethod
+    def shared(cls, directory, limits=None):
+        """A limiter whose buckets are files in `directory`, shared with other processes."""
+        os.makedirs(directory, exist_ok=True)
+        return cls({
+            name: FileTokenBucket(os.path.join(directory, f"{name}.bucket"), rate, burst)
+            for name, (rate, burst) in (limits or DEFAULT_LIMITS).items()
+        })
+
+    @classmethod
+    def from_config(cls):
+        """Build the limiter described by the SPOTIFY_RATE_LIMIT_* settings."""
+        limits = dict(DEFAULT_LIMITS)
+        for name, rate in (('search', Config.RATE_LIMIT_SEARCH), ('read', Config.RATE_LIMIT_READ),
+                           ('write', Config.RATE_LIMIT_WRITE)):
+            if rate:
+                limits[name] = (rate, max(1, int(rate * 2)))
+        if Config.RATE_LIMIT_DIR:
+            return cls.shared(Config.RATE_LIMIT_DIR, limits)
+        return cls({name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()})
+
+    @property
+    def uses_files(self):
+        """Whether any bucket lives in a locked file, so even reserve() can block on disk."""
+        return any(isinstance(bucket, FileTokenBucket) for bucket in self.buckets.values())
+
+    def acquire(self, endpoint):
+        """Block until a call to `endpoint` is allowed; returns the seconds spent waiting."""
+        bucket = self.buckets.get(endpoint)
+        return bucket.acquire() if bucket is not None else 0.0
+
+    def reserve(self, endpoint):
+        """Take a token for `endpoint` without blocking; returns the seconds to wait first.
+
+        For callers that can't block, such as coroutines, which sleep on their own.
+        """
+        bucket = self.buckets.get(endpoint)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def record(self, endpoint, waited, elapsed, throttled=False):
+        """Count one call that waited `waited` seconds and took `elapsed` seconds."""
+        with self._lock:
+            metrics = self._metrics[endpoint]
+            metrics['calls'] += 1
+            metrics['throttled'] += throttled
+            metrics['wait_seconds'] += waited
+            metrics['call_seconds'] += elapsed
+
+    @property
+    def metrics(self):
+        """Totals per endpoint class: calls, throttled (429) calls, wait and call seconds."""
+        with self._lock:
+            return {endpoint: dict(metrics) for endpoint, metrics in sorted(self._metrics.items())}
+
+    def summary(self):
+        metrics = self.metrics.values()
+        return {
+            'calls': sum(m['calls'] for m in metrics),
+            'throttled': sum(m['throttled'] for m in metrics),
+            'wait_seconds': sum(m['wait_seconds'] for m in metrics),
+            'call_seconds': sum(m['call_seconds'] for m in metrics),
+        }
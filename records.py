@@ -0,0 +1,70 @@
+# records.py
+import json
+import sys
+from contextlib import contextmanager
+
+from scraper import ChartEntry
+from tracks import to_json
+
+# Fields written for every chart row, in order
+CHART_FIELDS = ('chart_date', 'rank', 'title', 'artist', 'last_week', 'peak', 'weeks_on_chart')
+
+
+def entry_to_record(chart_date, entry, **extra):
+    """Flatten a ChartEntry into a JSON-ready dict tagged with its chart date."""
+    record = {
+        'chart_date': chart_date,
+        'rank': entry.rank,
+        'title': entry.title,
+        'artist': entry.artist,
+        'last_week': entry.last_week,
+        'peak': entry.peak,
+        'weeks_on_chart': entry.weeks_on_chart,
+    }
+    record.update(extra)
+    return record
+
+
+def record_to_entry(record):
+    """Rebuild the ChartEntry held in a chart or resolved record."""
+    return ChartEntry(
+        rank=record['rank'],
+        title=record['title'],
+        artist=record.get('artist') or '',
+        last_week=record.get('last_week'),
+        peak=record.get('peak'),
+        weeks_on_chart=record.get('weeks_on_chart'),
+    )
+
+
+@contextmanager
+def open_stream(path, mode='r'):
+    """Open `path` for text I/O, with '-' meaning stdin or stdout."""
+    if path == '-':
+        yield sys.stdout if 'w' in mode or 'a' in mode else sys.stdin
+        return
+    with open(path, mode, encoding='utf-8') as f:
+        yield f
+
+
+def write_records(records, f):
+    """Write each record as one compact JSON line and return how many were written."""
+    count = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=to_json))
+        f.write('\n')
+        count += 1
+    f.flush()
+    return count
+
+
+def read_records(f):
+    """Yield one dict per non-blank JSON line. Raises ValueError on a malformed line."""
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid record on line {number}: {e}") from e
@@ -1,35 +1,308 @@
 # scraper.py
+import re
+import sys
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+from html.parser import HTMLParser
+
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from config import Config
+from instrumentation import metrics
+
+BILLBOARD_URL = "https://www.billboard.com/charts/{chart}/{date}/"
+ROW_CLASS = 'o-chart-results-list-row-container'
+TITLE_ID = 'title-of-a-story'
+LABEL_CLASS = 'c-label'
+
+# The opening tag of the first chart row; the class name alone also appears in inline CSS
+ROW_START = re.compile(r'<div\b[^>]*\bclass\s*=\s*["\']?[^"\'>]*\b' + re.escape(ROW_CLASS) + r'\b', re.IGNORECASE)
+
+# The default backend streams the page and only materializes chart rows.
+# Any BeautifulSoup tree builder ('html.parser', 'lxml') can be used instead.
+DEFAULT_PARSER = 'stream'
+
+# Only the chart rows are turned into a BeautifulSoup tree; the rest of the page is skipped
+CHART_ROWS = SoupStrainer('div', class_=ROW_CLASS)
+
+# Separators between the lead artist and any featured or collaborating artists
+FEATURED_ARTISTS = re.compile(r'\s+(?:featuring|feat\.?|ft\.?|with|x|&)\s+|\s*,\s*', re.IGNORECASE)
+
+
+@dataclass(frozen=True, slots=True)
+class ChartEntry:
+    """One row of a chart. Numeric fields are None when the page omits them."""
+    rank: int
+    title: str
+    artist: str
+    last_week: Optional[int]
+    peak: Optional[int]
+    weeks_on_chart: Optional[int]
+
+
+def primary_artist(artist):
+    """Strip featured and collaborating artists from a Billboard artist credit."""
+    if not artist:
+        return None
+    return FEATURED_ARTISTS.split(artist, maxsplit=1)[0].strip() or None
+
+
+def _clean(text):
+    return ' '.join(text.split())
+
+
+def _to_int(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _make_entry(position, title, labels_before, labels_after):
+    """Build a ChartEntry from the row title and the labels around it.
+
+    The rank is the label before the title. After the title come the artist,
+    then last week, peak position and weeks on chart. Titles and artists are
+    interned, so a song's entries on many charts share the same strings.
+    """
+    rank = next((_to_int(label) for label in labels_before if _to_int(label) is not None), None)
+    stats = (labels_after[1:4] + [None] * 3)[:3]
+    return ChartEntry(
+        rank=rank if rank is not None else position,
+        title=sys.intern(title),
+        artist=sys.intern(labels_after[0]) if labels_after else '',
+        last_week=_to_int(stats[0]),
+        peak=_to_int(stats[1]),
+        weeks_on_chart=_to_int(stats[2]),
+    )
+
+
+class ChartRowParser(HTMLParser):
+    """Incremental parser that collects one ChartEntry per chart row.
+
+    Text outside the chart rows is never stored, and `done` is set once the
+    element holding the rows closes so callers can stop feeding the page.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        super().__init__()
+        self.completed = deque()
+        self.done = False
+        self._depth = 0          # div depth relative to the first chart row
+        self._row_depth = None   # depth at which the current row opened
+        self._rows = 0
+        self._capture = None     # (tag, 'title' or 'label') while collecting text
+        self._capture_depth = 0
+        self._text = []
+        self._row_title = None
+        self._labels_before = []
+        self._labels_after = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self._capture is not None:
+            if tag == self._capture[0]:
+                self._capture_depth += 1
+            return
+        if tag == 'div':
+            self._depth += 1
+            if self._row_depth is None and ROW_CLASS in (dict(attrs).get('class') or '').split():
+                self._row_depth = self._depth
+                self._row_title = None
+                self._labels_before = []
+                self._labels_after = []
+        elif self._row_depth is None:
+            return
+        elif tag == 'h3' and self._row_title is None and ('id', TITLE_ID) in attrs:
+            self._start_capture(tag, 'title')
+        elif tag == 'span' and LABEL_CLASS in (dict(attrs).get('class') or '').split():
+            self._start_capture(tag, 'label')
+
+    def _start_capture(self, tag, kind):
+        self._capture = (tag, kind)
+        self._capture_depth = 1
+        self._text = []
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self._capture is not None:
+            if tag == self._capture[0]:
+                self._capture_depth -= 1
+                if not self._capture_depth:
+                    self._end_capture()
+            return
+        if tag != 'div':
+            return
+        if self._row_depth is not None and self._depth == self._row_depth:
+            if self._row_title is None:
+                raise ValueError("Chart row without a song title")
+            self._rows += 1
+            self.completed.append(_make_entry(
+                self._rows, self._row_title, self._labels_before, self._labels_after
+            ))
+            self._row_depth = None
+        elif self._row_depth is None and self._depth == 0:
+            self.done = True
+        self._depth -= 1
+
+    def _end_capture(self):
+        text = _clean(''.join(self._text))
+        if self._capture[1] == 'title':
+            self._row_title = text
+        elif self._row_title is None:
+            self._labels_before.append(text)
+        else:
+            self._labels_after.append(text)
+        self._capture = None
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+
+
+def _stream_chart(html):
+    match = ROW_START.search(html)
+    if match is None:
+        return
+    start = match.start()
+
+    parser = ChartRowParser()
+    for offset in range(start, len(html), ChartRowParser.CHUNK_SIZE):
+        parser.feed(html[offset:offset + ChartRowParser.CHUNK_SIZE])
+        while parser.completed:
+            yield parser.completed.popleft()
+        if parser.done:
+            return
+    parser.close()
+    yield from parser.completed
+
+
+def parse_chart(html, parser=DEFAULT_PARSER):
+    """Yield a ChartEntry for each row of a chart page's HTML."""
+    if parser == 'stream':
+        yield from _stream_chart(html)
+        return
+
+    soup = BeautifulSoup(html, parser, parse_only=CHART_ROWS)
+
+    for position, item in enumerate(soup.find_all('div', class_=ROW_CLASS), 1):
+        title = item.find('h3', id=TITLE_ID)
+        labels_before, labels_after = [], []
+        labels = labels_before
+        for tag in item.find_all(['h3', 'span']):
+            if tag is title:
+                labels = labels_after
+            elif tag.name == 'span' and LABEL_CLASS in (tag.get('class') or []):
+                labels.append(_clean(tag.getText()))
+        yield _make_entry(position, _clean(title.getText()), labels_before, labels_after)
+
+
+def parse_songs(html, parser=DEFAULT_PARSER):
+    """Yield the song titles found in a chart page's HTML."""
+    for entry in parse_chart(html, parser):
+        yield entry.title
+
+
+@dataclass(frozen=True)
+class ChartSource:
+    """A chart that can be scraped.
+
+    `url` is a template with `{chart}` and `{date}` fields, and `parse` turns
+    a page into ChartEntry rows; both default to Billboard's chart pages.
+    `size` is the number of rows the chart ranks.
+    """
+    slug: str
+    name: str
+    url: Optional[str] = None
+    parse: Callable = parse_chart
+    size: int = 100
+
+    def chart_url(self, date):
+        return (self.url or BILLBOARD_URL).format(chart=self.slug, date=date)
+
+
+# Every chart BillboardScraper knows how to fetch, by slug
+CHARTS = {}
+DEFAULT_CHART = 'hot-100'
+
+
+def register_chart(source):
+    """Add a ChartSource to the registry (replacing any with the same slug) and return it."""
+    CHARTS[source.slug] = source
+    return source
+
+
+def get_chart(chart):
+    """Look up a chart by slug; ChartSource instances are returned as they are."""
+    if isinstance(chart, ChartSource):
+        return chart
+    try:
+        return CHARTS[chart]
+    except KeyError:
+        raise ValueError(f"Unknown chart {chart!r}; expected one of {', '.join(CHARTS)}") from None
+
+
+# Only song charts: rows are searched as tracks, so album charts such as the
+# Billboard 200 would need an album search and album playlists of their own
+for _source in (
+    ChartSource('hot-100', "Billboard Hot 100"),
+    ChartSource('billboard-global-200', "Billboard Global 200", size=200),
+    ChartSource('country-songs', "Hot Country Songs", size=50),
+    ChartSource('r-b-hip-hop-songs', "Hot R&B/Hip-Hop Songs", size=50),
+    ChartSource('hot-rock-songs', "Hot Rock & Alternative Songs", size=50),
+    ChartSource('latin-songs', "Hot Latin Songs", size=50),
+    ChartSource('dance-electronic-songs', "Hot Dance/Electronic Songs", size=50),
+):
+    register_chart(_source)
+
 
 class BillboardScraper:
-    def __init__(self, date):
+    def __init__(self, date, session=None, parser=DEFAULT_PARSER, fetcher=None, chart=DEFAULT_CHART):
         self.date = date
-        self.url = f"https://www.billboard.com/charts/hot-100/{self.date}/"
+        self.session = session
+        self.parser = parser
+        self.fetcher = fetcher
+        self.chart = get_chart(chart)
+        self.url = self.chart.chart_url(self.date)
 
-    def scrape_songs(self):
-        """Scrape song titles from Billboard Hot 100."""
-        try:
-            response = requests.get(self.url, headers={"User-Agent": Config.USER_AGENT}, timeout=10)
+    def iter_entries(self):
+        """Yield a ChartEntry for each row as the chart is parsed.
+
+        Unlike scrape_entries, fetch and parse errors are raised to the caller.
+        """
+        if self.fetcher is not None:
+            html = self.fetcher.fetch(self.url, self.date)
+        else:
+            http = self.session or requests
+            with metrics.timer('http_fetch_seconds'):
+                response = http.get(self.url, headers={"User-Agent": Config.USER_AGENT}, timeout=10)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Updated selector logic: find all h3 tags with chart-element__information__song
-            songs = soup.find_all('div', class_='o-chart-results-list-row-container')
-            song_titles = []
-
-            for item in songs:
-                data = item.find('h3', id='title-of-a-story')
-                main_data_split = data.getText().split()
-                main_data = ' '.join(main_data_split)
-                song_titles.append(main_data)
-            return song_titles
-        
+            html = response.text
+        yield from metrics.timed_iter('parse_seconds', self.chart.parse(html, self.parser))
+
+    def iter_songs(self):
+        """Yield song titles one at a time as the chart rows are parsed."""
+        for entry in self.iter_entries():
+            yield entry.title
+
+    def scrape_entries(self):
+        """Scrape rank, title, artist and chart stats for every row of the chart."""
+        try:
+            return list(self.iter_entries())
+
         except requests.exceptions.RequestException as e: # Handles network errors, timeouts, HTTP errors
             print(f"Network error while fetching Billboard page: {e}")
             return []
 
         except Exception as e:
             print(f"Error scraping Billboard: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def scrape_songs(self):
+        """Scrape song titles from the chart."""
+        return [entry.title for entry in self.scrape_entries()]
@@ -0,0 +1,125 @@
+# search_cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from tracks import to_json
+
+
+def normalize_query(query):
+    """Collapse case and whitespace so equivalent searches share a cache key."""
+    return ' '.join(query.lower().split())
+
+
+class SearchCache:
+    """SQLite-backed cache of search results with an in-memory LRU in front.
+
+    Found tracks and "not found" results are both stored, each with its own
+    TTL, so songs that are missing on Spotify are re-checked sooner.
+    """
+
+    MISSING = object()
+
+    def __init__(self, path=":memory:", hit_ttl=30 * 24 * 3600, miss_ttl=24 * 3600,
+                 memory_size=2048, clock=time.time):
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.memory_size = memory_size
+        self._clock = clock
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS search_results ("
+            " query TEXT PRIMARY KEY,"
+            " result TEXT,"
+            " stored_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls):
+        """Open the on-disk cache described by the SEARCH_CACHE_* settings."""
+        return cls(Config.SEARCH_CACHE_PATH, hit_ttl=Config.SEARCH_CACHE_HIT_TTL, miss_ttl=Config.SEARCH_CACHE_MISS_TTL)
+
+    def _expires_at(self, result, stored_at):
+        return stored_at + (self.hit_ttl if result is not None else self.miss_ttl)
+
+    def _remember(self, key, result, expires_at):
+        self._memory[key] = (result, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _count(self, result):
+        if result is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return result
+
+    def get(self, query):
+        """Return the cached result (possibly None) or SearchCache.MISSING."""
+        key = normalize_query(query)
+        now = self._clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return self._count(result)
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT result, stored_at FROM search_results WHERE query = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                result = json.loads(row[0]) if row[0] is not None else None
+                expires_at = self._expires_at(result, row[1])
+                if expires_at > now:
+                    self._remember(key, result, expires_at)
+                    return self._count(result)
+
+            self.misses += 1
+            return self.MISSING
+
+    def set(self, query, result):
+        """Store a search result; None records that the track was not found."""
+        key = normalize_query(query)
+        stored_at = self._clock()
+        payload = json.dumps(result, default=to_json) if result is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_results (query, result, stored_at) VALUES (?, ?, ?)",
+                (key, payload, stored_at)
+            )
+            self._db.commit()
+            self._remember(key, result, self._expires_at(result, stored_at))
+
+    def found(self, prefix=''):
+        """Return (query, result) for every unexpired found track whose key starts with `prefix`."""
+        cutoff = self._clock() - self.hit_ttl
+        prefix = normalize_query(prefix)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT query, result FROM search_results"
+                " WHERE result IS NOT NULL AND stored_at > ? AND substr(query, 1, ?) = ?",
+                (cutoff, len(prefix), prefix)
+            ).fetchall()
+        return [(query, json.loads(result)) for query, result in rows]
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'negative_hits': self.negative_hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,238 @@
+# service.py
+import argparse
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from backfill import chart_weeks
+from fetcher import ChartFetcher
+from scraper import DEFAULT_CHART, BillboardScraper, get_chart
+from spotify_client import SpotifyClient
+from playlist_manager import PlaylistManager
+from config import Config
+from instrumentation import metrics
+
+
+@dataclass
+class Job:
+    """One playlist request and its progress: queued, running, done or failed."""
+    id: str
+    chart: str
+    chart_date: str
+    name: str
+    status: str = 'queued'
+    songs: int = 0
+    matched: int = 0
+    playlist_id: Optional[str] = None
+    error: Optional[str] = None
+    submitted_at: float = 0.0
+    finished_at: Optional[float] = None
+
+
+class QueueFull(Exception):
+    """Raised when the service already has `max_queue` unfinished jobs."""
+
+
+class PlaylistService:
+    """Runs playlist jobs on a bounded worker pool with one warm client and fetcher.
+
+    Jobs for the same chart week share a single scrape and resolve pass while
+    one is in flight, and an identical job (same chart, week and playlist
+    name) that is still unfinished is returned instead of being queued twice.
+    """
+
+    def __init__(self, sp_client, fetcher, max_workers=4, max_queue=100, history=1000, clock=time.time):
+        self.sp_client = sp_client
+        self.fetcher = fetcher
+        self.max_queue = max_queue
+        self.history = history
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='playlist-job')
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._active = {}       # (chart, chart_date, name) -> unfinished Job
+        self._resolving = {}    # (chart, chart_date) -> Future of the resolved tracks
+
+    def submit(self, chart=DEFAULT_CHART, date=None, name=None):
+        """Queue a job, or return the unfinished identical one. Raises ValueError or QueueFull."""
+        source = get_chart(chart)
+        if not date:
+            raise ValueError("date is required")
+        chart_date = chart_weeks(date, date)[0]
+        name = name or f"{source.name} - {chart_date}"
+        key = (source.slug, chart_date, name)
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                metrics.count('service_requests_total', result='duplicate')
+                return job
+            if len(self._active) >= self.max_queue:
+                metrics.count('service_requests_total', result='rejected')
+                raise QueueFull(f"{len(self._active)} jobs are already queued or running")
+            job = Job(str(next(self._ids)), source.slug, chart_date, name, submitted_at=self._clock())
+            self._jobs[job.id] = job
+            self._active[key] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        metrics.count('service_requests_total', result='queued')
+        self._pool.submit(self._run, job, key)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def resolve(self, chart, chart_date):
+        """Scrape and resolve one chart, sharing the pass with any concurrent caller for the same chart."""
+        with self._lock:
+            future = self._resolving.get((chart, chart_date))
+            owner = future is None
+            if owner:
+                future = self._resolving[(chart, chart_date)] = Future()
+        if not owner:
+            metrics.count('service_coalesced_total')
+            return future.result()
+
+        try:
+            entries = BillboardScraper(chart_date, fetcher=self.fetcher, chart=chart).scrape_entries()
+            tracks = self.sp_client.search_tracks([(entry.title, entry.artist) for entry in entries])
+            future.set_result(tracks)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._resolving[(chart, chart_date)]
+        return future.result()
+
+    def _run(self, job, key):
+        job.status = 'running'
+        try:
+            tracks = self.resolve(job.chart, job.chart_date)
+            job.songs, job.matched = len(tracks), sum(1 for track in tracks if track)
+            if not tracks:
+                raise ValueError("No songs found for this chart")
+            job.playlist_id = PlaylistManager.create_playlist(
+                sp_client=self.sp_client,
+                song_data=tracks,
+                name=job.name,
+                description=f"Top songs from {get_chart(job.chart).name} on {job.chart_date}"
+            )
+            if job.playlist_id is None:
+                raise RuntimeError("The playlist could not be created")
+            job.status = 'done'
+        except Exception as e:
+            job.status, job.error = 'failed', str(e)
+        finally:
+            job.finished_at = self._clock()
+            with self._lock:
+                self._active.pop(key, None)
+            metrics.count('service_jobs_total', result=job.status)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs, GET /jobs/<id>, GET /health and GET /metrics."""
+    service = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        body = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif path == '/metrics':
+            self._send(200, metrics.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif path == '/jobs':
+            self._send(200, {'jobs': [asdict(job) for job in self.service.jobs()]})
+        elif path.startswith('/jobs/'):
+            job = self.service.get(path[len('/jobs/'):])
+            if job is None:
+                self._send(404, {'error': 'No such job'})
+            else:
+                self._send(200, asdict(job))
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.path.rstrip('/') != '/jobs':
+            self._send(404, {'error': 'Not found'})
+            return
+        try:
+            request = json.loads(body or b'{}')
+            job = self.service.submit(request.get('chart') or DEFAULT_CHART, request.get('date'), request.get('name'))
+        except QueueFull as e:
+            self._send(503, {'error': str(e)})
+        except (ValueError, AttributeError) as e:
+            self._send(400, {'error': str(e)})
+        else:
+            self._send(202, asdict(job))
+
+
+def make_server(service, host='127.0.0.1', port=8080):
+    """An HTTP server for `service`; call serve_forever() to run it."""
+    class Handler(ServiceHandler):
+        pass
+    Handler.service = service
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve playlist generation over HTTP with a warm Spotify client.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, help="Jobs run at once")
+    parser.add_argument("--max-queue", type=int, default=100, help="Unfinished jobs accepted before rejecting with 503")
+    args = parser.parse_args(argv)
+
+    try:
+        sp_client = SpotifyClient.from_config()
+        # spotipy only fetches or refreshes a token on its first request, so make one
+        # now: any OAuth prompt happens here rather than in a job's worker thread
+        user = sp_client.sp.current_user()
+    except Exception as e:
+        print(f"❌ Spotify client initialization failed. Check your credentials. {e}")
+        return
+    print(f"🔑 Signed in to Spotify as {user.get('display_name') or user['id']}.")
+
+    service = PlaylistService(sp_client, ChartFetcher(Config.PAGE_CACHE_DIR), args.workers, args.max_queue)
+    server = make_server(service, args.host, args.port)
+    print(f"🎧 Serving playlist jobs on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
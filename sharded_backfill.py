@@ -0,0 +1,200 @@
+# sharded_backfill.py
+import argparse
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backfill import chart_weeks, song_key
+from fetcher import ChartFetcher
+from spotify_client import SpotifyClient
+from playlist_manager import PlaylistManager
+from records import entry_to_record, record_to_entry, write_records
+from scraper import DEFAULT_CHART, BillboardScraper, CHARTS, get_chart
+from config import Config
+from instrumentation import metrics
+
+# Charts resolved together: their new songs are searched in one concurrent pass
+RESOLVE_BATCH_CHARTS = 20
+
+# Each worker process's fetcher, set up once by _init_worker
+_fetcher = None
+
+
+def _init_worker(cache_dir):
+    global _fetcher
+    _fetcher = ChartFetcher(cache_dir, pool_size=1)
+
+
+def scrape_page(page):
+    """Fetch and parse one (chart, chart_date) page in a worker; returns (page, records or None on failure).
+
+    A page without chart rows (a consent page, a new layout, a chart not yet
+    published) counts as a failure, and its cached copy is dropped so the
+    next run downloads it again.
+    """
+    chart, chart_date = page
+    try:
+        scraper = BillboardScraper(chart_date, fetcher=_fetcher, chart=chart)
+        records = [entry_to_record(chart_date, entry, chart=chart) for entry in scraper.iter_entries()]
+    except Exception as e:
+        print(f"Error scraping {chart} {chart_date}: {e}")
+        return page, None
+    if not records:
+        print(f"No chart rows found for {chart} {chart_date}")
+        _fetcher.discard(scraper.url)
+        return page, None
+    return page, records
+
+
+def _song(record):
+    return song_key(record_to_entry(record))
+
+
+def checkpoint_path(checkpoint_dir, chart, chart_date):
+    return os.path.join(checkpoint_dir, chart, f"{chart_date}.jsonl")
+
+
+def write_checkpoint(checkpoint_dir, chart, chart_date, records):
+    """Save a finished chart's resolved records; the file only appears once it is complete."""
+    path = checkpoint_path(checkpoint_dir, chart, chart_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        write_records(records, f)
+    os.replace(tmp_path, path)
+
+
+def _shard_size(pages, processes):
+    """Split the pages into about four contiguous shards per process."""
+    return max(1, math.ceil(len(pages) / (processes * 4)))
+
+
+def run_sharded_backfill(start, end, sp_client, checkpoint_dir, processes=None, charts=(DEFAULT_CHART,),
+                         max_concurrency=8, create_playlists=True, cache_dir=None,
+                         resolve_batch=RESOLVE_BATCH_CHARTS, clock=time.perf_counter):
+    """Backfill a date range with chart pages scraped and parsed across a process pool.
+
+    The pages are split into contiguous shards for `processes` workers, each
+    with its own fetcher. Parsed rows come back to this process, where every
+    new song is resolved once through `sp_client` (and its cache),
+    `resolve_batch` charts at a time. Each finished chart is checkpointed as
+    resolved records in `checkpoint_dir/<chart>/<date>.jsonl`, so a rerun
+    skips it; a chart that failed to scrape, had no rows, or whose playlist
+    could not be created, is retried on the next run.
+    Returns a throughput report.
+    """
+    started = clock()
+    processes = processes or os.cpu_count() or 1
+    pages = [(chart, chart_date) for chart in charts for chart_date in chart_weeks(start, end)]
+    todo = [page for page in pages if not os.path.exists(checkpoint_path(checkpoint_dir, *page))]
+    report = {
+        'charts': len(pages),
+        'resumed_charts': len(pages) - len(todo),
+        'failed_charts': 0,
+        'charts_with_songs': 0,
+        'distinct_songs': 0,
+        'api_calls': 0,
+        'processes': processes,
+    }
+    print(f"📦 {len(todo)} of {len(pages)} charts to backfill on {processes} processes "
+          f"({report['resumed_charts']} already checkpointed).")
+
+    resolved = {}
+    calls_before = sp_client.api_calls
+
+    def finish(batch):
+        songs = [song for song in dict.fromkeys(
+            _song(record) for _, records in batch for record in records if record['title']
+        ) if song not in resolved]
+        resolved.update(zip(songs, sp_client.search_tracks(songs, max_concurrency=max_concurrency)))
+        report['distinct_songs'] += len(songs)
+        for (chart, chart_date), records in batch:
+            records = [dict(record, track=resolved.get(_song(record))) for record in records]
+            if create_playlists and records:
+                source = get_chart(chart)
+                playlist_id = PlaylistManager.create_playlist(
+                    sp_client=sp_client,
+                    song_data=[record['track'] for record in records],
+                    name=f"{source.name} - {chart_date}",
+                    description=f"Top songs from {source.name} on {chart_date}"
+                )
+                if playlist_id is None:
+                    # Not checkpointed, so the next run tries this chart again
+                    report['failed_charts'] += 1
+                    continue
+            write_checkpoint(checkpoint_dir, chart, chart_date, records)
+            report['charts_with_songs'] += bool(records)
+            metrics.count('checkpointed_charts_total', chart=chart)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+            batch = []
+            for page, records in pool.map(scrape_page, todo, chunksize=_shard_size(todo, processes)):
+                if records is None:
+                    report['failed_charts'] += 1
+                    continue
+                batch.append((page, records))
+                if len(batch) >= resolve_batch:
+                    finish(batch)
+                    batch = []
+            if batch:
+                finish(batch)
+
+    elapsed = clock() - started
+    done = len(todo) - report['failed_charts']
+    report.update({
+        'api_calls': sp_client.api_calls - calls_before,
+        'elapsed_seconds': elapsed,
+        'charts_per_minute': done / elapsed * 60 if elapsed > 0 else 0.0,
+    })
+    return report
+
+
+def print_report(report):
+    print(f"\n📊 Sharded backfill complete in {report['elapsed_seconds']:.1f}s on {report['processes']} processes")
+    print(f"    Charts: {report['charts']} ({report['resumed_charts']} resumed from checkpoints, "
+          f"{report['failed_charts']} failed), {report['charts_per_minute']:.1f} charts/min")
+    print(f"    New distinct songs: {report['distinct_songs']}, Spotify API calls: {report['api_calls']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Backfill a long date range, scraping on a process pool and checkpointing every chart."
+    )
+    parser.add_argument("start", help="First date to cover (YYYY-MM-DD)")
+    parser.add_argument("end", help="Last date to cover (YYYY-MM-DD)")
+    parser.add_argument("--processes", type=int, help="Scraping processes (default: one per core)")
+    parser.add_argument("--checkpoint-dir", default=".backfill_checkpoints",
+                        help="Where finished charts are checkpointed, so a rerun resumes (default: %(default)s)")
+    parser.add_argument("--chart", action="append", choices=CHARTS, dest="charts",
+                        help="Chart to backfill; repeat for several (default: hot-100)")
+    parser.add_argument("--search-concurrency", type=int, default=8, help="Concurrent Spotify searches")
+    parser.add_argument("--no-playlists", action="store_true", help="Resolve songs without creating the weekly playlists")
+    parser.add_argument("--metrics-file",
+                        help="Also write the run's metrics here (JSON for a .json file, else Prometheus text)")
+    args = parser.parse_args(argv)
+
+    try:
+        sp_client = SpotifyClient.from_config()
+    except Exception as e:
+        print(f"❌ Spotify client initialization failed. Check your credentials. {e}")
+        return
+
+    report = run_sharded_backfill(
+        args.start, args.end, sp_client, args.checkpoint_dir,
+        processes=args.processes,
+        charts=args.charts or [DEFAULT_CHART],
+        max_concurrency=args.search_concurrency,
+        create_playlists=not args.no_playlists,
+        cache_dir=Config.PAGE_CACHE_DIR
+    )
+    print_report(report)
+    metrics.print_report()
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
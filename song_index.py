@@ -0,0 +1,112 @@
+# song_index.py
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from matching import normalize_artist, normalize_title
+from scraper import DEFAULT_CHART, get_chart
+
+# Ways to rank songs across charts. 'points' scores every week on the chart
+# from 100 for #1 down to 100 / size for the last row (101 - rank on the
+# Hot 100), so long-running hits and high peaks both count.
+RANKINGS = ('points', 'weeks', 'peak')
+
+
+def song_key(title, artist):
+    """The normalized (title, lead artist) pair that identifies a song across charts."""
+    return normalize_title(title), normalize_artist(artist)
+
+
+@dataclass
+class SongRecord:
+    """One song across every chart it appeared on, as first credited."""
+    title: str
+    artist: str
+    ranks: Dict[str, int] = field(default_factory=dict, repr=False)  # chart date -> rank
+    track: Optional[dict] = None
+
+    def stats(self, start=None, end=None, chart_size=100):
+        """Chart stats over the chart dates in [start, end] (ISO strings), or None if it didn't chart."""
+        ranks = {d: r for d, r in self.ranks.items() if (not start or d >= start) and (not end or d <= end)}
+        if not ranks:
+            return None
+        return {
+            'weeks': len(ranks),
+            'peak': min(ranks.values()),
+            'points': sum(max(0, chart_size + 1 - rank) * 100 / chart_size for rank in ranks.values()),
+            'first_week': min(ranks),
+            'last_week': max(ranks),
+        }
+
+
+class SongIndex:
+    """In-memory index of one chart's songs keyed on normalized title and lead artist.
+
+    Weeks of the chart can be added one at a time as they are scraped; adding
+    the same week twice is harmless. Aggregate queries run over the index
+    without re-reading any pages.
+    """
+
+    def __init__(self, chart=DEFAULT_CHART):
+        self.chart = get_chart(chart).slug
+        self.chart_size = get_chart(chart).size
+        self._songs = {}
+        self._charts = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._songs)
+
+    def __iter__(self):
+        return iter(list(self._songs.values()))
+
+    @property
+    def charts(self):
+        return sorted(self._charts)
+
+    def add(self, chart_date, entry, track=None):
+        """Record a chart entry and return its song's record."""
+        key = song_key(entry.title, entry.artist)
+        with self._lock:
+            record = self._songs.get(key)
+            if record is None:
+                record = self._songs[key] = SongRecord(entry.title, entry.artist)
+            rank = record.ranks.get(chart_date)
+            record.ranks[chart_date] = entry.rank if rank is None else min(rank, entry.rank)
+            if record.track is None:
+                record.track = track
+            self._charts.add(chart_date)
+        return record
+
+    def add_chart(self, chart_date, entries):
+        """Record every entry of one chart."""
+        for entry in entries:
+            self.add(chart_date, entry)
+
+    def get(self, title, artist):
+        """The record for a song, matched on normalized title and lead artist, or None."""
+        return self._songs.get(song_key(title, artist))
+
+    def top(self, n, by='points', start=None, end=None):
+        """Return the top `n` (record, stats) pairs over the charts in [start, end].
+
+        `by` is 'points', 'weeks' (most weeks on chart) or 'peak' (best peak,
+        then most weeks). Remaining ties go to the higher-scoring song, then
+        the one that charted first.
+        """
+        if by not in RANKINGS:
+            raise ValueError(f"Unknown ranking {by!r}; expected one of {', '.join(RANKINGS)}")
+        ranked = []
+        for record in self:
+            stats = record.stats(start, end, self.chart_size)
+            if stats is None:
+                continue
+            if by == 'peak':
+                order = (stats['peak'], -stats['weeks'], -stats['points'])
+            elif by == 'weeks':
+                order = (-stats['weeks'], stats['peak'], -stats['points'])
+            else:
+                order = (-stats['points'], stats['peak'])
+            ranked.append((order + (stats['first_week'],), record, stats))
+        ranked.sort(key=lambda item: item[0])
+        return [(record, stats) for _, record, stats in ranked[:n]]
@@ -1,12 +1,133 @@
 # spotify_client.py
+import functools
+import threading
+
+import requests
 import spotipy
+import urllib3
 from spotipy.oauth2 import SpotifyOAuth
 from config import Config
+from search_cache import SearchCache
+from tracks import Track
+from concurrency import RetryAfterGate, bounded_map, retry_after_seconds
+from matching import MatchReport, match_steps
+from rate_limit import RateLimiter, endpoint_class
+from instrumentation import metrics
+
+
+def spotipy_session():
+    """HTTP session for spotipy that retries server errors on reads and nothing else.
+
+    Rate-limit retries belong to SpotifyClient._call, which waits out
+    Retry-After through the backoff shared by every thread, so 429s come back
+    at once. Only GETs are resent: adding or reordering playlist tracks twice
+    is not harmless, so BatchWriter retries those itself. Once the retries run
+    out the last response is returned, so spotipy raises its real 5xx status
+    (rather than the bare 429 it reports for urllib3's RetryError).
+    """
+    retry = urllib3.Retry(
+        total=3,
+        connect=None,
+        read=False,
+        status=3,
+        backoff_factor=0.3,
+        allowed_methods=frozenset(['GET']),
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RateLimitedSpotify:
+    """Wraps a spotipy client so every API method goes through SpotifyClient._call."""
+
+    def __init__(self, client, spotify):
+        self._client = client
+        self.spotify = spotify
+
+    def __getattr__(self, name):
+        attr = getattr(self.spotify, name)
+        if not callable(attr):
+            return attr
+        return functools.partial(self._client._call, endpoint_class(name), attr)
+
+
+def match_cache_key(song_name, artist_name=None):
+    return f"match:{song_name} artist:{artist_name or ''}"
+
+
+def cached_match(cache, report, song_name, artist_name=None):
+    """The cached match for a song (counted in `report`), or SearchCache.MISSING."""
+    if cache is None:
+        return SearchCache.MISSING
+    cached = cache.get(match_cache_key(song_name, artist_name))
+    if cached is SearchCache.MISSING:
+        metrics.count('search_cache_total', result='miss')
+        return cached
+    metrics.count('search_cache_total', result='hit')
+    report.record(cached, 0)
+    return Track.from_dict(cached)
+
+
+def save_match(cache, report, song_name, artist_name, result, calls):
+    """Cache and count the outcome of a song's searches."""
+    if result is None:
+        print(f"Not found: {song_name}")
+    if cache is not None:
+        cache.set(match_cache_key(song_name, artist_name), result)
+    report.record(result, calls)
+
 
 class SpotifyClient:
-    def __init__(self):
+    MAX_RATE_LIMIT_RETRIES = 5
+    # Candidates fetched per query, and queries spent per song, by match_track
+    MATCH_CANDIDATES = 5
+    MAX_MATCH_CALLS = 3
+    # Spotify's several-tracks endpoint takes at most this many IDs
+    MAX_TRACKS_PER_REQUEST = 50
+
+    def __init__(self, cache=None, limiter=None):
+        self.backoff = RetryAfterGate()
+        self.cache = cache
+        self.limiter = limiter or RateLimiter()
+        self.api_calls = 0
+        self.match_report = MatchReport()
+        self._calls_lock = threading.Lock()
+        self._sp = None
+        self._sp_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        """The client every command runs with: the on-disk search cache and the configured rate limits.
+
+        Raises if the Spotify credentials are not set.
+        """
+        Config.require_credentials()
+        return cls(cache=SearchCache.from_config(), limiter=RateLimiter.from_config())
+
+    @property
+    def sp(self):
+        """The rate-limited spotipy client, built (and authenticated) on first use.
+
+        Runs that never reach the API, such as scrape-only runs or fully
+        cached searches, never read credentials or start the OAuth flow.
+        """
+        if self._sp is None:
+            with self._sp_lock:
+                if self._sp is None:
+                    self._sp = RateLimitedSpotify(self, self._connect())
+        return self._sp
+
+    def _connect(self):
         try:
-            self.sp = spotipy.Spotify(
+            Config.require_credentials()
+            return spotipy.Spotify(
+                requests_session=spotipy_session(),
                 auth_manager=SpotifyOAuth(
                     client_id=Config.CLIENT_ID,
                     client_secret=Config.CLIENT_SECRET,
@@ -20,24 +141,191 @@ class SpotifyClient:
             print(f"Failed to initialize Spotify client: {e}")
             raise
 
+    def _call(self, endpoint, method, *args, **kwargs):
+        """Call a spotipy method within the `endpoint` class rate limit, waiting out 429s.
+
+        Time spent waiting (for the limiter or a 429 backoff) and time spent in
+        the call itself are recorded on the limiter and in the run's metrics.
+        """
+        clock = self.limiter.clock
+        attempt = 0
+        while True:
+            started = clock()
+            self.backoff.wait()
+            self.limiter.acquire(endpoint)
+            with self._calls_lock:
+                self.api_calls += 1
+            called = clock()
+            throttled = False
+            try:
+                return method(*args, **kwargs)
+            except spotipy.SpotifyException as e:
+                throttled = e.http_status == 429
+                if not throttled or attempt >= self.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                self.backoff.pause(retry_after_seconds(e, attempt))
+                attempt += 1
+                metrics.count('spotify_retries_total', endpoint=endpoint)
+            finally:
+                finished = clock()
+                self.limiter.record(endpoint, called - started, finished - called, throttled)
+                metrics.observe('spotify_call_seconds', finished - called, endpoint=endpoint)
+                metrics.observe('rate_limit_wait_seconds', called - started, endpoint=endpoint)
+                if throttled:
+                    metrics.count('spotify_throttled_total', endpoint=endpoint)
+
     def search_track(self, song_name, artist_name=None):
         """Search for a track and return its URI."""
         query = f"track:{song_name}"
         if artist_name:
             query += f" artist:{artist_name}"
 
+        if self.cache is not None:
+            cached = self.cache.get(query)
+            if cached is not SearchCache.MISSING:
+                metrics.count('search_cache_total', result='hit')
+                return Track.from_dict(cached)
+            metrics.count('search_cache_total', result='miss')
+
         try:
             results = self.sp.search(q=query, type='track', limit=1)
             if results['tracks']['items']:
                 track = results['tracks']['items'][0]
-                return {
-                    'uri': track['uri'],
-                    'name': track['name'],
-                    'artist': track['artists'][0]['name']
-                }
+                result = Track.from_spotify(track)
             else:
                 print(f"Not found: {song_name}")
-                return None
+                result = None
+            if self.cache is not None:
+                self.cache.set(query, result)
+            return result
         except Exception as e:
             print(f"Search error for '{song_name}': {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def match_track(self, song_name, artist_name=None, refresh=False, on_error=None):
+        """Find the best-scoring track, trying looser queries only while unresolved.
+
+        Each query fetches a few candidates that are scored on normalized title
+        and artist similarity. At most MAX_MATCH_CALLS queries are spent per song.
+        With `refresh`, a cached result is ignored and replaced. A search that
+        fails (an error, or 429s past the retry limit) returns `on_error`, so
+        callers can tell it apart from a song Spotify doesn't have.
+        """
+        if not refresh:
+            cached = cached_match(self.cache, self.match_report, song_name, artist_name)
+            if cached is not SearchCache.MISSING:
+                return cached
+
+        calls = 0
+        steps = match_steps(song_name, artist_name, self.MAX_MATCH_CALLS)
+        with metrics.timer('search_seconds'):
+            try:
+                query = next(steps)
+                while True:
+                    calls += 1
+                    results = self.sp.search(q=query, type='track', limit=self.MATCH_CANDIDATES)
+                    query = steps.send(results['tracks']['items'])
+            except StopIteration as done:
+                result = done.value and Track.from_spotify(done.value)
+            except Exception as e:
+                print(f"Search error for '{song_name}': {e}")
+                self.match_report.record(None, calls)
+                return on_error
+
+        save_match(self.cache, self.match_report, song_name, artist_name, result, calls)
+        return result
+
+    def hydrate_tracks(self, uris, market=None, max_concurrency=4):
+        """Look up known tracks in bulk, MAX_TRACKS_PER_REQUEST per call.
+
+        Returns {uri: track} for every URI, where the track also says whether
+        it is `playable` in `market` and, if Spotify relinked it to another
+        release there, the original URI under `linked_from`. Tracks that no
+        longer exist map to None; URIs whose lookup failed are left out.
+        """
+        uris = list(dict.fromkeys(uris))
+        market = market or Config.MARKET
+        chunks = [uris[i:i + self.MAX_TRACKS_PER_REQUEST] for i in range(0, len(uris), self.MAX_TRACKS_PER_REQUEST)]
+
+        def lookup(chunk):
+            try:
+                return chunk, self.sp.tracks(chunk, market=market)['tracks']
+            except Exception as e:
+                print(f"Track lookup error for {len(chunk)} tracks: {e}")
+                return chunk, None
+
+        hydrated = {}
+        for chunk, tracks in bounded_map(lookup, chunks, max_concurrency):
+            if tracks is None:
+                continue
+            for uri, track in zip(chunk, tracks):
+                if not track:
+                    hydrated[uri] = None
+                    continue
+                linked_from = (track.get('linked_from') or {}).get('uri')
+                hydrated[uri] = {
+                    'uri': track['uri'],
+                    'name': track['name'],
+                    'artist': track['artists'][0]['name'],
+                    'playable': track.get('is_playable', True),
+                    'linked_from': linked_from if linked_from != track['uri'] else None,
+                }
+        return hydrated
+
+    def revalidate(self, matches, market=None, max_concurrency=8):
+        """Check previously matched tracks and re-resolve only those that went bad.
+
+        `matches` maps (title, artist) to the track matched earlier, or None.
+        Tracks relinked to another release are swapped for it without
+        searching; tracks that are gone or unplayable in `market` are searched
+        again. Returns (updated matches, report).
+        """
+        hydrated = self.hydrate_tracks(
+            [track['uri'] for track in matches.values() if track], market, max_concurrency=min(4, max_concurrency)
+        )
+        updated, stale = {}, []
+        report = {'checked': 0, 'relinked': 0, 'unavailable': 0, 're_resolved': 0}
+        for song, track in matches.items():
+            if track is None:
+                updated[song] = None
+                continue
+            # A track whose lookup failed is kept as it was
+            current = hydrated.get(track['uri'], track)
+            report['checked'] += track['uri'] in hydrated
+            if current is None or not current.get('playable', True):
+                report['unavailable'] += 1
+                stale.append(song)
+                continue
+            if current.get('linked_from'):
+                report['relinked'] += 1
+            updated[song] = Track(current['uri'], current['name'], current['artist'])
+
+        resolved = bounded_map(lambda song: self.match_track(*song, refresh=True), stale, max_concurrency)
+        for song, track in zip(stale, resolved):
+            updated[song] = track
+            report['re_resolved'] += track is not None
+        for outcome, count in report.items():
+            metrics.count('revalidated_tracks_total', count, result=outcome)
+        return {song: updated[song] for song in matches}, report
+
+    def revalidate_cache(self, market=None, max_concurrency=8):
+        """Revalidate every cached match; returns the revalidate() report."""
+        if self.cache is None:
+            return {'checked': 0, 'relinked': 0, 'unavailable': 0, 're_resolved': 0}
+        matches = {}
+        for key, track in self.cache.found('match:'):
+            title, _, artist = key[len('match:'):].rpartition(' artist:')
+            matches[(title, artist or None)] = track
+        updated, report = self.revalidate(matches, market, max_concurrency)
+        for (title, artist), track in updated.items():
+            if track != matches[(title, artist)]:
+                self.cache.set(f"match:{title} artist:{artist or ''}", track)
+        return report
+
+    def search_tracks(self, songs, max_concurrency=8):
+        """Match many tracks concurrently, returning results in input order.
+
+        Each entry in `songs` is either a title or a `(title, artist)` tuple.
+        """
+        queries = (song if isinstance(song, tuple) else (song, None) for song in songs)
+        return list(bounded_map(lambda q: self.match_track(*q), queries, max_concurrency))
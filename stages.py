@@ -0,0 +1,184 @@
+# stages.py
+import argparse
+import sys
+from contextlib import redirect_stdout
+from itertools import groupby, islice
+
+from backfill import chart_weeks, fetch_chart_pages, song_key
+from fetcher import ChartFetcher
+from spotify_client import SpotifyClient
+from playlist_manager import PlaylistManager
+from scraper import CHARTS, DEFAULT_CHART, get_chart
+from records import entry_to_record, open_stream, read_records, record_to_entry, write_records
+from config import Config
+from instrumentation import metrics
+
+DEFAULT_NAME = "{chart_name} - {chart_date}"
+RESOLVE_BATCH_SIZE = 1000
+
+
+def scrape(chart_dates, fetcher, max_workers=8, charts=(DEFAULT_CHART,)):
+    """Yield a chart record for every row of every chart, by chart type then chart date.
+
+    Pages for every chart type are fetched concurrently through one fetcher,
+    and each record is tagged with its chart's slug under 'chart'.
+    """
+    pages = [(chart, chart_date) for chart in charts for chart_date in chart_dates]
+    scraped = fetch_chart_pages(pages, fetcher, max_workers=max_workers)
+    for chart, chart_date in pages:
+        for entry in scraped[(chart, chart_date)]:
+            yield entry_to_record(chart_date, entry, chart=chart)
+
+
+def resolve(records, sp_client, batch_size=RESOLVE_BATCH_SIZE, max_concurrency=8, revalidate=False):
+    """Yield each chart record with the Spotify track it matched under 'track'.
+
+    Records are resolved `batch_size` at a time, searching each distinct song
+    in a batch once. Records that already carry a track are passed through,
+    so re-running on a resolved file only retries the songs that were missed.
+    With `revalidate`, those tracks are first checked in bulk and only the
+    ones that became unavailable are searched again.
+    """
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        if revalidate:
+            known = {song_key(record_to_entry(record)): record['track'] for record in batch if record.get('track')}
+            checked, _ = sp_client.revalidate(known, max_concurrency=max_concurrency)
+            batch = [
+                dict(record, track=checked[song_key(record_to_entry(record))]) if record.get('track') else record
+                for record in batch
+            ]
+        songs = list(dict.fromkeys(
+            song_key(record_to_entry(record)) for record in batch if not record.get('track')
+        ))
+        resolved = dict(zip(songs, sp_client.search_tracks(songs, max_concurrency=max_concurrency)))
+        for record in batch:
+            if not record.get('track'):
+                record = dict(record, track=resolved.get(song_key(record_to_entry(record))))
+            yield record
+
+
+def publish(records, sp_client, name=DEFAULT_NAME, sync=False, dry_run=False):
+    """Create (or with `sync`, update) one playlist per chart in a resolved file.
+
+    `name` may contain `{chart_date}`, `{chart}` (the chart's slug) and
+    `{chart_name}`. Records without a 'chart' are from the Hot 100. With
+    `dry_run` nothing is sent to Spotify. Returns one summary dict per chart.
+    """
+    summaries = []
+    for (chart, chart_date), group in groupby(
+            records, key=lambda record: (record.get('chart') or DEFAULT_CHART, record['chart_date'])):
+        tracks = [record.get('track') for record in group]
+        source = get_chart(chart)
+        playlist_name = name.format(chart_date=chart_date, chart=chart, chart_name=source.name)
+        description = f"Top songs from {source.name} on {chart_date}"
+        summary = {
+            'chart': chart,
+            'chart_date': chart_date,
+            'name': playlist_name,
+            'songs': len(tracks),
+            'matched': sum(1 for track in tracks if track),
+            'playlist_id': None,
+        }
+        if dry_run:
+            print(f"📝 Would {'sync' if sync else 'create'} {playlist_name} with "
+                  f"{summary['matched']} of {summary['songs']} songs.")
+        elif sync:
+            report = PlaylistManager.sync_playlist(sp_client, tracks, playlist_name, description)
+            summary['playlist_id'] = report and report['playlist_id']
+        else:
+            summary['playlist_id'] = PlaylistManager.create_playlist(
+                sp_client=sp_client, song_data=tracks, name=playlist_name, description=description
+            )
+        summaries.append(summary)
+    return summaries
+
+
+def _log(output):
+    """Where progress messages go: stderr when the records themselves go to stdout."""
+    return sys.stderr if output == '-' else sys.stdout
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the chart-to-playlist pipeline one stage at a time over JSON Lines files."
+    )
+    parser.add_argument("--metrics-file",
+                        help="Also write the run's metrics here (JSON for a .json file, else Prometheus text)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scrape_parser = commands.add_parser("scrape", help="Scrape charts into chart records")
+    scrape_parser.add_argument("dates", nargs="+", help="Chart dates (YYYY-MM-DD)")
+    scrape_parser.add_argument("--until", help="Scrape every chart week from the first date to this one")
+    scrape_parser.add_argument("--chart", action="append", choices=CHARTS, dest="charts",
+                               help="Chart to scrape; repeat to scrape several in one run (default: hot-100)")
+    scrape_parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    scrape_parser.add_argument("--workers", type=int, default=8, help="Concurrent chart downloads")
+
+    resolve_parser = commands.add_parser("resolve", help="Match chart records to Spotify tracks")
+    resolve_parser.add_argument("input", help="Chart records file ('-' for stdin)")
+    resolve_parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    resolve_parser.add_argument("--batch-size", type=int, default=RESOLVE_BATCH_SIZE,
+                                help="Records resolved per batch")
+    resolve_parser.add_argument("--search-concurrency", type=int, default=8, help="Concurrent Spotify searches")
+    resolve_parser.add_argument("--revalidate", action="store_true",
+                                help="Check already resolved tracks and re-resolve the ones no longer available")
+
+    commands.add_parser("revalidate-cache", help="Check every cached match and re-resolve unavailable tracks")
+
+    publish_parser = commands.add_parser("publish", help="Create playlists from resolved records")
+    publish_parser.add_argument("input", help="Resolved records file ('-' for stdin)")
+    publish_parser.add_argument("--name", default=DEFAULT_NAME,
+                                help="Playlist name, may contain {chart_date}, {chart} and {chart_name} "
+                                     "(default: '%(default)s')")
+    publish_parser.add_argument("--sync", action="store_true",
+                                help="Update existing playlists with only the changed tracks")
+    publish_parser.add_argument("--dry-run", action="store_true", help="Show the playlists without creating them")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "scrape":
+            chart_dates = chart_weeks(args.dates[0], args.until) if args.until else args.dates
+            charts = args.charts or [DEFAULT_CHART]
+            fetcher = ChartFetcher(Config.PAGE_CACHE_DIR, pool_size=args.workers)
+            with open_stream(args.output, 'w') as out, redirect_stdout(_log(args.output)):
+                count = write_records(scrape(chart_dates, fetcher, args.workers, charts), out)
+                print(f"🎶 Scraped {count} chart rows from {len(chart_dates) * len(charts)} charts.")
+
+        elif args.command == "resolve":
+            sp_client = SpotifyClient.from_config()
+            with open_stream(args.input) as f, open_stream(args.output, 'w') as out, \
+                    redirect_stdout(_log(args.output)):
+                count = write_records(
+                    resolve(read_records(f), sp_client, args.batch_size, args.search_concurrency,
+                            args.revalidate), out
+                )
+                matches = sp_client.match_report.summary()
+                print(f"🔎 Resolved {count} records: {matches['matched']} of {matches['songs']} searched songs "
+                      f"matched, {matches['average_calls']:.2f} search calls per song.")
+
+        elif args.command == "revalidate-cache":
+            report = SpotifyClient.from_config().revalidate_cache()
+            print(f"🔁 Checked {report['checked']} cached tracks: {report['relinked']} relinked, "
+                  f"{report['unavailable']} unavailable ({report['re_resolved']} re-resolved).")
+
+        else:
+            sp_client = None if args.dry_run else SpotifyClient.from_config()
+            with open_stream(args.input) as f:
+                summaries = publish(read_records(f), sp_client, args.name, args.sync, args.dry_run)
+            print(f"✅ {'Checked' if args.dry_run else 'Published'} {len(summaries)} playlists.")
+
+    except Exception as e:
+        print(f"❌ {args.command} failed: {e}")
+
+    with redirect_stdout(_log(getattr(args, 'output', None))):
+        metrics.print_report()
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# tests/test_async_client.py
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from async_client import AsyncSpotifyClient
+from benchmarks.fake_services import FakeServices
+from rate_limit import RateLimiter
+from search_cache import SearchCache
+
+
+def make_auth():
+    auth = MagicMock()
+    auth.validate_token.return_value = {'access_token': 'token', 'expires_at': 0}
+    auth.is_token_expired.return_value = False
+    return auth
+
+
+def make_client(services, **kwargs):
+    return AsyncSpotifyClient(auth_manager=make_auth(), limiter=RateLimiter(buckets={}),
+                              base_url=f"{services.url}/v1/", **kwargs)
+
+
+def test_search_tracks_resolves_many_songs_on_one_thread():
+    threads = set()
+
+    async def resolve(services):
+        async with make_client(services) as client:
+            match_track = client.match_track
+
+            async def recording(*song, **kwargs):
+                threads.add(threading.get_ident())
+                return await match_track(*song, **kwargs)
+            client.match_track = recording
+            return client, await client.search_tracks([(f"Song {n}", f"Artist {n}") for n in range(1, 201)])
+
+    with FakeServices(latency=0.01) as services:
+        client, tracks = asyncio.run(resolve(services))
+
+    assert len(threads) == 1
+    assert [t['name'] for t in tracks[:3]] == ["Song 1", "Song 2", "Song 3"]
+    assert tracks[24] is None  # Song 25 is not on the fake Spotify
+    assert client.match_report.songs == 200
+
+
+def test_token_is_read_from_the_cache_once():
+    async def resolve(services):
+        async with make_client(services) as client:
+            await client.search_tracks(["Song 1", "Song 2"])
+            return client
+
+    with FakeServices() as services:
+        client = asyncio.run(resolve(services))
+    client.auth_manager.validate_token.assert_called_once()
+
+
+def test_throttled_calls_are_retried():
+    async def resolve(services):
+        async with make_client(services) as client:
+            return client, await client.search_tracks(["Song 1", "Song 3"], max_concurrency=1)
+
+    with FakeServices(throttle_every=2) as services:
+        client, tracks = asyncio.run(resolve(services))
+
+    assert [track['name'] for track in tracks] == ["Song 1", "Song 3"]
+    assert client.api_calls == 3
+    assert services.throttled == 1
+
+
+def test_match_track_shares_the_search_cache():
+    cache = SearchCache()
+    cache.set("match:Song 1 artist:Artist 1", {'uri': 'spotify:track:cached', 'name': 'Song 1', 'artist': 'Artist 1'})
+
+    async def resolve(services):
+        async with make_client(services, cache=cache) as client:
+            return client, await client.match_track("Song 1", "Artist 1")
+
+    with FakeServices() as services:
+        client, track = asyncio.run(resolve(services))
+    assert track['uri'] == 'spotify:track:cached'
+    assert client.api_calls == 0
+
+
+def test_cache_and_shared_rate_limits_stay_off_the_event_loop(tmp_path):
+    """SQLite cache I/O and file-locked token buckets run in worker threads, not on the loop."""
+    loop_threads, disk_threads = set(), set()
+
+    class RecordingCache(SearchCache):
+        def get(self, query):
+            disk_threads.add(threading.get_ident())
+            return super().get(query)
+
+        def set(self, query, result):
+            disk_threads.add(threading.get_ident())
+            return super().set(query, result)
+
+    limiter = RateLimiter.shared(str(tmp_path), {'search': (1000, 1000)})
+    reserve = limiter.reserve
+
+    def recording_reserve(endpoint):
+        disk_threads.add(threading.get_ident())
+        return reserve(endpoint)
+    limiter.reserve = recording_reserve
+
+    async def resolve(services):
+        loop_threads.add(threading.get_ident())
+        client = AsyncSpotifyClient(auth_manager=make_auth(), limiter=limiter, cache=RecordingCache(),
+                                    base_url=f"{services.url}/v1/")
+        async with client:
+            await client.search_tracks(["Song 1", "Song 3"])
+            return await client.search_tracks(["Song 1", "Song 3"])
+
+    with FakeServices() as services:
+        tracks = asyncio.run(resolve(services))
+
+    assert [track['name'] for track in tracks] == ["Song 1", "Song 3"]
+    assert disk_threads and not disk_threads & loop_threads
+
+
+def test_create_playlist_adds_tracks_in_order():
+    tracks = [{'uri': f'spotify:track:{n}'} for n in range(250)]
+
+    async def publish(services):
+        async with make_client(services) as client:
+            playlist_id = await client.create_playlist(tracks + [None], name="Async")
+            return playlist_id, await client.fetch_playlist_uris(playlist_id)
+
+    with FakeServices() as services:
+        playlist_id, uris = asyncio.run(publish(services))
+        assert services.playlists[playlist_id]['name'] == "Async"
+    assert uris == [track['uri'] for track in tracks]
@@ -0,0 +1,206 @@
+# tests/test_backfill.py
+import pytest
+from unittest.mock import patch, MagicMock
+from backfill import chart_weeks, create_best_of, distinct_songs, fetch_charts, run_backfill
+from scraper import ChartEntry
+from song_index import SongIndex
+
+
+def entries(*songs):
+    return [ChartEntry(rank, title, artist, None, None, None) for rank, (title, artist) in enumerate(songs, 1)]
+
+
+CHARTS = {
+    "2016-07-16": entries(("Song A", "Artist A"), ("Song B", "Artist B Featuring Z"), ("Song C", "Artist C")),
+    "2016-07-23": entries(("Song B", "Artist B Featuring Z"), ("Song A", "Artist A"), ("Song D", "Artist D")),
+    "2016-07-30": [],
+}
+GENRE_CHARTS = {
+    "2016-07-16": entries(("Song E", "Artist E"), ("Song A", "Artist A")),
+}
+DISTINCT = [("Song A", "Artist A"), ("Song B", "Artist B Featuring Z"), ("Song C", "Artist C"), ("Song D", "Artist D")]
+
+
+class FakeScraper:
+    """Serves canned chart titles instead of fetching Billboard."""
+    fetchers = []
+
+    def __init__(self, date, fetcher=None, chart="hot-100"):
+        self.date = date
+        self.chart = chart
+        self.fetcher = fetcher
+        FakeScraper.fetchers.append(fetcher)
+
+    def scrape_entries(self):
+        self.fetcher.fetch(None, self.date)
+        return CHARTS.get(self.date, []) if self.chart == "hot-100" else GENRE_CHARTS.get(self.date, [])
+
+
+def make_sp_client():
+    sp_client = MagicMock()
+    sp_client.api_calls = 0
+
+    def search_tracks(songs, max_concurrency=8):
+        sp_client.api_calls += len(songs)
+        return [{'uri': f'spotify:track:{t}', 'name': t, 'artist': a} for t, a in songs]
+
+    sp_client.search_tracks.side_effect = search_tracks
+    return sp_client
+
+
+def test_chart_weeks_snaps_to_saturdays():
+    """Dates are snapped forward to the Saturday closing each chart week."""
+    assert chart_weeks("2016-07-12", "2016-07-30") == ["2016-07-16", "2016-07-23", "2016-07-30"]
+    assert chart_weeks("2016-07-16", "2016-07-16") == ["2016-07-16"]
+
+
+def test_chart_weeks_rejects_bad_dates():
+    with pytest.raises(ValueError):
+        chart_weeks("2016-13-01", "2016-12-31")
+
+
+def test_distinct_songs_dedupes_in_first_seen_order():
+    """Songs are keyed on title and full artist credit, which match_track searches with."""
+    assert distinct_songs(CHARTS) == DISTINCT
+
+
+def make_fetcher(cached=(), downloads=0, cache_hits=0):
+    """A fetcher that serves the `cached` chart dates from its cache, its counters starting at the totals given."""
+    fetcher = MagicMock()
+    fetcher.downloads, fetcher.revalidated, fetcher.cache_hits = downloads, 0, cache_hits
+
+    def fetch(url, chart_date):
+        if chart_date in cached:
+            fetcher.cache_hits += 1
+        else:
+            fetcher.downloads += 1
+
+    fetcher.fetch.side_effect = fetch
+    return fetcher
+
+
+def test_fetch_charts_shares_one_fetcher():
+    """All charts are fetched through the same pooled, caching fetcher."""
+    FakeScraper.fetchers = []
+    fetcher = make_fetcher()
+    with patch('backfill.BillboardScraper', FakeScraper):
+        charts = fetch_charts(list(CHARTS), fetcher, max_workers=3)
+
+    assert charts == CHARTS
+    assert FakeScraper.fetchers == [fetcher] * 3
+
+
+def test_run_backfill_resolves_each_song_once():
+    """Songs repeated across weeks are searched once and reused per chart."""
+    sp_client = make_sp_client()
+    with patch('backfill.BillboardScraper', FakeScraper), \
+         patch('backfill.PlaylistManager') as mock_manager:
+        playlists, report = run_backfill("2016-07-12", "2016-07-30", sp_client, fetcher=make_fetcher())
+
+    sp_client.search_tracks.assert_called_once_with(DISTINCT, max_concurrency=8)
+    assert [t['name'] for t in playlists["2016-07-23"]] == ["Song B", "Song A", "Song D"]
+    assert playlists["2016-07-30"] == []
+    # Empty charts don't get a playlist
+    assert mock_manager.create_playlist.call_count == 2
+    assert report['charts'] == 3
+    assert report['distinct_songs'] == 4
+    assert report['search_calls'] == 4
+    assert report['api_calls'] == 7
+
+
+def test_run_backfill_resolves_several_charts_together():
+    """Chart types scraped in one run share a single resolution pass."""
+    sp_client = make_sp_client()
+    with patch('backfill.BillboardScraper', FakeScraper), \
+         patch('backfill.PlaylistManager') as mock_manager:
+        playlists, report = run_backfill("2016-07-16", "2016-07-16", sp_client, fetcher=make_fetcher(),
+                                         charts=["hot-100", "country-songs"])
+
+    songs = sp_client.search_tracks.call_args.args[0]
+    assert songs == [("Song A", "Artist A"), ("Song B", "Artist B Featuring Z"), ("Song C", "Artist C"), ("Song E", "Artist E")]
+    assert [t['name'] for t in playlists[("country-songs", "2016-07-16")]] == ["Song E", "Song A"]
+    assert report['charts'] == 2
+    names = [call.kwargs['name'] for call in mock_manager.create_playlist.call_args_list]
+    assert names == ["Billboard Hot 100 - 2016-07-16", "Hot Country Songs - 2016-07-16"]
+
+
+def test_run_backfill_without_playlists():
+    sp_client = make_sp_client()
+    with patch('backfill.BillboardScraper', FakeScraper), \
+         patch('backfill.PlaylistManager') as mock_manager:
+        run_backfill("2016-07-12", "2016-07-30", sp_client, create_playlists=False, fetcher=make_fetcher())
+
+    mock_manager.create_playlist.assert_not_called()
+
+
+def test_run_backfill_reports_throughput():
+    ticks = iter([0.0, 30.0])
+    with patch('backfill.BillboardScraper', FakeScraper), patch('backfill.PlaylistManager'):
+        _, report = run_backfill("2016-07-12", "2016-07-30", make_sp_client(),
+                                 fetcher=make_fetcher(), clock=lambda: next(ticks))
+
+    assert report['elapsed_seconds'] == 30.0
+    assert report['charts_per_minute'] == 6.0
+
+
+def test_run_backfill_counts_only_network_fetches():
+    """Charts served from the page cache don't count as API calls."""
+    with patch('backfill.BillboardScraper', FakeScraper), patch('backfill.PlaylistManager'):
+        _, report = run_backfill("2016-07-12", "2016-07-30", make_sp_client(),
+                                 fetcher=make_fetcher(cached={"2016-07-16", "2016-07-23"}))
+
+    assert report['chart_fetches'] == 1
+    assert report['cached_charts'] == 2
+    assert report['api_calls'] == 1 + 4
+
+
+def test_run_backfill_counts_this_run_only_including_playlist_writes():
+    """A reused fetcher and client only count what this run did, and playlist writes are reported apart."""
+    sp_client = make_sp_client()
+    sp_client.api_calls = 50
+
+    def create_playlist(sp_client, song_data, name, description):
+        sp_client.api_calls += 2  # create, then add the tracks
+        return 'playlist'
+
+    with patch('backfill.BillboardScraper', FakeScraper), patch('backfill.PlaylistManager') as mock_manager:
+        mock_manager.create_playlist.side_effect = create_playlist
+        _, report = run_backfill("2016-07-12", "2016-07-30", sp_client,
+                                 fetcher=make_fetcher(cached={"2016-07-16"}, downloads=10, cache_hits=5))
+
+    assert (report['chart_fetches'], report['cached_charts']) == (2, 1)
+    assert (report['search_calls'], report['write_calls']) == (4, 4)
+    assert report['api_calls'] == 2 + 4 + 4
+
+
+def test_run_backfill_fills_song_index_and_best_of_playlist():
+    """Charts feed a cross-chart index whose top songs make one more playlist without new searches."""
+    index = SongIndex()
+    sp_client = make_sp_client()
+    with patch('backfill.BillboardScraper', FakeScraper), \
+         patch('backfill.PlaylistManager') as mock_manager:
+        run_backfill("2016-07-12", "2016-07-30", sp_client, create_playlists=False,
+                     fetcher=make_fetcher(), index=index)
+        create_best_of(index, sp_client, 2, by='points')
+
+    assert len(index) == 4
+    assert index.get("Song B", "Artist B").stats()['weeks'] == 2
+    kwargs = mock_manager.create_playlist.call_args.kwargs
+    assert [t['name'] for t in kwargs['song_data']] == ["Song A", "Song B"]
+    assert kwargs['name'] == "Billboard Hot 100 Best of 2016-07-16 to 2016-07-23"
+    sp_client.search_tracks.assert_called_once()
+
+
+def test_best_of_uses_its_chart_and_keeps_charts_apart():
+    index = SongIndex("country-songs")
+    sp_client = make_sp_client()
+    with patch('backfill.BillboardScraper', FakeScraper), \
+         patch('backfill.PlaylistManager') as mock_manager:
+        with pytest.raises(ValueError):
+            run_backfill("2016-07-12", "2016-07-30", sp_client, create_playlists=False,
+                         fetcher=make_fetcher(), index=index, charts=["hot-100", "country-songs"])
+        run_backfill("2016-07-12", "2016-07-30", sp_client, create_playlists=False,
+                     fetcher=make_fetcher(), index=index, charts=["country-songs", "country-songs"])
+        create_best_of(index, sp_client, 2)
+
+    assert mock_manager.create_playlist.call_args.kwargs['name'].startswith("Hot Country Songs Best of ")
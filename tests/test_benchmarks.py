@@ -0,0 +1,61 @@
+# tests/test_benchmarks.py
+import pytest
+import spotipy
+import scraper
+from benchmarks import bench_memory
+from benchmarks.bench_pipeline import compare, run_scenario
+from benchmarks.fake_services import FakeServices, chart_songs
+from scraper import parse_chart
+
+
+def test_fake_chart_pages_parse_and_change_week_to_week():
+    services = FakeServices()
+    this_week = list(parse_chart(services.chart_page("2016-07-16")))
+    next_week = list(parse_chart(services.chart_page("2016-07-23")))
+
+    assert len(this_week) == 100
+    assert {e.title for e in this_week} == {f"Song {song}" for song in chart_songs("2016-07-16")}
+    assert len({e.title for e in this_week} & {e.title for e in next_week}) == 92
+
+
+def test_fake_spotify_throttles_and_paginates():
+    with FakeServices(throttle_every=3, page_size=1) as services:
+        sp = spotipy.Spotify(auth='test', retries=0, status_retries=0)
+        sp.prefix = f"{services.url}/v1/"
+        playlist_id = sp.user_playlist_create('benchuser', 'Test')['id']
+        sp.playlist_add_items(playlist_id, ['spotify:track:a', 'spotify:track:b'])
+        with pytest.raises(spotipy.SpotifyException) as error:
+            sp.playlist_add_items(playlist_id, ['spotify:track:c'])
+        assert error.value.http_status == 429
+        assert services.throttled == 1
+
+        page = sp.playlist_items(playlist_id, limit=1)
+        assert page['items'] == [{'track': {'uri': 'spotify:track:a'}}]
+        assert sp.next(page)['items'] == [{'track': {'uri': 'spotify:track:b'}}]
+
+
+def test_chart_scenario_runs_offline(monkeypatch):
+    monkeypatch.setattr(scraper, 'BILLBOARD_URL', scraper.BILLBOARD_URL)  # Restored after the scenario rewrites it
+    with FakeServices() as services:
+        result = run_scenario('chart', services.url)
+
+    assert (result['charts'], result['songs']) == (1, 100)
+    assert result['matched'] >= 90
+    assert result['api_calls'] > 100
+    assert len(services.playlists) == 1
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {'year': {'songs_per_second': 100.0, 'api_calls': 1000, 'peak_rss_mb': 50.0}}
+    steady = [{'scenario': 'year', 'songs_per_second': 90.0, 'api_calls': 1000, 'peak_rss_mb': 55.0}]
+    slower = [{'scenario': 'year', 'songs_per_second': 50.0, 'api_calls': 1500, 'peak_rss_mb': 55.0}]
+
+    assert compare(steady, baseline, 0.25) == []
+    assert len(compare(slower, baseline, 0.25)) == 2
+
+
+def test_compact_rows_take_less_memory_than_dicts():
+    result = bench_memory.run_scenario('chart')
+
+    assert (result['charts'], result['rows']) == (1, 100)
+    assert result['compact_mb'] < result['dicts_mb']
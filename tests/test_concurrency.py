@@ -0,0 +1,100 @@
+# tests/test_concurrency.py
+import asyncio
+import time
+import pytest
+import spotipy
+from concurrency import AsyncRetryAfterGate, RetryAfterGate, async_bounded_map, bounded_map, retry_after_seconds
+
+
+def test_bounded_map_preserves_order():
+    """Results come back in input order even when later items finish first."""
+    def work(n):
+        time.sleep(0.001 * (10 - n))
+        return n * 2
+
+    assert list(bounded_map(work, range(10), max_in_flight=4)) == [n * 2 for n in range(10)]
+
+
+def test_bounded_map_consumes_input_lazily():
+    """No more than max_in_flight items are pulled ahead of the consumer."""
+    pulled = []
+
+    def source():
+        for n in range(100):
+            pulled.append(n)
+            yield n
+
+    results = bounded_map(lambda n: n, source(), max_in_flight=3)
+    assert next(results) == 0
+    assert len(pulled) == 4
+    results.close()
+
+
+def test_bounded_map_propagates_errors():
+    def work(n):
+        if n == 2:
+            raise ValueError("boom")
+        return n
+
+    results = bounded_map(work, range(5), max_in_flight=2)
+    assert next(results) == 0
+    assert next(results) == 1
+    with pytest.raises(ValueError):
+        next(results)
+
+
+def test_retry_after_gate_blocks_until_pause_elapses():
+    """wait() sleeps for the remaining pause and returns once it has passed."""
+    now = [100.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    gate = RetryAfterGate(clock=lambda: now[0], sleep=fake_sleep)
+    gate.pause(3)
+    gate.pause(1)  # A shorter pause never shortens an active one
+    gate.wait()
+
+    assert sleeps == [3]
+    gate.wait()
+    assert sleeps == [3]
+
+
+def test_retry_after_seconds_falls_back_to_exponential_backoff():
+    """Missing or malformed Retry-After headers fall back to exponential backoff."""
+    error = spotipy.SpotifyException(http_status=429, code=-1, msg="Too Many Requests")
+    assert retry_after_seconds(error, attempt=0) == 1.0
+    assert retry_after_seconds(error, attempt=3) == 8.0
+    error.headers = {'Retry-After': '7'}
+    assert retry_after_seconds(error, attempt=3) == 7.0
+
+
+def test_async_bounded_map_preserves_order_and_bounds_tasks():
+    running, peak = 0, 0
+
+    async def work(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001 * (10 - n))
+        running -= 1
+        return n * 2
+
+    async def collect():
+        return [result async for result in async_bounded_map(work, range(10), max_in_flight=4)]
+
+    assert asyncio.run(collect()) == [n * 2 for n in range(10)]
+    assert peak == 4
+
+
+def test_async_gate_holds_tasks_until_the_pause_ends():
+    async def waited():
+        gate = AsyncRetryAfterGate()
+        gate.pause(0.05)
+        started = time.monotonic()
+        await asyncio.gather(gate.wait(), gate.wait())
+        return time.monotonic() - started
+
+    assert asyncio.run(waited()) >= 0.04
@@ -0,0 +1,110 @@
+# tests/test_fetcher.py
+import pytest
+from datetime import date
+from unittest.mock import MagicMock
+import requests
+from fetcher import ChartFetcher, pooled_session
+
+URL = "https://www.billboard.com/charts/hot-100/2016-07-16/"
+TODAY = date(2024, 1, 10)
+
+
+def response(status=200, text="<html>page</html>", headers=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.text = text
+    resp.headers = headers or {}
+    if status >= 400:
+        resp.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status} error")
+    return resp
+
+
+def make_fetcher(tmp_path, *responses):
+    session = MagicMock()
+    session.get.side_effect = list(responses)
+    return ChartFetcher(str(tmp_path), session=session, today=lambda: TODAY), session
+
+
+def test_final_charts_are_served_from_disk(tmp_path):
+    """A past chart is downloaded once; later fetches never touch the network."""
+    fetcher, session = make_fetcher(tmp_path, response(text="chart"))
+
+    assert fetcher.fetch(URL, "2016-07-16") == "chart"
+    assert fetcher.fetch(URL, "2016-07-16") == "chart"
+
+    session.get.assert_called_once()
+    assert fetcher.stats == {'cache_hits': 1, 'revalidated': 0, 'downloads': 1}
+
+    # A fresh fetcher on the same cache directory also skips the network
+    again, session = make_fetcher(tmp_path)
+    assert again.fetch(URL, "2016-07-16") == "chart"
+    session.get.assert_not_called()
+
+
+def test_recent_charts_are_revalidated_with_conditional_requests(tmp_path):
+    headers = {'ETag': '"abc"', 'Last-Modified': 'Tue, 09 Jan 2024 10:00:00 GMT'}
+    fetcher, session = make_fetcher(tmp_path, response(text="current", headers=headers), response(status=304, text=""))
+
+    assert fetcher.fetch(URL, "2024-01-13") == "current"
+    assert fetcher.fetch(URL, "2024-01-13") == "current"
+
+    assert session.get.call_args_list[0].kwargs['headers'] == {}
+    assert session.get.call_args_list[1].kwargs['headers'] == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': 'Tue, 09 Jan 2024 10:00:00 GMT'
+    }
+    assert fetcher.stats == {'cache_hits': 0, 'revalidated': 1, 'downloads': 1}
+
+
+def test_changed_recent_chart_replaces_cached_copy(tmp_path):
+    fetcher, _ = make_fetcher(tmp_path, response(text="old", headers={'ETag': '1'}),
+                              response(text="new", headers={'ETag': '2'}))
+
+    fetcher.fetch(URL, "2024-01-13")
+    assert fetcher.fetch(URL, "2024-01-13") == "new"
+    assert fetcher._load(URL) == ("new", {'etag': '2', 'last_modified': None})
+
+
+def test_http_errors_are_raised_and_not_cached(tmp_path):
+    fetcher, _ = make_fetcher(tmp_path, response(status=404))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetcher.fetch(URL, "2016-07-16")
+    assert fetcher._load(URL) == (None, {})
+
+
+def test_discarded_pages_are_downloaded_again(tmp_path):
+    fetcher, session = make_fetcher(tmp_path, response(text="consent page"), response(text="chart"))
+
+    fetcher.fetch(URL, "2016-07-16")
+    fetcher.discard(URL)
+
+    assert fetcher.fetch(URL, "2016-07-16") == "chart"
+    assert session.get.call_count == 2
+
+
+def test_fetcher_without_cache_dir_always_downloads():
+    session = MagicMock()
+    session.get.return_value = response(text="chart")
+    fetcher = ChartFetcher(session=session, today=lambda: TODAY)
+
+    fetcher.fetch(URL, "2016-07-16")
+    fetcher.fetch(URL, "2016-07-16")
+
+    assert session.get.call_count == 2
+
+
+def test_is_final():
+    fetcher = ChartFetcher(session=MagicMock(), today=lambda: TODAY)
+    assert fetcher.is_final("2016-07-16")
+    assert not fetcher.is_final("2024-01-06")
+    assert not fetcher.is_final(None)
+
+
+def test_pooled_session_retries_and_pools():
+    session = pooled_session(pool_size=12, retries=4)
+    adapter = session.get_adapter("https://www.billboard.com/")
+
+    assert adapter._pool_maxsize == 12
+    assert adapter.max_retries.total == 4
+    assert 429 in adapter.max_retries.status_forcelist
+    assert "Mozilla" in session.headers["User-Agent"]
@@ -0,0 +1,142 @@
+# tests/test_instrumentation.py
+import json
+from unittest.mock import MagicMock
+import pytest
+import spotipy
+from instrumentation import Histogram, Metrics, metrics
+from playlist_manager import BatchWriter
+from scraper import BillboardScraper
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_percentiles_are_within_a_bucket():
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+
+    summary = histogram.summary()
+
+    assert summary['count'] == 100
+    assert summary['max'] == 0.1
+    assert summary['total'] == pytest.approx(5.05)
+    for key, expected in (('p50', 0.050), ('p95', 0.095), ('p99', 0.099)):
+        assert expected <= summary[key] <= expected * 1.19
+
+
+def test_timer_records_even_when_the_block_raises():
+    clock = FakeClock()
+    registry = Metrics(clock=clock)
+    with pytest.raises(RuntimeError):
+        with registry.timer('work_seconds', stage='x'):
+            clock.now += 0.5
+            raise RuntimeError("boom")
+    assert registry.histogram('work_seconds', stage='x')['total'] == 0.5
+
+
+def test_timed_iter_excludes_time_spent_by_the_consumer():
+    clock = FakeClock()
+    registry = Metrics(clock=clock)
+
+    def produce():
+        for i in range(3):
+            clock.now += 0.1  # Work done producing each item
+            yield i
+
+    for _ in registry.timed_iter('parse_seconds', produce()):
+        clock.now += 10  # Consumer work between items
+
+    histogram = registry.histogram('parse_seconds')
+    assert histogram['count'] == 1
+    assert histogram['total'] == pytest.approx(0.3)
+
+
+def test_prometheus_and_json_output(tmp_path):
+    registry = Metrics()
+    registry.count('page_cache_total', result='hit')
+    registry.count('page_cache_total', 2, result='download')
+    registry.observe('spotify_call_seconds', 0.002, endpoint='search')
+
+    text = registry.to_prometheus()
+    assert '# TYPE page_cache_total counter' in text
+    assert 'page_cache_total{result="download"} 2' in text
+    assert '# TYPE spotify_call_seconds histogram' in text
+    assert 'spotify_call_seconds_bucket{endpoint="search",le="+Inf"} 1' in text
+    assert 'spotify_call_seconds_count{endpoint="search"} 1' in text
+
+    buckets = [line for line in text.splitlines() if line.startswith('spotify_call_seconds_bucket')]
+    assert len(buckets) == 22
+    assert 'spotify_call_seconds_bucket{endpoint="search",le="0.0016"} 0' in text
+    assert 'spotify_call_seconds_bucket{endpoint="search",le="0.0032"} 1' in text
+
+    registry.write(str(tmp_path / "metrics.json"))
+    report = json.loads((tmp_path / "metrics.json").read_text())
+    assert report['counters'] == {'page_cache_total{result="download"}': 2, 'page_cache_total{result="hit"}': 1}
+    assert report['histograms']['spotify_call_seconds{endpoint="search"}']['count'] == 1
+
+
+def test_prometheus_buckets_are_the_same_between_scrapes():
+    """Every histogram series exports the same `le` buckets, observed or not, so rate() works across scrapes."""
+    registry = Metrics()
+    registry.observe('search_seconds', 0.002)
+    first = [line.rsplit(' ', 1)[0] for line in registry.to_prometheus().splitlines() if '_bucket' in line]
+    registry.observe('search_seconds', 30.0)
+    second = [line.rsplit(' ', 1)[0] for line in registry.to_prometheus().splitlines() if '_bucket' in line]
+
+    assert first == second
+
+
+def test_scraper_records_fetch_and_parse_time():
+    session = MagicMock()
+    session.get.return_value.text = "<html><body>No chart here</body></html>"
+
+    list(BillboardScraper("2016-07-16", session=session).iter_entries())
+
+    assert metrics.histogram('http_fetch_seconds')['count'] == 1
+    assert metrics.histogram('parse_seconds')['count'] == 1
+
+
+def test_batch_writer_counts_retries_and_add_latency():
+    sp_client = MagicMock()
+    sp_client.sp.playlist_add_items.side_effect = [spotipy.SpotifyException(502, -1, "Bad gateway"), None]
+
+    BatchWriter(sp_client, 'playlist', sleep=lambda seconds: None).write(['uri'])
+
+    assert metrics.counter('batch_retries_total') == 1
+    assert metrics.histogram('batch_add_seconds')['count'] == 2
+
+
+def test_spotify_client_records_call_latency_cache_hits_and_429s():
+    from rate_limit import RateLimiter
+    from search_cache import SearchCache
+    from spotify_client import SpotifyClient
+
+    spotify = MagicMock()
+    spotify.search.side_effect = [
+        spotipy.SpotifyException(429, -1, "Too many requests", headers={'Retry-After': '0'}),
+        {'tracks': {'items': []}},
+    ]
+    client = SpotifyClient(cache=SearchCache(), limiter=RateLimiter(buckets={}))
+    client._connect = lambda: spotify
+
+    client.search_track("Song A")
+    client.search_track("Song A")
+
+    assert metrics.histogram('spotify_call_seconds', endpoint='search')['count'] == 2
+    assert metrics.counter('spotify_throttled_total', endpoint='search') == 1
+    assert metrics.counter('spotify_retries_total', endpoint='search') == 1
+    assert metrics.counter('search_cache_total', result='hit') == 1
+    assert metrics.counter('search_cache_total', result='miss') == 1
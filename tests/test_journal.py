@@ -0,0 +1,39 @@
+# tests/test_journal.py
+from journal import RunJournal
+
+
+def test_journal_replays_every_event(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    journal = RunJournal(path)
+    journal.record_row({'chart_date': '2016-07-16', 'rank': 1, 'title': 'Song A'})
+    journal.record_scraped()
+    journal.record_track(0, {'uri': 'spotify:track:a', 'name': 'Song A', 'artist': 'Artist'})
+    journal.record_playlist('playlist')
+    journal.record_batch(0, 1)
+    journal.close()
+
+    replayed = RunJournal(path)
+    assert replayed.started and replayed.scraped and not replayed.done
+    assert replayed.records[0]['title'] == 'Song A'
+    assert replayed.tracks == {0: {'uri': 'spotify:track:a', 'name': 'Song A', 'artist': 'Artist'}}
+    assert (replayed.playlist_id, replayed.batches) == ('playlist', {0: 1})
+
+
+def test_journal_ignores_a_line_torn_by_a_crash(tmp_path):
+    path = tmp_path / "run.jsonl"
+    path.write_text('{"event":"playlist","playlist_id":"p1"}\n{"event":"batch","off', encoding='utf-8')
+
+    journal = RunJournal(str(path))
+    assert journal.playlist_id == 'p1'
+    assert journal.batches == {}
+
+
+def test_discard_starts_over(tmp_path):
+    journal = RunJournal.for_run(str(tmp_path), "hot-100", "2016-07-16", "Billboard Hot 100 - 2016-07-16")
+    journal.record_playlist('p1')
+    journal.finish()
+    journal.discard()
+
+    assert not journal.done and journal.playlist_id is None
+    assert RunJournal(journal.path).playlist_id is None
+    assert journal.path.endswith("hot-100-2016-07-16-Billboard_Hot_100_-_2016-07-16.jsonl")
@@ -0,0 +1,95 @@
+# tests/test_matching.py
+import pytest
+from matching import (
+    MatchReport, best_candidate, match_steps, normalize_artist, normalize_title, query_ladder, score_candidate
+)
+
+
+def track(name, *artists):
+    return {'uri': f'spotify:track:{name}', 'name': name, 'artists': [{'name': a} for a in artists]}
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("One Dance", "one dance"),
+    ("Cheap Thrills (feat. Sean Paul)", "cheap thrills"),
+    ("Bohemian Rhapsody - Remastered 2011", "bohemian rhapsody"),
+    ("Work From Home [Radio Edit]", "work from home"),
+    ("Don't Let Me Down ft. Daya", "dont let me down"),
+    ("Me, Myself & I", "me myself and i"),
+    ("Love Yourself (Acoustic)", "love yourself acoustic"),
+])
+def test_normalize_title(title, expected):
+    assert normalize_title(title) == expected
+
+
+def test_normalize_artist_keeps_lead_artist():
+    assert normalize_artist("Drake Featuring WizKid & Kyla") == "drake"
+    assert normalize_artist("P!nk") == "p nk"
+
+
+def test_score_candidate_ignores_version_tags():
+    assert score_candidate("Cheap Thrills", "Sia", track("Cheap Thrills (feat. Sean Paul)", "Sia")) == 1.0
+
+
+def test_score_candidate_matches_any_credited_artist():
+    assert score_candidate("Closer", "The Chainsmokers", track("Closer", "Halsey", "The Chainsmokers")) == 1.0
+
+
+@pytest.mark.parametrize("artist", ["Simon & Garfunkel", "Earth, Wind & Fire", "Tyler, The Creator"])
+def test_score_candidate_matches_full_credit_of_duos_and_bands(artist):
+    assert score_candidate("Song", artist, track("Song", artist)) == 1.0
+
+
+def test_best_candidate_prefers_the_band_over_a_lead_name_cover():
+    tracks = [track("The Boxer", "Simon Smith"), track("The Boxer", "Simon & Garfunkel")]
+    best, _ = best_candidate("The Boxer", "Simon & Garfunkel", tracks)
+    assert best['artists'][0]['name'] == "Simon & Garfunkel"
+
+
+def test_score_candidate_without_artist_uses_title_only():
+    assert score_candidate("Closer", None, track("Closer", "Anyone")) == 1.0
+
+
+def test_best_candidate_rejects_weak_matches():
+    tracks = [track("Something Else", "Someone")]
+    best, score = best_candidate("Cheap Thrills", "Sia", tracks)
+    assert best is None
+    assert score < 0.75
+
+
+def test_match_steps_searches_looser_queries_until_a_candidate_matches():
+    steps = match_steps("Cheap Thrills", "Sia Featuring Sean Paul", max_calls=3)
+    queries = [next(steps), steps.send([track("Something Else", "Someone")])]
+    with pytest.raises(StopIteration) as done:
+        steps.send([track("Cheap Thrills (feat. Sean Paul)", "Sia")])
+
+    assert queries == ["track:Cheap Thrills artist:Sia", "cheap thrills sia"]
+    assert done.value.value['name'] == "Cheap Thrills (feat. Sean Paul)"
+
+
+def test_query_ladder_goes_from_strict_to_loose():
+    assert query_ladder("Cheap Thrills", "Sia Featuring Sean Paul") == [
+        "track:Cheap Thrills artist:Sia",
+        "cheap thrills sia",
+        "track:cheap thrills",
+    ]
+
+
+def test_query_ladder_without_artist_falls_back_to_free_text():
+    assert query_ladder("Closer") == ["track:Closer", "closer"]
+
+
+def test_match_report_tallies_calls_per_song():
+    report = MatchReport()
+    report.record({'uri': 'x'}, 1)
+    report.record(None, 3)
+    report.record({'uri': 'y'}, 0)
+
+    assert report.summary() == {
+        'songs': 3,
+        'matched': 2,
+        'match_rate': pytest.approx(2 / 3),
+        'calls': 4,
+        'average_calls': pytest.approx(4 / 3),
+        'calls_per_song': {0: 1, 1: 1, 3: 1},
+    }
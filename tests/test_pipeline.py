@@ -0,0 +1,198 @@
+# tests/test_pipeline.py
+from unittest.mock import MagicMock
+import requests
+import spotipy
+from journal import RunJournal
+from pipeline import journaled_chart_to_playlist, stream_chart_to_playlist
+from scraper import ChartEntry
+
+
+def entry(title, artist="Artist"):
+    return ChartEntry(1, title, artist, None, None, None)
+
+
+def make_sp_client(missing=()):
+    sp_client = MagicMock()
+    sp_client.sp.current_user.return_value = {'id': 'user'}
+    sp_client.sp.user_playlist_create.return_value = {'id': 'playlist'}
+    sp_client.match_track.side_effect = lambda title, artist, **kwargs: (
+        None if title in missing else {'uri': f'spotify:track:{title}', 'name': title, 'artist': 'X'}
+    )
+    return sp_client
+
+
+def test_stream_chart_to_playlist_adds_batches_as_they_fill():
+    """Tracks are flushed to the playlist every batch_size matches, in chart order."""
+    titles = [f"S{i}" for i in range(7)]
+    scraper = MagicMock()
+    scraper.iter_entries.return_value = iter(entry(t) for t in titles)
+    sp_client = make_sp_client(missing={"S3"})
+
+    summary = stream_chart_to_playlist(scraper, sp_client, "Name", batch_size=3, max_concurrency=2)
+
+    assert summary == {'songs': 7, 'matched': 6, 'playlist_id': 'playlist'}
+    calls = [c.args for c in sp_client.sp.playlist_add_items.call_args_list]
+    assert calls == [
+        ('playlist', ['spotify:track:S0', 'spotify:track:S1', 'spotify:track:S2']),
+        ('playlist', ['spotify:track:S4', 'spotify:track:S5', 'spotify:track:S6']),
+    ]
+
+
+def test_stream_chart_to_playlist_adds_first_batch_before_scrape_finishes():
+    """The first full batch is written while the chart is still being parsed."""
+    sp_client = make_sp_client()
+    scraped_when_first_added = []
+    scraped = []
+
+    def songs():
+        for i in range(5):
+            scraped.append(i)
+            yield entry(f"S{i}")
+
+    sp_client.sp.playlist_add_items.side_effect = lambda *a, **kw: scraped_when_first_added.append(len(scraped))
+    scraper = MagicMock()
+    scraper.iter_entries.return_value = songs()
+
+    stream_chart_to_playlist(scraper, sp_client, "Name", batch_size=2, max_concurrency=1)
+
+    assert scraped_when_first_added[0] < 5
+
+
+def test_stream_chart_to_playlist_handles_scrape_failure():
+    """A failed fetch ends the stream without creating a playlist."""
+    scraper = MagicMock()
+    scraper.iter_entries.side_effect = requests.exceptions.ConnectionError("down")
+    sp_client = make_sp_client()
+
+    summary = stream_chart_to_playlist(scraper, sp_client, "Name")
+
+    assert summary == {'songs': 0, 'matched': 0, 'playlist_id': None}
+    sp_client.sp.user_playlist_create.assert_not_called()
+
+
+def test_stream_chart_to_playlist_searches_with_artist():
+    """Each row is matched on its title and artist credit."""
+    scraper = MagicMock()
+    scraper.iter_entries.return_value = iter([entry("One Dance", "Drake Featuring WizKid & Kyla")])
+    sp_client = make_sp_client()
+
+    stream_chart_to_playlist(scraper, sp_client, "Name")
+
+    sp_client.match_track.assert_called_once_with("One Dance", "Drake Featuring WizKid & Kyla")
+
+
+def make_scraper(titles):
+    scraper = MagicMock()
+    scraper.date, scraper.chart.slug = "2016-07-16", "hot-100"
+    scraper.iter_entries.side_effect = lambda: iter(entry(t) for t in titles)
+    return scraper
+
+
+def test_journaled_run_resumes_only_the_missing_batches(tmp_path):
+    """A rerun after a failed batch reuses the playlist and searches and writes just that batch."""
+    path = str(tmp_path / "run.jsonl")
+    titles = [f"S{i}" for i in range(7)]
+    sp_client = make_sp_client()
+    sp_client.sp.playlist_add_items.side_effect = [None, spotipy.SpotifyException(403, -1, "forbidden"), None]
+
+    journal = RunJournal(path)
+    summary = journaled_chart_to_playlist(make_scraper(titles), sp_client, "Name", journal, batch_size=3)
+    journal.close()
+    assert summary == {'songs': 7, 'matched': 7, 'playlist_id': 'playlist'}
+    assert not journal.done
+
+    sp_client = make_sp_client()
+    scraper = make_scraper(titles)
+    journal = RunJournal(path)
+    journaled_chart_to_playlist(scraper, sp_client, "Name", journal, batch_size=3)
+
+    scraper.iter_entries.assert_not_called()
+    sp_client.match_track.assert_not_called()
+    sp_client.sp.user_playlist_create.assert_not_called()
+    sp_client.sp.playlist_add_items.assert_called_once_with(
+        'playlist', ['spotify:track:S3', 'spotify:track:S4', 'spotify:track:S5'], position=3
+    )
+    assert journal.done
+
+
+def test_journaled_run_does_not_journal_an_empty_scrape(tmp_path):
+    journal = RunJournal(str(tmp_path / "run.jsonl"))
+    summary = journaled_chart_to_playlist(make_scraper([]), make_sp_client(), "Name", journal)
+    assert summary['songs'] == 0
+    assert not journal.started
+
+
+def test_journaled_run_searches_failed_songs_again_on_resume(tmp_path):
+    """A search that errored is not journaled as "not found", so the rerun retries it."""
+    path = str(tmp_path / "run.jsonl")
+    titles = ["S0", "S1", "S2"]
+    sp_client = make_sp_client()
+    sp_client.match_track.side_effect = lambda title, artist, on_error=None: (
+        on_error if title == "S1" else {'uri': f'spotify:track:{title}', 'name': title, 'artist': 'X'}
+    )
+
+    journal = RunJournal(path)
+    journaled_chart_to_playlist(make_scraper(titles), sp_client, "Name", journal)
+    journal.close()
+    assert 1 not in RunJournal(path).tracks
+    sp_client.sp.user_playlist_create.assert_not_called()
+
+    sp_client = make_sp_client()
+    journal = RunJournal(path)
+    summary = journaled_chart_to_playlist(make_scraper(titles), sp_client, "Name", journal)
+
+    assert [c.args[0] for c in sp_client.match_track.call_args_list] == ["S1"]
+    assert summary == {'songs': 3, 'matched': 3, 'playlist_id': 'playlist'}
+    assert journal.done
+
+
+def test_journaled_run_adds_first_batch_before_scrape_finishes(tmp_path):
+    """Journaling keeps the pipeline streaming: batches land while the chart is still parsed."""
+    sp_client = make_sp_client()
+    scraped, scraped_when_first_added = [], []
+
+    def songs():
+        for i in range(5):
+            scraped.append(i)
+            yield entry(f"S{i}")
+
+    sp_client.sp.playlist_add_items.side_effect = lambda *a, **kw: scraped_when_first_added.append(len(scraped))
+    scraper = make_scraper([])
+    scraper.iter_entries.side_effect = songs
+
+    journal = RunJournal(str(tmp_path / "run.jsonl"))
+    journaled_chart_to_playlist(scraper, sp_client, "Name", journal, batch_size=2, max_concurrency=1)
+
+    assert scraped_when_first_added[0] < 5
+    assert journal.done and len(journal.records) == 5
+
+
+def test_journaled_run_resumes_a_scrape_that_failed_midway(tmp_path):
+    """Full batches from the parsed rows are kept; the partial last batch waits for the rest of the chart."""
+    path = str(tmp_path / "run.jsonl")
+    titles = [f"S{i}" for i in range(5)]
+
+    def broken():
+        yield from (entry(t) for t in titles[:3])
+        raise ValueError("Chart row without a song title")
+
+    scraper = make_scraper([])
+    scraper.iter_entries.side_effect = broken
+    sp_client = make_sp_client()
+    journal = RunJournal(path)
+    journaled_chart_to_playlist(scraper, sp_client, "Name", journal, batch_size=2)
+    journal.close()
+    assert [c.args[1] for c in sp_client.sp.playlist_add_items.call_args_list] == [
+        ['spotify:track:S0', 'spotify:track:S1']
+    ]
+    assert not journal.scraped and not journal.done
+
+    sp_client = make_sp_client()
+    journal = RunJournal(path)
+    journaled_chart_to_playlist(make_scraper(titles), sp_client, "Name", journal, batch_size=2)
+
+    assert [c.args[0] for c in sp_client.match_track.call_args_list] == ["S3", "S4"]
+    assert [(c.args[1], c.kwargs['position']) for c in sp_client.sp.playlist_add_items.call_args_list] == [
+        (['spotify:track:S2', 'spotify:track:S3'], 2), (['spotify:track:S4'], 4)
+    ]
+    assert journal.done and len(journal.records) == 5
@@ -1,8 +1,11 @@
 # tests/test_playlist_manager.py
 import pytest
 from unittest.mock import patch, MagicMock, create_autospec
+import requests
 import spotipy
-from playlist_manager import PlaylistManager
+import playlist_manager
+from concurrency import RetryAfterGate
+from playlist_manager import BatchWriter, PlaylistManager
 
 # Sample song data as would be returned by SpotifyClient.search_track
 SAMPLE_SONG_DATA = [
@@ -43,10 +46,11 @@ def test_create_playlist_success():
         public=True,
         description='A test playlist'
     )
-    # Should add 3 URIs (from non-None items in SAMPLE_SONG_DATA)
+    # Should add 3 URIs (from non-None items in SAMPLE_SONG_DATA), inserted at an explicit position
     mock_sp_instance.playlist_add_items.assert_called_once_with(
         'test_playlist_id',
-        ['spotify:track:1', 'spotify:track:2', 'spotify:track:3']
+        ['spotify:track:1', 'spotify:track:2', 'spotify:track:3'],
+        position=0
     )
 
     assert playlist_id == 'test_playlist_id'
@@ -161,3 +165,281 @@ def test_create_playlist_spotify_api_error_on_add_tracks():
     assert playlist_id == 'playlist_id_with_errors'
     # --- END FIX 2c ---
 # --- End of fixes for remaining tests ---
+
+
+def test_stream_playlist_creates_lazily_and_flushes_batches():
+    """stream_playlist creates the playlist on the first match and adds full batches."""
+    mock_sp_client = MagicMock()
+    mock_sp_instance = mock_sp_client.sp
+    mock_sp_instance.current_user.return_value = {'id': 'test_user_id'}
+    mock_sp_instance.user_playlist_create.return_value = {'id': 'stream_id'}
+
+    playlist_id = PlaylistManager.stream_playlist(
+        sp_client=mock_sp_client,
+        tracks=iter(SAMPLE_SONG_DATA),
+        name="Stream",
+        batch_size=2
+    )
+
+    assert playlist_id == 'stream_id'
+    assert [c.args for c in mock_sp_instance.playlist_add_items.call_args_list] == [
+        ('stream_id', ['spotify:track:1', 'spotify:track:2']),
+        ('stream_id', ['spotify:track:3']),
+    ]
+
+
+def test_stream_playlist_no_valid_tracks():
+    """No playlist is created when nothing matched."""
+    mock_sp_client = MagicMock()
+
+    playlist_id = PlaylistManager.stream_playlist(mock_sp_client, iter([None, None]), name="Empty")
+
+    assert playlist_id is None
+    mock_sp_client.sp.user_playlist_create.assert_not_called()
+
+
+def apply_plan(current, plan):
+    """Replay a sync plan the way Spotify would apply it."""
+    tracks = list(current)
+    for uri, position in sorted(plan['removals'], key=lambda removal: -removal[1]):
+        assert tracks[position] == uri
+        tracks.pop(position)
+    for range_start, insert_before in plan['moves']:
+        track = tracks.pop(range_start)
+        tracks.insert(insert_before - 1 if range_start < insert_before else insert_before, track)
+    for position, uris in plan['additions']:
+        tracks[position:position] = uris
+    return tracks
+
+
+@pytest.mark.parametrize("current, desired", [
+    ([], ['a', 'b', 'c']),
+    (['a', 'b', 'c'], ['a', 'b', 'c']),
+    (['a', 'b', 'c'], []),
+    (['a', 'b', 'c', 'd'], ['a', 'x', 'c', 'd', 'y']),
+    (['a', 'b', 'c', 'd'], ['d', 'a', 'b', 'c']),
+    (['a', 'b', 'c', 'd'], ['b', 'c', 'd', 'a']),
+    (['a', 'a', 'b'], ['b', 'a', 'a']),
+    (['a', 'b', 'c', 'd', 'e'], ['e', 'd', 'c', 'b', 'a']),
+])
+def test_plan_sync_produces_desired_order(current, desired):
+    plan = playlist_manager.plan_sync(current, desired)
+    assert apply_plan(current, plan) == list(dict.fromkeys(desired))
+
+
+def test_plan_sync_is_minimal_for_small_changes():
+    """A single moved track costs a single reorder, and unchanged tracks are left alone."""
+    current = [f't{i}' for i in range(100)]
+    desired = current[:]
+    desired.insert(10, desired.pop(90))
+    desired[50] = 'new'
+
+    plan = playlist_manager.plan_sync(current, desired)
+
+    assert plan['moves'] == [(89, 10)]
+    assert plan['removals'] == [('t49', 49)]
+    assert plan['additions'] == [(50, ['new'])]
+
+
+def test_plan_sync_batches_long_additions():
+    plan = playlist_manager.plan_sync([], [f't{i}' for i in range(250)])
+    assert [(position, len(uris)) for position, uris in plan['additions']] == [(0, 100), (100, 100), (200, 50)]
+
+
+def make_sync_client(existing=None, pages=1):
+    """A mocked client whose user owns one playlist holding `existing` tracks."""
+    mock_sp_client = MagicMock()
+    sp = mock_sp_client.sp
+    sp.current_user.return_value = {'id': 'test_user_id'}
+    sp.current_user_playlists.return_value = {
+        'items': [{'id': 'other', 'name': 'Other', 'owner': {'id': 'test_user_id'}}],
+        'next': 'page-2',
+    }
+    playlist_page = {'items': [{'id': 'existing_id', 'name': 'Weekly', 'owner': {'id': 'test_user_id'}}], 'next': None}
+
+    existing = existing or []
+    size = -(-len(existing) // pages) if existing else 1
+    item_pages = [
+        {'items': [{'track': {'uri': uri}} for uri in existing[i:i + size]],
+         'next': 'more' if i + size < len(existing) else None}
+        for i in range(0, max(len(existing), 1), size)
+    ]
+    sp.playlist_items.return_value = item_pages[0]
+    sp.next.side_effect = [playlist_page] + item_pages[1:]
+    sp.user_playlist_create.return_value = {'id': 'new_id'}
+    return mock_sp_client
+
+
+def test_sync_playlist_finds_existing_playlist_and_applies_diff():
+    """An existing playlist is found by name across pages and only edited where it differs."""
+    existing = ['spotify:track:1', 'spotify:track:2', 'spotify:track:old', 'spotify:track:3']
+    mock_sp_client = make_sync_client(existing, pages=2)
+
+    report = PlaylistManager.sync_playlist(mock_sp_client, SAMPLE_SONG_DATA, name="Weekly")
+
+    sp = mock_sp_client.sp
+    sp.user_playlist_create.assert_not_called()
+    sp.playlist_remove_specific_occurrences_of_items.assert_called_once_with(
+        'existing_id', [{'uri': 'spotify:track:old', 'positions': [2]}]
+    )
+    sp.playlist_add_items.assert_not_called()
+    assert report == {'playlist_id': 'existing_id', 'strategy': 'diff', 'added': 0, 'removed': 1,
+                      'moved': 0, 'write_calls': 1}
+
+
+def test_sync_playlist_unchanged_makes_no_writes():
+    existing = ['spotify:track:1', 'spotify:track:2', 'spotify:track:3']
+    mock_sp_client = make_sync_client(existing)
+
+    report = PlaylistManager.sync_playlist(mock_sp_client, SAMPLE_SONG_DATA, playlist_id='existing_id')
+
+    assert report['write_calls'] == 0
+    mock_sp_client.sp.current_user_playlists.assert_not_called()
+
+
+def test_sync_playlist_replaces_when_cheaper_than_diff():
+    """Scattered changes fall back to a single replace call."""
+    existing = [f'spotify:track:{i}' for i in range(10)]
+    desired = [{'uri': f'spotify:track:{i}' if i % 2 else f'spotify:track:new{i}'} for i in range(10)]
+    mock_sp_client = make_sync_client(existing)
+
+    report = PlaylistManager.sync_playlist(mock_sp_client, desired, playlist_id='existing_id')
+
+    mock_sp_client.sp.playlist_replace_items.assert_called_once_with(
+        'existing_id', [track['uri'] for track in desired]
+    )
+    assert report['strategy'] == 'replace'
+    assert report['write_calls'] == 1
+
+
+def test_sync_playlist_creates_missing_playlist():
+    mock_sp_client = make_sync_client()
+    mock_sp_client.sp.next.side_effect = [{'items': [], 'next': None}]
+
+    report = PlaylistManager.sync_playlist(mock_sp_client, SAMPLE_SONG_DATA, name="Brand New")
+
+    mock_sp_client.sp.user_playlist_create.assert_called_once()
+    mock_sp_client.sp.playlist_add_items.assert_called_once_with(
+        'new_id', ['spotify:track:1', 'spotify:track:2', 'spotify:track:3'], position=0
+    )
+    assert report['write_calls'] == 2
+
+
+def test_sync_playlist_api_error_returns_none():
+    mock_sp_client = make_sync_client(['spotify:track:9'])
+    mock_sp_client.sp.playlist_remove_specific_occurrences_of_items.side_effect = spotipy.SpotifyException(
+        http_status=403, code=-1, msg="Forbidden"
+    )
+
+    assert PlaylistManager.sync_playlist(mock_sp_client, [None], playlist_id='existing_id') is None
+
+
+def make_writer_client():
+    mock_sp_client = MagicMock()
+    mock_sp_client.backoff = RetryAfterGate(clock=lambda: 0.0, sleep=lambda s: None)
+    mock_sp_client.backoff.pause = MagicMock()
+    return mock_sp_client
+
+
+def uris(n):
+    return [f'spotify:track:{i}' for i in range(n)]
+
+
+def test_batch_writer_inserts_batches_at_explicit_positions():
+    mock_sp_client = make_writer_client()
+    writer = BatchWriter(mock_sp_client, 'pl', start_position=5)
+
+    results = writer.write(uris(250))
+
+    assert [(r.number, r.position, len(r.uris), r.added) for r in results] == [
+        (1, 5, 100, True), (2, 105, 100, True), (3, 205, 50, True)
+    ]
+    assert [c.kwargs['position'] for c in mock_sp_client.sp.playlist_add_items.call_args_list] == [5, 105, 205]
+    assert writer.added == 250
+
+
+def test_batch_writer_leaves_rate_limit_retries_to_the_client():
+    """A 429 reaching the writer has already been retried by SpotifyClient._call, so it isn't retried again."""
+    mock_sp_client = make_writer_client()
+    mock_sp_client.sp.playlist_add_items.side_effect = [
+        spotipy.SpotifyException(http_status=429, code=-1, msg="Too Many Requests", headers={'Retry-After': '4'}),
+        None,
+    ]
+    writer = BatchWriter(mock_sp_client, 'pl')
+
+    [result] = writer.write(uris(3))
+
+    assert not result.added and result.attempts == 1
+    mock_sp_client.backoff.pause.assert_not_called()
+
+
+def test_batch_writer_backs_off_on_server_errors():
+    sleeps = []
+    mock_sp_client = make_writer_client()
+    mock_sp_client.sp.playlist_add_items.side_effect = [
+        spotipy.SpotifyException(http_status=502, code=-1, msg="Bad Gateway"),
+        requests.exceptions.ConnectionError("reset"),
+        None,
+    ]
+    writer = BatchWriter(mock_sp_client, 'pl', backoff_base=0.5, sleep=sleeps.append)
+
+    [result] = writer.write(uris(3))
+
+    assert result.added and result.attempts == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_batch_writer_reports_failed_batches_and_keeps_order():
+    """A batch that keeps failing is reported; later batches land right after the last success."""
+    mock_sp_client = make_writer_client()
+    forbidden = spotipy.SpotifyException(http_status=403, code=-1, msg="Forbidden")
+    mock_sp_client.sp.playlist_add_items.side_effect = [None, forbidden, None]
+    writer = BatchWriter(mock_sp_client, 'pl', batch_size=2)
+
+    results = writer.write(uris(6))
+
+    assert [(r.position, r.added, r.attempts) for r in results] == [(0, True, 1), (2, False, 1), (2, True, 1)]
+    assert writer.added == 4
+    assert writer.failed == [results[1]]
+    assert "Forbidden" in results[1].error
+
+
+def test_batch_writer_gives_up_after_max_retries():
+    mock_sp_client = make_writer_client()
+    mock_sp_client.sp.playlist_add_items.side_effect = spotipy.SpotifyException(
+        http_status=503, code=-1, msg="Unavailable"
+    )
+    writer = BatchWriter(mock_sp_client, 'pl', max_retries=2, sleep=lambda s: None)
+
+    [result] = writer.write(uris(3))
+
+    assert not result.added
+    assert result.attempts == 3
+
+
+def test_batch_writer_pipelines_unordered_batches():
+    mock_sp_client = make_writer_client()
+    writer = BatchWriter(mock_sp_client, 'pl', batch_size=10)
+
+    results = writer.write(uris(45), ordered=False, max_in_flight=3)
+
+    assert [r.number for r in results] == [1, 2, 3, 4, 5]
+    assert all(r.added and r.position is None for r in results)
+    assert mock_sp_client.sp.playlist_add_items.call_count == 5
+    assert all('position' not in c.kwargs for c in mock_sp_client.sp.playlist_add_items.call_args_list)
+
+
+def test_create_playlist_reports_actual_tracks_added(capsys):
+    """The summary counts only batches that were actually added."""
+    mock_sp_client = make_writer_client()
+    mock_sp_client.sp.current_user.return_value = {'id': 'test_user_id'}
+    mock_sp_client.sp.user_playlist_create.return_value = {'id': 'pl'}
+    mock_sp_client.sp.playlist_add_items.side_effect = spotipy.SpotifyException(
+        http_status=403, code=-1, msg="Forbidden"
+    )
+
+    PlaylistManager.create_playlist(mock_sp_client, SAMPLE_SONG_DATA)
+
+    out = capsys.readouterr().out
+    assert "Added 0 of 3 tracks" in out
+    assert "Added 3 tracks" not in out
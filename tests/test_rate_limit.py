@@ -0,0 +1,104 @@
+# tests/test_rate_limit.py
+from unittest.mock import MagicMock
+import spotipy
+from rate_limit import FileTokenBucket, RateLimiter, TokenBucket, endpoint_class
+from spotify_client import SpotifyClient
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_a_burst_then_spaces_calls_out():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits == [0.0, 0.0, 0.0, 0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_token_bucket_reserves_tokens_for_concurrent_callers():
+    """Callers arriving together queue up behind each other instead of all waking at once."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=lambda seconds: None)
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 1.0, 2.0]
+
+
+def test_reserve_takes_a_token_without_sleeping():
+    """Coroutines reserve a token and sleep on the event loop themselves."""
+    clock = FakeClock()
+    limiter = RateLimiter({'search': TokenBucket(rate=2, capacity=1, clock=clock, sleep=clock.sleep)})
+
+    assert [limiter.reserve('search') for _ in range(3)] == [0.0, 0.5, 1.0]
+    assert limiter.reserve('read') == 0.0
+    assert clock.slept == []
+
+
+def test_file_token_bucket_is_shared_between_instances(tmp_path):
+    """Two buckets on the same file (as in two processes) draw from one budget."""
+    clock = FakeClock(1000.0)
+    path = str(tmp_path / "search.bucket")
+    first = FileTokenBucket(path, rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+    second = FileTokenBucket(path, rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    assert first.acquire() == 1.0
+
+
+def test_endpoint_class():
+    assert endpoint_class('search') == 'search'
+    assert endpoint_class('playlist_add_items') == 'write'
+    assert endpoint_class('current_user') == 'read'
+
+
+def test_limiter_leaves_unknown_classes_unlimited_but_measured():
+    limiter = RateLimiter(buckets={})
+    assert limiter.acquire('search') == 0.0
+    limiter.record('search', 0.25, 0.5, throttled=True)
+    assert limiter.metrics == {'search': {'calls': 1, 'throttled': 1, 'wait_seconds': 0.25, 'call_seconds': 0.5}}
+
+
+def test_limiter_from_config_uses_shared_buckets(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPOTIFY_RATE_LIMIT_DIR", str(tmp_path))
+    monkeypatch.setenv("SPOTIFY_RATE_LIMIT_WRITE", "2.5")
+
+    limiter = RateLimiter.from_config()
+
+    assert isinstance(limiter.buckets['write'], FileTokenBucket)
+    assert (limiter.buckets['write'].rate, limiter.buckets['write'].capacity) == (2.5, 5)
+    assert limiter.buckets['search'].rate == 10.0
+
+
+def test_every_spotify_call_goes_through_the_limiter():
+    """Searches and playlist calls are limited per endpoint class and their time is measured."""
+    limiter = RateLimiter(buckets={}, clock=FakeClock())
+    limiter.acquire = MagicMock(return_value=0.0)
+    client = SpotifyClient(limiter=limiter)
+    spotify = MagicMock()
+    spotify.search.return_value = {'tracks': {'items': []}}
+    spotify.playlist_add_items.side_effect = [
+        spotipy.SpotifyException(429, -1, "Too many requests", headers={'Retry-After': '0'}), None
+    ]
+    client._connect = lambda: spotify
+
+    client.search_track("Song A")
+    client.sp.current_user()
+    client.sp.playlist_add_items('playlist', ['uri'])
+
+    assert [c.args[0] for c in limiter.acquire.call_args_list] == ['search', 'read', 'write', 'write']
+    assert client.api_calls == 4
+    assert limiter.metrics['write']['calls'] == 2
+    assert limiter.metrics['write']['throttled'] == 1
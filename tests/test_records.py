@@ -0,0 +1,34 @@
+# tests/test_records.py
+import io
+import pytest
+from records import entry_to_record, read_records, record_to_entry, write_records
+from scraper import ChartEntry
+
+
+def test_chart_entry_round_trips_through_json_lines():
+    entries = [
+        ChartEntry(1, "Song A", "Artist A Featuring B", 2, 1, 10),
+        ChartEntry(2, "Sóng B", "Ärtist", None, None, None),
+    ]
+    buffer = io.StringIO()
+
+    count = write_records((entry_to_record("2016-07-16", e) for e in entries), buffer)
+
+    assert count == 2
+    lines = buffer.getvalue().splitlines()
+    assert lines[0] == ('{"chart_date":"2016-07-16","rank":1,"title":"Song A","artist":"Artist A Featuring B",'
+                        '"last_week":2,"peak":1,"weeks_on_chart":10}')
+    assert "Sóng B" in lines[1]  # Kept as UTF-8 rather than escaped
+    records = list(read_records(io.StringIO(buffer.getvalue())))
+    assert [record_to_entry(r) for r in records] == entries
+
+
+def test_entry_to_record_adds_extra_fields():
+    record = entry_to_record("2016-07-16", ChartEntry(1, "Song", "Artist", None, None, None), track=None)
+    assert record['track'] is None
+
+
+def test_read_records_skips_blank_lines_and_reports_bad_ones():
+    assert list(read_records(io.StringIO('{"a":1}\n\n{"a":2}\n'))) == [{'a': 1}, {'a': 2}]
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_records(io.StringIO('{"a":1}\n{oops\n')))
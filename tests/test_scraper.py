@@ -1,8 +1,15 @@
 # tests/test_scraper.py
+import copy
+import os
+import pickle
 import pytest
 from unittest.mock import patch, MagicMock
 import requests
-from scraper import BillboardScraper
+from bs4 import BeautifulSoup
+from scraper import (
+    CHARTS, BillboardScraper, ChartEntry, ChartSource, get_chart, parse_chart, parse_songs, primary_artist,
+    register_chart,
+)
 
 # Sample HTML snippet based on the one provided in the query
 # Ensure this matches the structure your scraper.py expects
@@ -118,3 +125,198 @@ def test_scrape_songs_empty_response():
         song_titles = scraper.scrape_songs()
         assert song_titles == []
 # --- End of scraper tests ---
+
+
+def test_iter_songs_yields_titles_lazily():
+    """iter_songs yields the same titles as scrape_songs, one at a time."""
+    scraper = BillboardScraper("2023-10-27")
+
+    with patch('scraper.requests.get') as mock_get:
+        mock_get.return_value.text = SAMPLE_HTML
+        songs = scraper.iter_songs()
+        assert next(songs) == "Song Title 1"
+        assert list(songs) == ["Another Song", "", "Final Song Title"]
+
+
+def test_iter_songs_raises_network_errors():
+    """iter_songs leaves error handling to the caller."""
+    scraper = BillboardScraper("2023-10-27")
+
+    with patch('scraper.requests.get', side_effect=requests.exceptions.RequestException("Network Error")):
+        with pytest.raises(requests.exceptions.RequestException):
+            list(scraper.iter_songs())
+
+
+FIXTURE_PAGE = os.path.join(os.path.dirname(__file__), 'fixtures', 'hot-100-2016-07-16.html')
+
+
+def full_page_titles(html):
+    """Reference output: the original whole-page BeautifulSoup parse."""
+    soup = BeautifulSoup(html, 'html.parser')
+    return [' '.join(item.find('h3', id='title-of-a-story').getText().split())
+            for item in soup.find_all('div', class_='o-chart-results-list-row-container')]
+
+
+@pytest.mark.parametrize("backend", ["stream", "html.parser"])
+@pytest.mark.parametrize("html", [SAMPLE_HTML, "fixture"])
+def test_parse_songs_backends_match_full_page_parse(backend, html):
+    """Every parser backend returns exactly what the full-page parse does."""
+    if html == "fixture":
+        with open(FIXTURE_PAGE, encoding='utf-8') as f:
+            html = f.read()
+
+    titles = list(parse_songs(html, backend))
+
+    assert titles == full_page_titles(html)
+    assert titles
+
+
+def test_parse_songs_stream_handles_nested_markup_and_entities():
+    html = """
+    <div class="list">
+      <div class="o-chart-results-list-row-container">
+        <div><h3 id="title-of-a-story">Rock &amp; <b>Roll</b>
+        Song</h3></div>
+      </div>
+    </div>
+    """
+    assert list(parse_songs(html, "stream")) == ["Rock & Roll Song"]
+
+
+def test_parse_songs_stream_stops_at_end_of_chart_list():
+    """Content after the element holding the chart rows is never parsed."""
+    html = """
+    <div class="list">
+      <div class="o-chart-results-list-row-container"><h3 id="title-of-a-story">A</h3></div>
+      <div class="ad"></div>
+      <div class="o-chart-results-list-row-container"><h3 id="title-of-a-story">B</h3></div>
+    </div>
+    <div class="o-chart-results-list-row-container"><h3 id="title-of-a-story">Not in chart</h3></div>
+    """
+    assert list(parse_songs(html, "stream")) == ["A", "B"]
+
+
+@pytest.mark.parametrize("html", [SAMPLE_HTML, "fixture"])
+def test_parse_songs_stream_ignores_row_class_in_inline_css(html):
+    """The row class name in a <style> rule before the chart is not mistaken for a row."""
+    if html == "fixture":
+        with open(FIXTURE_PAGE, encoding='utf-8') as f:
+            html = f.read()
+    html = html.replace('<head>', '<head><style>.o-chart-results-list-row-container{margin:0}</style>', 1)
+
+    assert list(parse_chart(html, "stream")) == list(parse_chart(html, "html.parser"))
+    assert list(parse_songs(html, "stream"))
+
+
+def test_parse_songs_stream_rejects_row_without_title():
+    """A row missing its title is an error, as with the BeautifulSoup backend."""
+    html = '<div><div class="o-chart-results-list-row-container"><span>1</span></div></div>'
+    with pytest.raises(ValueError):
+        list(parse_songs(html, "stream"))
+
+
+def test_scrape_entries_returns_structured_rows():
+    """Rows carry rank, title, artist and chart stats."""
+    scraper = BillboardScraper("2016-07-16")
+
+    with patch('scraper.requests.get') as mock_get, open(FIXTURE_PAGE, encoding='utf-8') as f:
+        mock_get.return_value.text = f.read()
+        entries = scraper.scrape_entries()
+
+    assert len(entries) == 100
+    assert [e.rank for e in entries] == list(range(1, 101))
+    assert entries[0] == ChartEntry(rank=1, title="Song Title 1", artist="Artist 1",
+                                    last_week=None, peak=1, weeks_on_chart=42)
+    assert entries[6].title == "Song & Title 7"
+    assert entries[6].last_week == 27
+    assert entries[4].artist == "Artist 5 Featuring Guest 5"
+
+
+def test_scrape_entries_without_stats_uses_row_position():
+    """Pages without rank or stat labels still yield entries in chart order."""
+    scraper = BillboardScraper("2023-10-27")
+
+    with patch('scraper.requests.get') as mock_get:
+        mock_get.return_value.text = SAMPLE_HTML
+        entries = scraper.scrape_entries()
+
+    assert [(e.rank, e.title, e.artist) for e in entries] == [
+        (1, "Song Title 1", "Artist 1"),
+        (2, "Another Song", "Artist 2"),
+        (3, "", "Artist 3"),
+        (4, "Final Song Title", "Artist 4"),
+    ]
+    assert entries[0].peak is None
+
+
+@pytest.mark.parametrize("html", [SAMPLE_HTML, "fixture"])
+def test_parse_chart_backends_agree(html):
+    if html == "fixture":
+        with open(FIXTURE_PAGE, encoding='utf-8') as f:
+            html = f.read()
+    assert list(parse_chart(html, "stream")) == list(parse_chart(html, "html.parser"))
+
+
+def test_chart_entry_is_compact():
+    """Entries use __slots__, so no per-instance __dict__ is allocated."""
+    entry = ChartEntry(1, "Title", "Artist", None, 1, 1)
+    assert not hasattr(entry, '__dict__')
+
+
+def test_chart_entry_survives_pickling_and_copying():
+    entry = ChartEntry(1, "Title", "Artist", None, 1, 1)
+    assert pickle.loads(pickle.dumps(entry)) == entry
+    assert copy.deepcopy(entry) == entry
+
+
+@pytest.mark.parametrize("artist, expected", [
+    ("Drake Featuring WizKid & Kyla", "Drake"),
+    ("Calvin Harris Feat. Rihanna", "Calvin Harris"),
+    ("Major Lazer x Justin Bieber", "Major Lazer"),
+    ("Sia, Sean Paul", "Sia"),
+    ("Adele", "Adele"),
+    ("", None),
+])
+def test_primary_artist(artist, expected):
+    assert primary_artist(artist) == expected
+
+
+def test_scraper_fetches_through_fetcher_when_given():
+    fetcher = MagicMock()
+    fetcher.fetch.return_value = SAMPLE_HTML
+    scraper = BillboardScraper("2023-10-27", fetcher=fetcher)
+
+    with patch('scraper.requests.get') as mock_get:
+        songs = scraper.scrape_songs()
+
+    mock_get.assert_not_called()
+    fetcher.fetch.assert_called_once_with("https://www.billboard.com/charts/hot-100/2023-10-27/", "2023-10-27")
+    assert songs[0] == "Song Title 1"
+
+
+def test_scraper_builds_the_url_for_its_chart():
+    scraper = BillboardScraper("2016-07-16", chart="billboard-global-200")
+    assert scraper.url == "https://www.billboard.com/charts/billboard-global-200/2016-07-16/"
+    assert scraper.chart.name == "Billboard Global 200"
+
+
+def test_get_chart_rejects_unknown_charts():
+    with pytest.raises(ValueError):
+        get_chart("hot-42")
+
+
+def test_registered_chart_uses_its_own_url_and_parser(monkeypatch):
+    """A registered source plugs its URL and parser into the shared scraping path."""
+    monkeypatch.setitem(CHARTS, "custom", None)
+    source = register_chart(ChartSource(
+        "custom", "Custom Chart", url="https://charts.example/{date}.html",
+        parse=lambda html, parser: iter([ChartEntry(1, html, "Artist", None, None, None)])
+    ))
+    fetcher = MagicMock()
+    fetcher.fetch.return_value = "Only Song"
+
+    entries = BillboardScraper("2016-07-16", fetcher=fetcher, chart="custom").scrape_entries()
+
+    assert get_chart("custom") is source
+    fetcher.fetch.assert_called_once_with("https://charts.example/2016-07-16.html", "2016-07-16")
+    assert [entry.title for entry in entries] == ["Only Song"]
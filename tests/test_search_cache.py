@@ -0,0 +1,97 @@
+# tests/test_search_cache.py
+from search_cache import SearchCache, normalize_query
+
+TRACK = {'uri': 'spotify:track:1', 'name': 'Song 1', 'artist': 'Artist 1'}
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query_collapses_case_and_whitespace():
+    """Equivalent queries normalize to the same key."""
+    assert normalize_query("track:Song  One   artist:ME") == "track:song one artist:me"
+
+
+def test_get_returns_missing_for_unknown_query():
+    """An unknown query is a miss."""
+    cache = SearchCache()
+    assert cache.get("track:Unknown") is SearchCache.MISSING
+    assert cache.stats == {'hits': 0, 'negative_hits': 0, 'misses': 1}
+
+
+def test_stores_hits_and_negative_results():
+    """Found tracks and 'not found' results are both cached."""
+    cache = SearchCache()
+    cache.set("track:Song 1", TRACK)
+    cache.set("track:Nothing", None)
+
+    assert cache.get("TRACK:song 1") == TRACK
+    assert cache.get("track:Nothing") is None
+    assert cache.stats == {'hits': 1, 'negative_hits': 1, 'misses': 0}
+
+
+def test_hit_and_miss_ttls_are_separate():
+    """Negative results expire on their own, shorter TTL."""
+    clock = FakeClock()
+    cache = SearchCache(hit_ttl=100, miss_ttl=10, clock=clock)
+    cache.set("track:Song 1", TRACK)
+    cache.set("track:Nothing", None)
+
+    clock.now += 50
+    assert cache.get("track:Song 1") == TRACK
+    assert cache.get("track:Nothing") is SearchCache.MISSING
+
+    clock.now += 60
+    assert cache.get("track:Song 1") is SearchCache.MISSING
+
+
+def test_results_persist_across_instances(tmp_path):
+    """Entries written by one cache are read back from disk by the next."""
+    path = str(tmp_path / "cache.sqlite")
+    first = SearchCache(path)
+    first.set("track:Song 1", TRACK)
+    first.set("track:Nothing", None)
+    first.close()
+
+    second = SearchCache(path)
+    assert second.get("track:Song 1") == TRACK
+    assert second.get("track:Nothing") is None
+    second.close()
+
+
+def test_memory_layer_is_lru_bounded():
+    """The in-memory front layer evicts the least recently used entry."""
+    cache = SearchCache(memory_size=2)
+    cache.set("track:a", TRACK)
+    cache.set("track:b", TRACK)
+    cache.get("track:a")
+    cache.set("track:c", TRACK)
+
+    assert list(cache._memory) == ["track:a", "track:c"]
+    # Evicted entries are still served from SQLite
+    assert cache.get("track:b") == TRACK
+
+
+def test_found_lists_unexpired_found_tracks_by_prefix():
+    clock = FakeClock()
+    cache = SearchCache(hit_ttl=100, clock=clock)
+    cache.set("match:Song 1 artist:Artist 1", TRACK)
+    cache.set("match:Nothing artist:", None)
+    cache.set("track:Song 1", TRACK)
+    clock.now += 50
+    cache.set("match:Song 2 artist:", TRACK)
+    clock.now += 60
+
+    assert cache.found("match:") == [("match:song 2 artist:", TRACK)]
+
+
+def test_from_config_opens_the_configured_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_CACHE_PATH", str(tmp_path / "search.db"))
+    SearchCache.from_config().set("track:Closer", None)
+
+    assert SearchCache.from_config().get("track:Closer") is None
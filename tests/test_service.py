@@ -0,0 +1,161 @@
+# tests/test_service.py
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+import service
+from instrumentation import metrics
+from scraper import ChartEntry
+from service import PlaylistService, QueueFull, make_server
+
+ENTRIES = [ChartEntry(1, "Song A", "Artist A", None, 1, 1), ChartEntry(2, "Song B", "Artist B", None, 2, 1)]
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class FakeScraper:
+    """Stands in for BillboardScraper; blocks each scrape until `release` is set."""
+    scrapes = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def __init__(self, date, fetcher=None, chart=None):
+        self.date, self.chart = date, chart
+
+    def scrape_entries(self):
+        FakeScraper.scrapes.append((self.chart, self.date))
+        FakeScraper.started.set()
+        FakeScraper.release.wait(5)
+        return ENTRIES
+
+
+@pytest.fixture
+def fake_scraper():
+    FakeScraper.scrapes = []
+    FakeScraper.started, FakeScraper.release = threading.Event(), threading.Event()
+    with patch.object(service, 'BillboardScraper', FakeScraper):
+        yield FakeScraper
+
+
+def make_sp_client():
+    sp_client = MagicMock()
+    sp_client.search_tracks.side_effect = lambda songs, max_concurrency=8: [
+        {'uri': f'spotify:track:{title}', 'name': title, 'artist': artist} for title, artist in songs
+    ]
+    return sp_client
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.01)
+
+
+@patch('service.PlaylistManager.create_playlist', side_effect=['playlist1', 'playlist2'])
+def test_concurrent_jobs_for_one_chart_share_a_scrape_and_resolve(mock_create, fake_scraper):
+    sp_client = make_sp_client()
+    svc = PlaylistService(sp_client, fetcher=None, max_workers=2)
+
+    first = svc.submit('hot-100', '2016-07-12', 'Mine')
+    fake_scraper.started.wait(5)
+    second = svc.submit('hot-100', '2016-07-16', 'Yours')  # same chart week
+    wait_for(lambda: metrics.counter('service_coalesced_total') == 1)
+    fake_scraper.release.set()
+    svc.shutdown()
+
+    assert fake_scraper.scrapes == [('hot-100', '2016-07-16')]
+    sp_client.search_tracks.assert_called_once()
+    assert [(job.status, job.matched) for job in (first, second)] == [('done', 2), ('done', 2)]
+    assert sorted(call.kwargs['name'] for call in mock_create.call_args_list) == ['Mine', 'Yours']
+    assert {first.playlist_id, second.playlist_id} == {'playlist1', 'playlist2'}
+
+
+@patch('service.PlaylistManager.create_playlist', return_value='playlist1')
+def test_an_unfinished_identical_job_is_returned_not_queued_again(mock_create, fake_scraper):
+    svc = PlaylistService(make_sp_client(), fetcher=None, max_workers=1, max_queue=2)
+
+    job = svc.submit('hot-100', '2016-07-16')
+    assert svc.submit('hot-100', '2016-07-14') is job
+    assert job.name == "Billboard Hot 100 - 2016-07-16"
+    svc.submit('country-songs', '2016-07-16')
+    with pytest.raises(QueueFull):
+        svc.submit('hot-100', '2016-07-23')
+    fake_scraper.release.set()
+    wait_for(lambda: all(job.finished_at for job in svc.jobs()))
+
+    assert metrics.counter('service_requests_total', result='duplicate') == 1
+    assert metrics.counter('service_requests_total', result='rejected') == 1
+    assert svc.submit('hot-100', '2016-07-16') is not job  # finished jobs are not reused
+    svc.shutdown()
+
+
+def test_bad_requests_are_rejected():
+    svc = PlaylistService(make_sp_client(), fetcher=None)
+    with pytest.raises(ValueError):
+        svc.submit('no-such-chart', '2016-07-16')
+    with pytest.raises(ValueError):
+        svc.submit('hot-100', 'yesterday')
+    svc.shutdown()
+
+
+@patch('service.PlaylistManager.create_playlist', return_value=None)
+def test_job_fails_when_the_playlist_is_not_created(mock_create, fake_scraper):
+    fake_scraper.release.set()
+    svc = PlaylistService(make_sp_client(), fetcher=None)
+    job = svc.submit('hot-100', '2016-07-16')
+    svc.shutdown()
+    assert job.status == 'failed' and job.error and job.finished_at is not None
+
+
+@patch('service.PlaylistManager.create_playlist', return_value='playlist1')
+def test_http_api(mock_create, fake_scraper):
+    fake_scraper.release.set()
+    svc = PlaylistService(make_sp_client(), fetcher=None)
+    server = make_server(svc, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        response = requests.post(f"{url}/jobs", json={'date': '2016-07-16', 'name': 'Mine'})
+        assert response.status_code == 202
+        job_id = response.json()['id']
+        wait_for(lambda: requests.get(f"{url}/jobs/{job_id}").json()['status'] == 'done')
+
+        job = requests.get(f"{url}/jobs/{job_id}").json()
+        assert (job['chart'], job['playlist_id'], job['songs']) == ('hot-100', 'playlist1', 2)
+        assert [job['id'] for job in requests.get(f"{url}/jobs").json()['jobs']] == [job_id]
+        assert requests.post(f"{url}/jobs", json={'chart': 'nope', 'date': '2016-07-16'}).status_code == 400
+        assert requests.get(f"{url}/jobs/999").status_code == 404
+        assert 'service_jobs_total' in requests.get(f"{url}/metrics").text
+    finally:
+        server.shutdown()
+        server.server_close()
+        svc.shutdown()
+
+
+def test_main_signs_in_before_serving():
+    """A real API call at startup, so the OAuth flow never starts in a job's worker thread."""
+    with patch('service.SpotifyClient') as client_class, patch('service.make_server') as make:
+        sp_client = client_class.from_config.return_value
+        sp_client.sp.current_user.return_value = {'id': 'user'}
+        make.return_value.serve_forever.side_effect = lambda: sp_client.sp.current_user.assert_called_once()
+        make.return_value.server_address = ('127.0.0.1', 8080)
+        service.main(["--port", "0"])
+
+    make.return_value.serve_forever.assert_called_once()
+
+
+def test_main_does_not_serve_when_sign_in_fails():
+    with patch('service.SpotifyClient') as client_class, patch('service.make_server') as make:
+        client_class.from_config.return_value.sp.current_user.side_effect = Exception("invalid_client")
+        service.main([])
+
+    make.assert_not_called()
@@ -0,0 +1,109 @@
+# tests/test_sharded_backfill.py
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import scraper
+import sharded_backfill
+from benchmarks.fake_services import FakeServices
+from sharded_backfill import checkpoint_path, run_sharded_backfill, scrape_page, write_checkpoint
+
+WEEKS = ["2016-07-16", "2016-07-23", "2016-07-30"]
+
+
+def make_sp_client():
+    sp_client = MagicMock()
+    sp_client.api_calls = 0
+
+    def search_tracks(songs, max_concurrency=8):
+        sp_client.api_calls += len(songs)
+        return [{'uri': f'spotify:track:{t}', 'name': t, 'artist': a} for t, a in songs]
+
+    sp_client.search_tracks.side_effect = search_tracks
+    return sp_client
+
+
+class FakePool:
+    """Runs the pool's work in this process, so tests can swap in the worker's fetcher."""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def map(self, fn, items, chunksize=1):
+        return map(fn, items)
+
+
+def read_checkpoint(directory, chart_date):
+    with open(checkpoint_path(str(directory), "hot-100", chart_date), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_charts_are_scraped_on_processes_and_checkpointed(tmp_path, monkeypatch):
+    sp_client = make_sp_client()
+    with FakeServices() as services:
+        monkeypatch.setattr(scraper, 'BILLBOARD_URL', f"{services.url}/charts/{{chart}}/{{date}}/")
+        report = run_sharded_backfill(WEEKS[0], WEEKS[-1], sp_client, str(tmp_path), processes=2,
+                                      create_playlists=False, resolve_batch=2)
+
+    assert (report['charts'], report['resumed_charts'], report['failed_charts']) == (3, 0, 0)
+    rows = [read_checkpoint(tmp_path, chart_date) for chart_date in WEEKS]
+    assert [len(records) for records in rows] == [100, 100, 100]
+    assert rows[0][0]['chart'] == "hot-100" and rows[0][0]['track']['name'] == rows[0][0]['title']
+    # Songs carried over between weeks are searched once
+    searched = [song for call in sp_client.search_tracks.call_args_list for song in call.args[0]]
+    assert len(searched) == len(set(searched)) == report['distinct_songs'] == 116
+
+
+def test_rerun_resumes_from_checkpoints(tmp_path, monkeypatch):
+    write_checkpoint(str(tmp_path), "hot-100", WEEKS[0], [{'chart_date': WEEKS[0], 'title': 'Kept'}])
+    sp_client = make_sp_client()
+    with FakeServices() as services:
+        monkeypatch.setattr(scraper, 'BILLBOARD_URL', f"{services.url}/charts/{{chart}}/{{date}}/")
+        with patch('sharded_backfill.PlaylistManager') as manager:
+            report = run_sharded_backfill(WEEKS[0], WEEKS[-1], sp_client, str(tmp_path), processes=2)
+
+    assert report['resumed_charts'] == 1
+    assert read_checkpoint(tmp_path, WEEKS[0]) == [{'chart_date': WEEKS[0], 'title': 'Kept'}]
+    names = [call.kwargs['name'] for call in manager.create_playlist.call_args_list]
+    assert names == ["Billboard Hot 100 - 2016-07-23", "Billboard Hot 100 - 2016-07-30"]
+
+
+def test_failed_pages_are_not_checkpointed(monkeypatch):
+    fetcher = MagicMock()
+    fetcher.fetch.side_effect = OSError("connection reset")
+    monkeypatch.setattr(sharded_backfill, '_fetcher', fetcher)
+
+    assert scrape_page(("hot-100", WEEKS[0])) == (("hot-100", WEEKS[0]), None)
+
+
+def test_pages_without_rows_are_retried_on_the_next_run(tmp_path, monkeypatch):
+    fetcher = MagicMock()
+    fetcher.fetch.return_value = "<html><body>Please accept cookies</body></html>"
+    monkeypatch.setattr(sharded_backfill, '_fetcher', fetcher)
+    monkeypatch.setattr(sharded_backfill, 'ProcessPoolExecutor', FakePool)
+
+    for run in range(2):
+        report = run_sharded_backfill(WEEKS[0], WEEKS[0], make_sp_client(), str(tmp_path), processes=1)
+        assert (report['resumed_charts'], report['failed_charts']) == (0, 1)
+
+    assert not os.path.exists(checkpoint_path(str(tmp_path), "hot-100", WEEKS[0]))
+    # The cached copy is dropped, so the page is downloaded again
+    assert fetcher.discard.call_count == 2
+
+
+def test_charts_whose_playlist_failed_are_not_checkpointed(tmp_path, monkeypatch):
+    sp_client = make_sp_client()
+    with FakeServices() as services:
+        monkeypatch.setattr(scraper, 'BILLBOARD_URL', f"{services.url}/charts/{{chart}}/{{date}}/")
+        with patch('sharded_backfill.PlaylistManager') as manager:
+            manager.create_playlist.side_effect = ['playlist1', None, 'playlist3']
+            report = run_sharded_backfill(WEEKS[0], WEEKS[-1], sp_client, str(tmp_path), processes=1)
+
+    assert report['failed_charts'] == 1
+    assert [os.path.exists(checkpoint_path(str(tmp_path), "hot-100", week)) for week in WEEKS] == [True, False, True]
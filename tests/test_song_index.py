@@ -0,0 +1,70 @@
+# tests/test_song_index.py
+import pytest
+from scraper import ChartEntry
+from song_index import SongIndex
+
+
+def entry(rank, title, artist):
+    return ChartEntry(rank, title, artist, None, None, None)
+
+
+def make_index():
+    index = SongIndex()
+    index.add_chart("2016-07-02", [entry(1, "Song A", "Artist A"), entry(2, "Song B", "Artist B")])
+    index.add_chart("2016-07-09", [entry(1, "Song B (feat. Z)", "Artist B Featuring Z"), entry(2, "Song A", "Artist A")])
+    index.add_chart("2016-07-16", [entry(1, "Song B", "Artist B"), entry(2, "Song C", "Artist C"),
+                                   entry(3, "Song A", "Artist A")])
+    return index
+
+
+def test_versions_and_featured_artists_share_one_record():
+    index = make_index()
+
+    assert len(index) == 3
+    record = index.get("SONG B", "Artist B & Someone")
+    assert (record.title, record.artist) == ("Song B", "Artist B")
+    assert record.ranks == {"2016-07-02": 2, "2016-07-09": 1, "2016-07-16": 1}
+    assert index.charts == ["2016-07-02", "2016-07-09", "2016-07-16"]
+
+
+def test_stats_cover_only_the_requested_range():
+    record = make_index().get("Song A", "Artist A")
+
+    assert record.stats() == {'weeks': 3, 'peak': 1, 'points': 100 + 99 + 98,
+                              'first_week': "2016-07-02", 'last_week': "2016-07-16"}
+    assert record.stats(start="2016-07-09")['peak'] == 2
+    assert record.stats(end="2016-07-01") is None
+
+
+def test_points_scale_with_the_chart_size():
+    index = SongIndex("billboard-global-200")
+    index.add_chart("2016-07-02", [entry(1, "Song A", "Artist A"), entry(200, "Song Z", "Artist Z")])
+
+    assert index.chart_size == 200
+    assert [stats['points'] for _, stats in index.top(2)] == [100, 0.5]
+
+
+def test_adding_a_chart_twice_is_harmless():
+    index = make_index()
+    index.add_chart("2016-07-16", [entry(3, "Song A", "Artist A")])
+    assert index.get("Song A", "Artist A").stats()['weeks'] == 3
+
+
+def test_top_songs_by_each_ranking():
+    index = make_index()
+
+    assert [r.title for r, _ in index.top(2)] == ["Song B", "Song A"]
+    assert [r.title for r, _ in index.top(3, by='weeks')] == ["Song B", "Song A", "Song C"]
+    assert [r.title for r, _ in index.top(3, by='peak')] == ["Song B", "Song A", "Song C"]
+    top = index.top(1, by='weeks', start="2016-07-16")
+    assert [(r.title, stats['weeks']) for r, stats in top] == [("Song B", 1)]
+    with pytest.raises(ValueError):
+        index.top(1, by='plays')
+
+
+def test_first_track_seen_is_kept():
+    index = SongIndex()
+    index.add("2016-07-02", entry(1, "Song A", "Artist A"), track=None)
+    index.add("2016-07-09", entry(1, "Song A", "Artist A"), track={'uri': 'spotify:track:a'})
+    index.add("2016-07-16", entry(1, "Song A", "Artist A"), track={'uri': 'spotify:track:other'})
+    assert index.get("Song A", "Artist A").track == {'uri': 'spotify:track:a'}
@@ -1,8 +1,13 @@
 # tests/test_spotify_client.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 import spotipy
-from spotify_client import SpotifyClient
+from spotify_client import RateLimitedSpotify, SpotifyClient, spotipy_session
+from concurrency import RetryAfterGate
+from search_cache import SearchCache
 
 # Mock track data structure similar to what Spotify API returns
 MOCK_TRACK_DATA = {
@@ -12,8 +17,7 @@ MOCK_TRACK_DATA = {
 }
 
 def test_spotify_client_init():
-    """Test SpotifyClient initialization (mainly checks if auth is attempted)."""
-    # This test ensures the constructor runs without error.
+    """Test SpotifyClient initialization (auth is deferred until the API is first used)."""
     # Deep testing of spotipy auth is outside this project's scope.
     with patch('spotify_client.SpotifyOAuth'), \
          patch('spotify_client.spotipy.Spotify') as mock_spotify_constructor:
@@ -22,9 +26,35 @@ def test_spotify_client_init():
 
         client = SpotifyClient()
 
-        # Assert the spotipy.Spotify was called (implying auth was attempted)
+        # Nothing is authenticated until the spotipy client is needed
+        mock_spotify_constructor.assert_not_called()
+        assert client.sp.spotify == mock_sp_instance
+        assert client.sp is client.sp
         mock_spotify_constructor.assert_called_once()
-        assert client.sp == mock_sp_instance
+
+
+def test_from_config_uses_the_configured_cache_and_limits(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_CACHE_PATH", str(tmp_path / "search.db"))
+    monkeypatch.setenv("SPOTIFY_RATE_LIMIT_SEARCH", "3")
+    monkeypatch.setenv("SPOTIFY_CLIENT_ID", "id")
+    monkeypatch.setenv("SPOTIFY_CLIENT_SECRET", "secret")
+    client = SpotifyClient.from_config()
+
+    assert isinstance(client.cache, SearchCache)
+    assert client.limiter.buckets['search'].rate == 3
+
+
+def test_spotify_client_without_credentials_until_used(monkeypatch):
+    """Missing credentials only fail once the API is actually needed."""
+    monkeypatch.delenv("SPOTIFY_CLIENT_ID")
+    monkeypatch.setattr('config._env_loaded', True)  # Don't pick up a developer's .env file
+
+    client = SpotifyClient(cache=SearchCache())
+    client.cache.set("match:Song A artist:", None)
+    assert client.match_track("Song A") is None  # Answered from the cache
+
+    with pytest.raises(ValueError):
+        client.sp
 
 
 def test_search_track_success():
@@ -121,3 +151,366 @@ def test_search_track_spotify_api_error():
 
         # Assert the result is None due to the exception
         assert result is None
+
+
+class FakeSearchEndpoint:
+    """Stand-in for spotipy's search with injectable latency and 429s."""
+
+    def __init__(self, latency=0.0, rate_limited_calls=0, retry_after="0"):
+        self.latency = latency
+        self.rate_limited_calls = rate_limited_calls
+        self.retry_after = retry_after
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def search(self, q, type, limit):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            throttle = self.rate_limited_calls > 0
+            if throttle:
+                self.rate_limited_calls -= 1
+        try:
+            time.sleep(self.latency)
+            if throttle:
+                raise spotipy.SpotifyException(
+                    http_status=429, code=-1, msg="Too Many Requests",
+                    headers={'Retry-After': self.retry_after}
+                )
+            title = q.split('track:')[-1].split(' artist:')[0]
+            if title.lower().startswith('missing'):
+                return {'tracks': {'items': []}}
+            return {'tracks': {'items': [{
+                'uri': f'spotify:track:{title}',
+                'name': title,
+                'artists': [{'name': 'Artist'}]
+            }]}}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_client(endpoint, cache=None):
+    with patch('spotify_client.SpotifyOAuth'), \
+         patch('spotify_client.spotipy.Spotify', return_value=endpoint):
+        client = SpotifyClient(cache=cache)
+        client.sp  # Connect while spotipy is patched
+        return client
+
+
+def test_search_tracks_preserves_order_and_shape():
+    """Concurrent search returns results in input order, with None for misses."""
+    endpoint = FakeSearchEndpoint(latency=0.01)
+    client = make_client(endpoint)
+    titles = [f"Song {i}" for i in range(20)] + ["Missing Song"]
+
+    results = client.search_tracks(titles, max_concurrency=5)
+
+    assert [r['name'] for r in results[:-1]] == titles[:-1]
+    assert results[0] == {'uri': 'spotify:track:Song 0', 'name': 'Song 0', 'artist': 'Artist'}
+    assert results[-1] is None
+    # The miss walks both rungs of the title-only fallback ladder
+    assert endpoint.calls == len(titles) + 1
+
+
+def test_search_tracks_respects_max_concurrency():
+    """No more than max_concurrency searches are in flight at once."""
+    endpoint = FakeSearchEndpoint(latency=0.02)
+    client = make_client(endpoint)
+
+    client.search_tracks([f"Song {i}" for i in range(12)], max_concurrency=3)
+
+    assert 1 < endpoint.max_in_flight <= 3
+
+
+def test_search_tracks_accepts_artist_tuples():
+    """(title, artist) tuples are searched with the artist filter."""
+    endpoint = MagicMock()
+    endpoint.search.return_value = {'tracks': {'items': [MOCK_TRACK_DATA]}}
+    client = make_client(endpoint)
+
+    client.search_tracks([("Test Song", "Test Artist")])
+
+    assert endpoint.search.call_args_list[0] == call(
+        q='track:Test Song artist:Test Artist', type='track', limit=SpotifyClient.MATCH_CANDIDATES
+    )
+
+
+def test_search_track_retries_after_rate_limit():
+    """A 429 pauses the shared gate for Retry-After seconds, then retries."""
+    endpoint = FakeSearchEndpoint(rate_limited_calls=1, retry_after="2")
+    client = make_client(endpoint)
+    now = [0.0]
+    client.backoff = RetryAfterGate(clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+    client.backoff.pause = MagicMock(wraps=client.backoff.pause)
+
+    result = client.search_track("Song A")
+
+    assert result['name'] == "Song A"
+    assert endpoint.calls == 2
+    client.backoff.pause.assert_called_once_with(2.0)
+
+
+def test_search_track_gives_up_after_max_rate_limit_retries():
+    """Persistent 429s end in None rather than an endless retry loop."""
+    endpoint = FakeSearchEndpoint(rate_limited_calls=100)
+    client = make_client(endpoint)
+
+    assert client.search_track("Song A") is None
+    assert endpoint.calls == SpotifyClient.MAX_RATE_LIMIT_RETRIES + 1
+
+
+def test_search_track_uses_cache_on_repeat():
+    """A cached query, hit or miss, is answered without calling Spotify."""
+    endpoint = FakeSearchEndpoint()
+    client = make_client(endpoint, cache=SearchCache())
+
+    titles = ["Song A", "Missing Song", "Song B"]
+    first = client.search_tracks(titles)
+    second = client.search_tracks(titles)
+
+    assert first == second
+    assert endpoint.calls == 4
+    assert client.cache.stats == {'hits': 2, 'negative_hits': 1, 'misses': 3}
+    assert client.match_report.calls_per_song == {0: 3, 1: 2, 2: 1}
+
+
+def test_search_track_does_not_cache_errors():
+    """Failed searches are not recorded as 'not found'."""
+    with patch('spotify_client.SpotifyOAuth'), \
+         patch('spotify_client.spotipy.Spotify') as mock_spotify_constructor:
+        mock_sp_instance = mock_spotify_constructor.return_value
+        mock_sp_instance.search.side_effect = spotipy.SpotifyException(
+            http_status=500, code=-1, msg="Server Error"
+        )
+        client = SpotifyClient(cache=SearchCache())
+        assert client.search_track("Song A") is None
+
+    assert client.cache.get("track:Song A") is SearchCache.MISSING
+
+
+def test_api_calls_counts_every_attempt():
+    """Retried searches count each attempt as an API call."""
+    endpoint = FakeSearchEndpoint(rate_limited_calls=1)
+    client = make_client(endpoint)
+
+    client.search_tracks(["Song A", "Song B"])
+
+    assert client.api_calls == 3
+
+
+def track(name, artist, uri=None):
+    return {'uri': uri or f'spotify:track:{name}', 'name': name, 'artists': [{'name': artist}]}
+
+
+def test_match_track_picks_best_candidate():
+    """The best-scoring candidate wins over Spotify's first result."""
+    endpoint = MagicMock()
+    endpoint.search.return_value = {'tracks': {'items': [
+        track("One Dance - Cover", "Karaoke Band", uri='spotify:track:cover'),
+        track("One Dance", "Drake", uri='spotify:track:drake'),
+    ]}}
+    client = make_client(endpoint)
+
+    result = client.match_track("One Dance", "Drake Featuring WizKid & Kyla")
+
+    assert result == {'uri': 'spotify:track:drake', 'name': 'One Dance', 'artist': 'Drake'}
+    endpoint.search.assert_called_once_with(
+        q='track:One Dance artist:Drake', type='track', limit=SpotifyClient.MATCH_CANDIDATES
+    )
+    assert client.match_report.summary()['calls_per_song'] == {1: 1}
+
+
+def test_match_track_walks_fallback_ladder_on_miss():
+    """Looser queries are only tried while the song is unresolved."""
+    endpoint = MagicMock()
+    endpoint.search.side_effect = [
+        {'tracks': {'items': []}},
+        {'tracks': {'items': [track("Cheap Thrills (feat. Sean Paul)", "Sia")]}},
+    ]
+    client = make_client(endpoint)
+
+    result = client.match_track("Cheap Thrills", "Sia Featuring Sean Paul")
+
+    assert result['name'] == "Cheap Thrills (feat. Sean Paul)"
+    assert [c.kwargs['q'] for c in endpoint.search.call_args_list] == [
+        'track:Cheap Thrills artist:Sia', 'cheap thrills sia'
+    ]
+    assert client.match_report.match_rate == 1.0
+
+
+def test_match_track_bounds_calls_per_song():
+    """An unmatchable song costs at most MAX_MATCH_CALLS searches."""
+    endpoint = MagicMock()
+    endpoint.search.return_value = {'tracks': {'items': [track("Something Else", "Someone")]}}
+    client = make_client(endpoint)
+
+    assert client.match_track("Cheap Thrills", "Sia") is None
+    assert endpoint.search.call_count == SpotifyClient.MAX_MATCH_CALLS
+    assert client.match_report.summary()['match_rate'] == 0.0
+    assert client.match_report.calls == SpotifyClient.MAX_MATCH_CALLS
+
+
+def test_match_track_returns_on_error_for_failed_searches():
+    """A failed search returns `on_error`, so callers can tell it apart from a miss."""
+    endpoint = MagicMock()
+    endpoint.search.side_effect = spotipy.SpotifyException(500, -1, "server error")
+    client = make_client(endpoint)
+    failed = object()
+
+    assert client.match_track("Cheap Thrills", "Sia", on_error=failed) is failed
+    assert client.match_track("Cheap Thrills", "Sia") is None
+    assert endpoint.search.call_count == 2
+
+
+def tracks_endpoint(unavailable=(), relinked=(), gone=()):
+    """A tracks() fake: unknown IDs are returned as playable unless listed."""
+    endpoint = MagicMock()
+
+    def tracks(uris, market=None):
+        result = []
+        for uri in uris:
+            if uri in gone:
+                result.append(None)
+            elif uri in relinked:
+                result.append({'uri': uri + '-relinked', 'name': 'Song', 'artists': [{'name': 'Sia'}],
+                               'is_playable': True, 'linked_from': {'uri': uri}})
+            else:
+                result.append({'uri': uri, 'name': 'Song', 'artists': [{'name': 'Sia'}],
+                               'is_playable': uri not in unavailable})
+        return {'tracks': result}
+
+    endpoint.tracks.side_effect = tracks
+    return endpoint
+
+
+def test_hydrate_tracks_batches_fifty_ids_per_call():
+    endpoint = tracks_endpoint(unavailable={'spotify:track:1'}, relinked={'spotify:track:2'}, gone={'spotify:track:3'})
+    client = make_client(endpoint)
+    uris = [f'spotify:track:{i}' for i in range(120)]
+
+    hydrated = client.hydrate_tracks(uris + uris[:10], market='US')
+
+    assert sorted(len(c.args[0]) for c in endpoint.tracks.call_args_list) == [20, 50, 50]
+    assert all(c.kwargs['market'] == 'US' for c in endpoint.tracks.call_args_list)
+    assert len(hydrated) == 120
+    assert hydrated['spotify:track:0']['playable'] and hydrated['spotify:track:0']['linked_from'] is None
+    assert not hydrated['spotify:track:1']['playable']
+    assert hydrated['spotify:track:2']['uri'] == 'spotify:track:2-relinked'
+    assert hydrated['spotify:track:2']['linked_from'] == 'spotify:track:2'
+    assert hydrated['spotify:track:3'] is None
+
+
+def test_revalidate_only_searches_unavailable_tracks():
+    """Relinked tracks are swapped in place; only gone or unplayable tracks are searched again."""
+    endpoint = tracks_endpoint(unavailable={'spotify:track:old'}, relinked={'spotify:track:moved'})
+    endpoint.search.return_value = {'tracks': {'items': [track("Chandelier", "Sia")]}}
+    client = make_client(endpoint, cache=SearchCache())
+    matches = {
+        ("Cheap Thrills", "Sia"): {'uri': 'spotify:track:ok', 'name': 'Cheap Thrills', 'artist': 'Sia'},
+        ("Elastic Heart", "Sia"): {'uri': 'spotify:track:moved', 'name': 'Elastic Heart', 'artist': 'Sia'},
+        ("Chandelier", "Sia"): {'uri': 'spotify:track:old', 'name': 'Chandelier', 'artist': 'Sia'},
+        ("Missing", "Sia"): None,
+    }
+    client.cache.set("match:Chandelier artist:Sia", matches[("Chandelier", "Sia")])
+
+    updated, report = client.revalidate(matches)
+
+    assert endpoint.tracks.call_count == 1
+    assert endpoint.search.call_count == 1  # Only Chandelier, despite its cached match
+    assert updated[("Cheap Thrills", "Sia")]['uri'] == 'spotify:track:ok'
+    assert updated[("Elastic Heart", "Sia")]['uri'] == 'spotify:track:moved-relinked'
+    assert updated[("Chandelier", "Sia")]['uri'] == 'spotify:track:Chandelier'
+    assert updated[("Missing", "Sia")] is None
+    assert report == {'checked': 3, 'relinked': 1, 'unavailable': 1, 're_resolved': 1}
+
+
+def test_revalidate_cache_rewrites_stale_matches():
+    endpoint = tracks_endpoint(relinked={'spotify:track:moved'})
+    client = make_client(endpoint, cache=SearchCache())
+    client.cache.set("match:Elastic Heart artist:Sia", {'uri': 'spotify:track:moved', 'name': 'x', 'artist': 'Sia'})
+    client.cache.set("match:Nothing artist:", None)
+
+    report = client.revalidate_cache()
+
+    assert report['relinked'] == 1
+    assert client.match_track("Elastic Heart", "Sia")['uri'] == 'spotify:track:moved-relinked'
+    endpoint.search.assert_not_called()
+
+
+class FailingAPI:
+    """A local server answering every request with `status`, counting requests by method."""
+
+    def __init__(self, status):
+        self.requests = []
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _fail(self):
+                api.requests.append(self.command)
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                body = b'{"error": {"status": %d, "message": "Server error"}}' % status
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _fail
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.prefix = f"http://127.0.0.1:{self.server.server_address[1]}/v1/"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def failing_api():
+    api = FailingAPI(500)
+    yield api
+    api.close()
+
+
+def test_spotipy_session_leaves_rate_limits_to_the_client():
+    """spotipy's session hands 429s straight back to _call."""
+    retry = spotipy_session().get_adapter('https://api.spotify.com').max_retries
+
+    assert not retry.is_retry('GET', 429, has_retry_after=True)
+    assert retry.is_retry('GET', 503)
+
+
+def test_server_errors_reach_the_client_as_server_errors(failing_api):
+    """Reads are retried by the session, then raise the real 500 without pausing other workers."""
+    client = SpotifyClient()
+    client._sp = RateLimitedSpotify(client, spotipy.Spotify(
+        auth='token', requests_session=spotipy_session()))
+    client._sp.spotify.prefix = failing_api.prefix
+    client.backoff.pause = MagicMock()
+
+    with pytest.raises(spotipy.SpotifyException) as error:
+        client.sp.search("track:Closer")
+
+    assert error.value.http_status == 500
+    assert failing_api.requests == ['GET'] * 4
+    assert client.api_calls == 1
+    client.backoff.pause.assert_not_called()
+
+
+def test_server_errors_on_playlist_adds_are_not_resent_by_the_session(failing_api):
+    sp = spotipy.Spotify(auth='token', requests_session=spotipy_session())
+    sp.prefix = failing_api.prefix
+
+    with pytest.raises(spotipy.SpotifyException) as error:
+        sp.playlist_add_items('pl', ['spotify:track:1'])
+
+    assert error.value.http_status == 500
+    assert failing_api.requests == ['POST']
@@ -0,0 +1,131 @@
+# tests/test_stages.py
+import json
+from unittest.mock import MagicMock, patch
+import stages
+from records import entry_to_record
+from scraper import ChartEntry
+
+
+def record(chart_date, rank, title, artist="Artist", **extra):
+    return entry_to_record(chart_date, ChartEntry(rank, title, artist, None, None, None), **extra)
+
+
+def track(title):
+    return {'uri': f'spotify:track:{title}', 'name': title, 'artist': 'X'}
+
+
+def make_sp_client(missing=()):
+    sp_client = MagicMock()
+    sp_client.search_tracks.side_effect = lambda songs, max_concurrency=8: [
+        None if title in missing else track(title) for title, _ in songs
+    ]
+    return sp_client
+
+
+def test_scrape_yields_records_in_chart_order():
+    charts = {
+        ("hot-100", "2016-07-23"): [ChartEntry(1, "Song B", "Artist", None, None, None)],
+        ("hot-100", "2016-07-16"): [ChartEntry(1, "Song A", "Artist", None, None, None)],
+    }
+    with patch('stages.fetch_chart_pages', return_value=charts):
+        records = list(stages.scrape(["2016-07-16", "2016-07-23"], fetcher=MagicMock()))
+    assert [(r['chart_date'], r['title']) for r in records] == [("2016-07-16", "Song A"), ("2016-07-23", "Song B")]
+
+
+def test_scrape_tags_records_with_each_chart():
+    charts = {
+        ("hot-100", "2016-07-16"): [ChartEntry(1, "Song A", "Artist", None, None, None)],
+        ("country-songs", "2016-07-16"): [ChartEntry(1, "Song C", "Artist", None, None, None)],
+    }
+    with patch('stages.fetch_chart_pages', return_value=charts) as fetch:
+        records = list(stages.scrape(["2016-07-16"], MagicMock(), charts=["hot-100", "country-songs"]))
+
+    assert fetch.call_args.args[0] == [("hot-100", "2016-07-16"), ("country-songs", "2016-07-16")]
+    assert [(r['chart'], r['title']) for r in records] == [("hot-100", "Song A"), ("country-songs", "Song C")]
+
+
+def test_resolve_searches_each_distinct_song_once_per_batch():
+    records = [record("d1", 1, "Song A"), record("d1", 2, "Song B"), record("d2", 1, "Song A")]
+    sp_client = make_sp_client(missing={"Song B"})
+
+    resolved = list(stages.resolve(records, sp_client, batch_size=10))
+
+    sp_client.search_tracks.assert_called_once_with([("Song A", "Artist"), ("Song B", "Artist")], max_concurrency=8)
+    assert [r['track'] for r in resolved] == [track("Song A"), None, track("Song A")]
+
+
+def test_resolve_only_retries_unmatched_records():
+    """Re-running resolve on its own output only searches the songs that were missed."""
+    records = [record("d1", 1, "Song A", track=track("Song A")), record("d1", 2, "Song B", track=None)]
+    sp_client = make_sp_client()
+
+    resolved = list(stages.resolve(records, sp_client, batch_size=1))
+
+    sp_client.search_tracks.assert_called_with([("Song B", "Artist")], max_concurrency=8)
+    assert [r['track'] for r in resolved] == [track("Song A"), track("Song B")]
+
+
+def test_publish_creates_one_playlist_per_chart():
+    records = [
+        record("2016-07-16", 1, "Song A", track=track("Song A")),
+        record("2016-07-16", 2, "Song B", track=None),
+        record("2016-07-23", 1, "Song C", track=track("Song C")),
+    ]
+    with patch('stages.PlaylistManager.create_playlist', side_effect=['p1', 'p2']) as create:
+        summaries = stages.publish(records, MagicMock())
+
+    assert [s['playlist_id'] for s in summaries] == ['p1', 'p2']
+    assert summaries[0] == {'chart': 'hot-100', 'chart_date': '2016-07-16', 'name': 'Billboard Hot 100 - 2016-07-16',
+                            'songs': 2, 'matched': 1, 'playlist_id': 'p1'}
+    assert create.call_args_list[0].kwargs['song_data'] == [track("Song A"), None]
+
+
+def test_publish_names_playlists_after_their_chart():
+    records = [
+        record("2016-07-16", 1, "Song A", chart="hot-100", track=track("Song A")),
+        record("2016-07-16", 1, "Song B", chart="country-songs", track=track("Song B")),
+    ]
+    summaries = stages.publish(records, None, dry_run=True)
+    assert [s['name'] for s in summaries] == ["Billboard Hot 100 - 2016-07-16", "Hot Country Songs - 2016-07-16"]
+
+
+def test_publish_dry_run_never_touches_spotify():
+    records = [record("2016-07-16", 1, "Song A", track=track("Song A"))]
+    with patch('stages.PlaylistManager') as manager:
+        summaries = stages.publish(records, None, name="Chart {chart_date}", dry_run=True)
+    assert summaries[0]['name'] == "Chart 2016-07-16"
+    assert not manager.mock_calls
+
+
+def test_cli_runs_each_stage_over_files(tmp_path, monkeypatch):
+    """scrape, resolve and publish can run separately, each reading the last one's output."""
+    chart_file, resolved_file = tmp_path / "chart.jsonl", tmp_path / "resolved.jsonl"
+    charts = {("hot-100", "2016-07-16"): [ChartEntry(1, "Song A", "Artist", None, None, None)]}
+    sp_client = make_sp_client()
+
+    with patch('stages.fetch_chart_pages', return_value=charts), patch('stages.ChartFetcher'):
+        stages.main(["scrape", "2016-07-16", "-o", str(chart_file)])
+    with patch('stages.SpotifyClient.from_config', return_value=sp_client):
+        stages.main(["resolve", str(chart_file), "-o", str(resolved_file)])
+    monkeypatch.delenv("SPOTIFY_CLIENT_ID")
+    with patch('stages.PlaylistManager') as manager:
+        stages.main(["publish", str(resolved_file), "--dry-run"])
+
+    assert json.loads(chart_file.read_text())['title'] == "Song A"
+    assert json.loads(resolved_file.read_text())['track'] == track("Song A")
+    assert not manager.mock_calls
+
+
+def test_resolve_revalidates_known_tracks_in_bulk():
+    """With revalidate, known tracks go through revalidate() and misses are still searched."""
+    records = [record("d1", 1, "Song A", track=track("Song A")), record("d1", 2, "Song B", track=None)]
+    sp_client = make_sp_client()
+    sp_client.revalidate.side_effect = lambda known, max_concurrency=8: (
+        {song: track("Song A v2") for song in known}, {}
+    )
+
+    resolved = list(stages.resolve(records, sp_client, revalidate=True))
+
+    sp_client.revalidate.assert_called_once_with({("Song A", "Artist"): track("Song A")}, max_concurrency=8)
+    sp_client.search_tracks.assert_called_once_with([("Song B", "Artist")], max_concurrency=8)
+    assert [r['track'] for r in resolved] == [track("Song A v2"), track("Song B")]
@@ -0,0 +1,39 @@
+# tests/test_tracks.py
+import json
+import pickle
+import pytest
+from tracks import Track, to_json
+
+URI = "spotify:track:4uLU6hMCjMI75M1A2tKUQC"
+
+
+def test_track_reads_like_the_dict_it_replaces():
+    track = Track(URI, "Song", "Artist")
+    as_dict = {'uri': URI, 'name': "Song", 'artist': "Artist"}
+
+    assert track['uri'] == URI
+    assert track.get('name') == "Song"
+    assert track.get('linked_from') is None
+    assert dict(track) == as_dict
+    assert track == as_dict and as_dict == track
+    with pytest.raises(KeyError):
+        track['album']
+
+
+def test_track_is_compact():
+    track = Track(URI, "Song", "Artist")
+    assert not hasattr(track, '__dict__')
+    assert track._id == b"4uLU6hMCjMI75M1A2tKUQC"
+    assert Track(URI, "Other", "Artist").artist is track.artist
+
+
+def test_other_uris_are_kept_whole():
+    assert Track("spotify:local:::Song:200", "Song", "Artist")['uri'] == "spotify:local:::Song:200"
+
+
+def test_from_dict_and_json_round_trip():
+    track = Track.from_dict({'uri': URI, 'name': "Song", 'artist': "Artist"})
+    assert Track.from_dict(track) is track
+    assert Track.from_dict(None) is None
+    assert json.loads(json.dumps({'track': track}, default=to_json)) == {'track': dict(track)}
+    assert pickle.loads(pickle.dumps(track)) == track
@@ -0,0 +1,69 @@
+# tracks.py
+import sys
+from collections.abc import Mapping
+
+URI_PREFIX = 'spotify:track:'
+
+
+class Track(Mapping):
+    """A matched Spotify track, stored compactly.
+
+    The base62 track ID is kept as bytes without the URI prefix, and the name
+    and artist are interned, so songs by the same artist share one string.
+    A Track reads like the {'uri', 'name', 'artist'} dict it replaces:
+    track['uri'], track.get('name'), dict(track) and == with such a dict.
+    """
+    __slots__ = ('_id', 'name', 'artist')
+    FIELDS = ('uri', 'name', 'artist')
+
+    def __init__(self, uri, name, artist):
+        # URIs of other kinds (local files, tests) are kept whole
+        self._id = uri[len(URI_PREFIX):].encode('utf-8') if uri.startswith(URI_PREFIX) else uri
+        self.name = sys.intern(name) if name else name
+        self.artist = sys.intern(artist) if artist else artist
+
+    @classmethod
+    def from_spotify(cls, item):
+        """Build a Track from a track object in a Spotify API response."""
+        return cls(item['uri'], item['name'], item['artists'][0]['name'])
+
+    @classmethod
+    def from_dict(cls, track):
+        """Convert a track dict (as cached or saved in records) to a Track; None and Tracks pass through."""
+        if track is None or isinstance(track, cls):
+            return track
+        return cls(track['uri'], track.get('name'), track.get('artist'))
+
+    @property
+    def uri(self):
+        if isinstance(self._id, bytes):
+            return URI_PREFIX + self._id.decode('utf-8')
+        return self._id
+
+    def __getitem__(self, key):
+        if key == 'uri':
+            return self.uri
+        if key == 'name':
+            return self.name
+        if key == 'artist':
+            return self.artist
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"Track({self.uri!r}, {self.name!r}, {self.artist!r})"
+
+    def __reduce__(self):
+        return Track, (self.uri, self.name, self.artist)
+
+
+def to_json(value):
+    """`default` hook for json.dumps that writes a Track as its plain dict."""
+    if isinstance(value, Track):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")